@@ -14,7 +14,7 @@ class DatasetViewerPipeline(Pipeline):
         Pipeline.__init__(
             self,
             "DatasetViewer",
-            factory(GetVideoFrame, video_path),
+            factory(GetVideoFrame, video_path, runtime_config),
             GetRegionFileRegion,
             # GetGroundTruthRegion,
             DisplayDebugRegions,
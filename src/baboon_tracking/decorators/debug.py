@@ -10,6 +10,7 @@ from numpy import ndarray
 from baboon_tracking.decorators.save_video_result import save_video_result
 from baboon_tracking.decorators.save_img_result import save_img_result
 from baboon_tracking.decorators.show_result import show_result
+from baboon_tracking.mixins.rectangles_mixin import RectanglesMixin
 from baboon_tracking.models.region import Region
 from baboon_tracking.models.frame import Frame
 from pipeline.parent_stage import ParentStage
@@ -31,6 +32,10 @@ class DisplayDebugRegions(Stage):
     def __init__(self):
         Stage.__init__(self)
 
+        # Stages register themselves in on_init, after every stage is constructed.
+        # Drop the stages of any pipeline previously run in this process.
+        DisplayDebugRegions.stage_debug_map.clear()
+
         self._data_attribute_map = None
         self._debug_attribute_map = None
 
@@ -62,7 +67,14 @@ class DisplayDebugRegions(Stage):
                 debug_stage_list = DisplayDebugRegions.stage_debug_map[data_stage]
 
                 for debug_stage, color, _ in debug_stage_list:
-                    if debug_stage.baboons:
+                    if isinstance(debug_stage, RectanglesMixin):
+                        if debug_stage.rectangles is not None:
+                            self._draw_rectangles(
+                                debug_frame,
+                                color,
+                                [(r, None) for r in debug_stage.rectangles.tolist()],
+                            )
+                    elif debug_stage.baboons:
                         self._draw_regions(debug_frame, color, debug_stage.baboons)
 
                 setattr(
@@ -74,7 +86,16 @@ class DisplayDebugRegions(Stage):
     def _draw_regions(
         self, debug_frame: ndarray, color: Tuple[int, int, int], baboons: List[Region]
     ):
-        rectangles = [(b.rectangle, b.id_str) for b in baboons]
+        self._draw_rectangles(
+            debug_frame, color, [(b.rectangle, b.id_str) for b in baboons]
+        )
+
+    def _draw_rectangles(
+        self,
+        debug_frame: ndarray,
+        color: Tuple[int, int, int],
+        rectangles: List[Tuple[Tuple[int, int, int, int], str]],
+    ):
         for rect, id_str in rectangles:
             debug_frame = cv2.rectangle(
                 debug_frame,
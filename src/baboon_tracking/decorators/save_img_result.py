@@ -74,9 +74,9 @@ def save_img_result(function: Callable):
 
     function.execute = execute
 
-    function.save_result_set_runtime_config = set_runtime_config
+    function.save_img_result_set_runtime_config = set_runtime_config
 
-    function = runtime_config("save_result_set_runtime_config", is_property=True)(
+    function = runtime_config("save_img_result_set_runtime_config", is_property=True)(
         function
     )
 
@@ -93,15 +93,17 @@ def save_video_result(function: Callable):
     def videowrite_img(
         name: str, frame: Frame, frame_video_writers: Dict[str, cv2.VideoWriter]
     ):
+        frame = frame.get_frame()
+
+        # Frames of stages run on a scaled frame are smaller than the capture.
         if name not in frame_video_writers:
             frame_video_writers[name] = cv2.VideoWriter(
                 f"./output/{name.replace('[', '_').replace(']', '_')}.mp4",
                 cv2.VideoWriter_fourcc(*"mp4v"),
                 capture.fps,
-                (capture.frame_width, capture.frame_height),
+                (frame.shape[1], frame.shape[0]),
             )
 
-        frame = frame.get_frame()
         if len(frame.shape) == 2:
             frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
 
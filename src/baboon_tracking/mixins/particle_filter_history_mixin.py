@@ -1,12 +1,15 @@
 from abc import ABC, abstractproperty
-from typing import List, Tuple
+from typing import List
 
-from baboon_tracking.models.particle_filter import Particle
+from baboon_tracking.models.particle_filter import ParticleHistoryStep
 
 
 class ParticleFilterHistoryMixin(ABC):
     @abstractproperty
     def particle_filter_history(
         self,
-    ) -> List[Tuple[int, List[Tuple[int, str, List[Particle]]]]]:
+    ) -> List[ParticleHistoryStep]:
+        """
+        The history steps recorded for the current frame.
+        """
         raise NotImplementedError
@@ -10,4 +10,5 @@ class QuantizedFramesMixin:
     """
 
     def __init__(self):
+        # A uint8 array of shape (frames, height, width)
         self.quantized_frames: Iterable = None
@@ -0,0 +1,14 @@
+"""
+Mixin for returning regions as an array.
+"""
+
+import numpy as np
+
+
+class RectanglesMixin:
+    """
+    Mixin for returning the regions of a frame as an (n, 4) array of x1, y1, x2, y2.
+    """
+
+    def __init__(self):
+        self.rectangles: np.ndarray = None
@@ -2,6 +2,8 @@
 Mixin for returning shifted history frames.
 """
 from typing import Iterable
+
+import numpy as np
 from baboon_tracking.models.frame import Frame
 
 
@@ -12,3 +14,4 @@ class ShiftedHistoryFramesMixin:
 
     def __init__(self):
         self.shifted_history_frames: Iterable[Frame] = None
+        self.shifted_history_stack: np.ndarray = None
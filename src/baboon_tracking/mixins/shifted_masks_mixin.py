@@ -2,9 +2,6 @@
 Mixin for returning shifted masks.
 """
 
-
-from typing import List
-
 from baboon_tracking.models.frame import Frame
 
 
@@ -14,4 +11,5 @@ class ShiftedMasksMixin:
     """
 
     def __init__(self):
-        self.shifted_masks: List[Frame] = []
+        # The pixels which are inside every shifted history frame.
+        self.shifted_mask: Frame = None
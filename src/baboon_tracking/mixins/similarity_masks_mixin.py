@@ -0,0 +1,16 @@
+"""
+Mixin for returning the similarity masks of consecutive quantized frames.
+"""
+
+import numpy as np
+
+
+class SimilarityMasksMixin:
+    """
+    Mixin for returning the similarity masks of consecutive quantized frames.
+    """
+
+    def __init__(self):
+        # True where a pixel is within one quantization level of the previous frame,
+        # an array of shape (frames - 1, height, width).
+        self.similarity_masks: np.ndarray = None
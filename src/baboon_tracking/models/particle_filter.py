@@ -2,266 +2,338 @@
 Implements a particle filter.
 """
 
-from math import cos, pi, sin, sqrt
 from multiprocessing import Semaphore
-from random import random
-from typing import Dict, List, Tuple
+from typing import List, NamedTuple, Tuple
+
 import numpy as np
 
-from baboon_tracking.models.region import Region
 from baboon_tracking.models.bayesian_region import BayesianRegion
-from library.region import bb_intersection_over_union
+from library.region import bb_intersection_over_union_matrix
 
 
-class Particle:
+class ParticleHistoryStep(NamedTuple):
     """
-    Implements a particle for a particle filter.
+    A snapshot of the particles after one step of the particle filters.
     """
 
-    def __init__(self, baboon: BayesianRegion, weight: float):
-        self.baboon = baboon
-        self.weight = weight
+    step_name: str
+    filter_ids: np.ndarray
+    coordinates: np.ndarray
+    observed: np.ndarray
+    weights: np.ndarray
 
-    def transform(self, transformation: np.ndarray):
-        """
-        Transforms the location of the particle using the specified transform.
-        """
 
-        x1, y1, x2, y2 = self.baboon.rectangle
+class ParticleFilterEngine:
+    """
+    Implements a set of particle filters backed by arrays.
 
-        top_left = np.array([x1, y1, 1])
-        bottom_right = np.array([x2, y2, 1])
+    The particles of every filter are stored in one (N, 4) coordinate array, along
+    with weight, filter id and observed columns, so each step is computed for every
+    filter at once.  The particles of a filter are always contiguous.
+    """
 
-        top_left = np.round(np.matmul(transformation, top_left)).astype(np.int32)
-        bottom_right = np.round(np.matmul(transformation, bottom_right)).astype(
-            np.int32
-        )
+    _instance_id = 0
+    _lock = Semaphore()
 
-        self.baboon = BayesianRegion(
-            (top_left[0], top_left[1], bottom_right[0], bottom_right[1]),
-            id_str=self.baboon.id_str,
-            identity=self.baboon.identity,
-            observed=self.baboon.observed,
-        )
+    def __init__(
+        self,
+        particle_count: int,
+        rng: np.random.Generator = None,
+        record_history: bool = True,
+    ):
+        self._particle_count = particle_count
+        self._record_history = record_history
+        self._weight = 1.0 / float(particle_count)
+        self._rng = rng if rng is not None else np.random.default_rng()
 
-    def predict(self):
-        """
-        Moves the particle using our best guess of where we expect the region to be.
-        """
+        self.coordinates = np.zeros((0, 4), dtype=np.int64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self.filter_ids = np.zeros(0, dtype=np.int64)
+        self.observed = np.zeros(0, dtype=bool)
 
-        x1, y1, x2, y2 = self.baboon.rectangle
-        width = x2 - x1
-        height = y2 - y1
-        length = sqrt(width**2 + height**2)
+        # Particles which share a lineage value, next to each other, are copies of
+        # the same particle.  Copies are grouped when choosing a filter's region.
+        self._lineage = np.zeros(0, dtype=np.int64)
 
-        sample = np.abs(np.random.normal(scale=0.01)) * length
-        degs = random() * 2 * pi
+        self.history: List[ParticleHistoryStep] = []
 
-        val = 1
-        half_val = val / 2.0
+    @property
+    def identities(self) -> np.ndarray:
+        """
+        The ids of the particle filters, in the order they are stored.
+        """
+        return self.filter_ids[self._get_filter_starts()]
 
-        delta_x = int(np.round(sample * sin(degs)).item())
-        delta_y = int(np.round(sample * cos(degs)).item())
+    def _get_filter_starts(self) -> np.ndarray:
+        return self._get_run_starts(self.filter_ids)
 
-        delta_x1 = int(round(random() * val - half_val))
-        delta_y1 = int(round(random() * val - half_val))
-        delta_x2 = int(round(random() * val - half_val))
-        delta_y2 = int(round(random() * val - half_val))
+    def _get_run_starts(self, *columns: np.ndarray) -> np.ndarray:
+        if not self.filter_ids.size:
+            return np.zeros(0, dtype=np.int64)
 
-        if delta_x1 >= delta_x2:
-            delta_x2 = delta_x1
+        changed = np.zeros(self.filter_ids.size - 1, dtype=bool)
+        for column in columns:
+            changed |= column[1:] != column[:-1]
 
-        if delta_y1 >= delta_y2:
-            delta_y2 = delta_y1
+        return np.flatnonzero(np.concatenate(([True], changed)))
 
-        self.baboon = self._get_moved_baboon(
-            delta_x, delta_y, delta_x1, delta_y1, delta_x2, delta_y2
+    def _get_filter_index(self, starts: np.ndarray) -> np.ndarray:
+        # The position of each particle's filter within the filter starts.
+        return np.repeat(
+            np.arange(starts.size), np.diff(np.append(starts, self.filter_ids.size))
         )
-        self.baboon.observed = False
 
-    def update(self, baboons: List[Region]):
+    def pop_history(self) -> List[ParticleHistoryStep]:
         """
-        Moves the region based on our observations.
+        Gets the history steps recorded since the last call and forgets them.
         """
+        history = self.history
+        self.history = []
 
-        baboons = [
-            (bb_intersection_over_union(self.baboon.rectangle, b.rectangle), b)
-            for b in baboons
-        ]
-        baboons.sort(key=lambda b: b[0], reverse=True)
-
-        weight, baboon = baboons[0]
+        return history
 
-        if weight == 0:
+    def _add_particle_history(self, step_name: str, particles: np.ndarray = None):
+        if not self._record_history:
             return
 
-        baboon.id_str = self.baboon.id_str
-        baboon.identity = self.baboon.identity
+        if particles is None:
+            particles = np.arange(self.filter_ids.size)
 
-        self.weight *= weight
-        self.baboon = BayesianRegion.from_region(baboon, observed=True)
-
-    def _get_moved_baboon(
-        self,
-        delta_x: int,
-        delta_y: int,
-        delta_x1: int,
-        delta_y1: int,
-        delta_x2: int,
-        delta_y2: int,
-    ):
-        x1, y1, x2, y2 = self.baboon.rectangle
+        self.history.append(
+            ParticleHistoryStep(
+                step_name,
+                self.filter_ids[particles],
+                self.coordinates[particles],
+                self.observed[particles],
+                self.weights[particles],
+            )
+        )
 
-        x1 += delta_x
-        y1 += delta_y
+    @staticmethod
+    def allocate_ids(count: int) -> np.ndarray:
+        """
+        Allocates ids for new particle filters.
+        """
+        with ParticleFilterEngine._lock:
+            ids = np.arange(count, dtype=np.int64) + ParticleFilterEngine._instance_id
+            ParticleFilterEngine._instance_id += count
 
-        x2 += delta_x
-        y2 += delta_y
+        return ids
 
-        x1 += delta_x1
-        y1 += delta_y1
+    def add_filters(self, boxes: np.ndarray, ids: np.ndarray = None) -> np.ndarray:
+        """
+        Creates a particle filter for each of the specified boxes.
+        """
+        if ids is None:
+            ids = ParticleFilterEngine.allocate_ids(len(boxes))
 
-        x2 += delta_x2
-        y2 += delta_y2
+        count = self._particle_count
+        first = self.filter_ids.size
 
-        return BayesianRegion(
-            (x1, y1, x2, y2),
-            id_str=self.baboon.id_str,
-            identity=self.baboon.identity,
-            observed=self.baboon.observed,
+        self.coordinates = np.concatenate(
+            (self.coordinates, np.repeat(boxes.astype(np.int64), count, axis=0))
+        )
+        self.weights = np.concatenate(
+            (self.weights, np.full(len(boxes) * count, self._weight))
+        )
+        self.filter_ids = np.concatenate((self.filter_ids, np.repeat(ids, count)))
+        self.observed = np.concatenate(
+            (self.observed, np.ones(len(boxes) * count, dtype=bool))
+        )
+        self._lineage = np.concatenate(
+            (self._lineage, np.zeros(len(boxes) * count, dtype=np.int64))
         )
 
+        self._add_particle_history("initial", np.arange(first, self.filter_ids.size))
 
-class ParticleFilter:
-    """
-    Implements a particle filter.
-    """
+        return ids
 
-    _instance_id = 0
-    _lock = Semaphore()
+    def remove_filters(self, ids: np.ndarray):
+        """
+        Removes the particle filters with the specified ids.
+        """
+        keep = ~np.isin(self.filter_ids, ids)
 
-    def __init__(self, baboon: Region, particle_count: int):
-        self._particle_count = particle_count
-        self._weight = 1.0 / float(particle_count)
-        self._particle_history_idx = 0
-        self._particle_history: List[Tuple[int, str, List[Particle]]] = []
+        self.coordinates = self.coordinates[keep]
+        self.weights = self.weights[keep]
+        self.filter_ids = self.filter_ids[keep]
+        self.observed = self.observed[keep]
+        self._lineage = self._lineage[keep]
+
+    def predict(self):
+        """
+        Moves every particle using our best guess of where we expect the region to be.
+        """
+        count = self.filter_ids.size
 
-        bayesian_baboon = BayesianRegion.from_region(baboon, observed=True)
-        self.particles: List[Particle] = [
-            Particle(bayesian_baboon, self._weight) for _ in range(particle_count)
-        ]
-        self._add_particle_history("initial", self.particles)
+        width = self.coordinates[:, 2] - self.coordinates[:, 0]
+        height = self.coordinates[:, 3] - self.coordinates[:, 1]
+        length = np.sqrt(width**2 + height**2)
 
-        with ParticleFilter._lock:
-            self.instance_id = ParticleFilter._instance_id
-            ParticleFilter._instance_id += 1
+        sample = np.abs(self._rng.normal(scale=0.01, size=count)) * length
+        degs = self._rng.random(count) * 2 * np.pi
 
-        bayesian_baboon.identity = self.instance_id
-        bayesian_baboon.id_str = str(self.instance_id)
+        # The per-corner jitter of the original Particle always rounded to zero,
+        # so only the shift of the whole region is applied.
+        delta_x = np.round(sample * np.sin(degs)).astype(np.int64)
+        delta_y = np.round(sample * np.cos(degs)).astype(np.int64)
 
-    @property
-    def particle_history(self):
-        return self._particle_history
+        self.coordinates += np.stack((delta_x, delta_y, delta_x, delta_y), axis=1)
+        self.observed[:] = False
+        self._lineage = np.arange(count, dtype=np.int64)
 
-    def _add_particle_history(self, step_name: str, particles: List[Particle]):
-        self._particle_history.append(
-            (self._particle_history_idx, step_name, particles)
-        )
-        self._particle_history_idx += 1
+        self._add_particle_history("predict")
 
     def transform(self, transformation: np.ndarray):
         """
-        Transforms each particle using the specified transformation matrix.
+        Transforms the location of every particle using the specified transform.
         """
-        for particle in self.particles:
-            particle.transform(transformation)
+        count = self.filter_ids.size
+        ones = np.ones((count, 1))
 
-        self._add_particle_history("transform", self.particles)
+        for corner in (slice(0, 2), slice(2, 4)):
+            points = np.concatenate((self.coordinates[:, corner], ones), axis=1)
+            points = np.round(np.matmul(points, transformation.T)).astype(np.int32)
 
-    def predict(self):
-        """
-        Performs the predict step on each of the particles.
-        """
-        for particle in self.particles:
-            particle.predict()
+            self.coordinates[:, corner] = points[:, :2]
+
+        self._lineage = np.arange(count, dtype=np.int64)
 
-        self._add_particle_history("predict", self.particles)
+        self._add_particle_history("transform")
 
-    def update(self, baboons: List[Region]):
+    def update(self, boxes: np.ndarray):
         """
-        Performs the update step on each of the particles.
+        Moves every particle to the observed box it overlaps the most.
         """
-        for particle in self.particles:
-            particle.update(baboons)
+        count = self.filter_ids.size
+
+        if count and len(boxes):
+            iou = bb_intersection_over_union_matrix(self.coordinates, boxes)
+            best = np.argmax(iou, axis=1)
+            best_iou = iou[np.arange(count), best]
+            hit = best_iou > 0
+
+            self.weights[hit] *= best_iou[hit]
+            self.coordinates[hit] = boxes[best[hit]]
+            self.observed[hit] = True
 
-        self._add_particle_history("update", self.particles)
+        self._lineage = np.arange(count, dtype=np.int64)
+
+        self._add_particle_history("update")
 
     def resample(self):
         """
-        Resamples the particles to have the required weights.
+        Resamples the particles of every filter to have the required weights.
         """
-        baboon_weights: Dict[BayesianRegion, float] = {}
-
-        for particle in self.particles:
-            if not particle.baboon in baboon_weights:
-                baboon_weights[particle.baboon] = 0.0
+        if not self.filter_ids.size:
+            self._add_particle_history("resample")
+            return
 
-            baboon_weights[particle.baboon] += particle.weight
+        starts = self._get_filter_starts()
+        filter_index = self._get_filter_index(starts)
+        normalizer = np.add.reduceat(self.weights, starts)
+
+        # Heaviest particles first within each filter, keeping ties in order.
+        order = np.lexsort((-self.weights, filter_index))
+        particle_counts = np.round(
+            (self.weights[order] / normalizer[filter_index[order]]) / self._weight
+        ).astype(np.int64)
+
+        # Stop adding copies once a filter reaches the particle count.
+        totals = np.cumsum(particle_counts)
+        previous = totals - particle_counts
+        previous -= np.repeat(previous[starts], np.diff(np.append(starts, order.size)))
+        particle_counts = np.clip(
+            np.minimum(particle_counts, self._particle_count - previous), 0, None
+        )
 
-        normalizer = np.sum(np.array([w for _, w in baboon_weights.items()]))
-        baboons_weights = list((b, w) for b, w in baboon_weights.items())
-        baboons_weights.sort(key=lambda x: x[1], reverse=True)
+        particles = np.repeat(order, particle_counts)
 
-        self.particles = []
-        count = 0
-        for baboon, weight in baboons_weights:
-            particle_count = int(np.round((weight / normalizer) / self._weight).item())
+        self.coordinates = self.coordinates[particles]
+        self.filter_ids = self.filter_ids[particles]
+        self.observed = self.observed[particles]
+        self.weights = np.full(particles.size, self._weight)
+        self._lineage = particles
 
-            if count + particle_count > self._particle_count:
-                particle_count = self._particle_count - count
+        self._add_particle_history("resample")
 
-            if particle_count == 0:
-                break
+    def advance(
+        self, boxes: np.ndarray, transformation: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Runs every step of the particle filters for a frame and gets the
+        probabilities of the observed boxes.
+        """
+        self.predict()
 
-            self.particles.extend(
-                [Particle(baboon, self._weight) for _ in range(particle_count)]
-            )
+        if transformation is not None:
+            self.transform(transformation)
 
-            count = len(self.particles)
+        self.update(boxes)
+        self.resample()
 
-        self._add_particle_history("resample", self.particles)
+        return self.get_probabilities(boxes)
 
-    def get_baboon(self) -> Region:
+    def get_probabilities(self, boxes: np.ndarray) -> np.ndarray:
         """
-        Gets the most likely baboon from the particle filter.
+        Gets the probability that each box is represented by each particle filter.
+        Rows follow the order of identities.
         """
+        starts = self._get_filter_starts()
 
-        baboon_weights: Dict[BayesianRegion, float] = {}
+        if not starts.size or not len(boxes):
+            return np.zeros((starts.size, len(boxes)))
 
-        for particle in self.particles:
-            if not particle.baboon in baboon_weights:
-                baboon_weights[particle.baboon] = 0.0
+        return np.add.reduceat(
+            bb_intersection_over_union_matrix(self.coordinates, boxes) * self._weight,
+            starts,
+            axis=0,
+        )
 
-            baboon_weights[particle.baboon] += particle.weight
+    def get_region_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gets the coordinates, ids and observed flags of the most likely region of
+        every particle filter.
+        """
+        starts = self._get_filter_starts()
+        if not starts.size:
+            return (
+                np.zeros((0, 4), dtype=np.int64),
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=bool),
+            )
 
-        weights_and_baboons = [(w, b) for b, w in baboon_weights.items()]
-        _, baboon = max(weights_and_baboons, key=lambda x: x[0])
+        runs = self._get_run_starts(self.filter_ids, self._lineage)
+        run_weights = np.add.reduceat(self.weights, runs)
+        run_filters = self._get_filter_index(starts)[runs]
+
+        order = np.lexsort((np.arange(runs.size), -run_weights, run_filters))
+        first = np.concatenate(
+            ([True], run_filters[order][1:] != run_filters[order][:-1])
+        )
+        best = runs[order[first]]
 
-        return baboon
+        return self.coordinates[best], self.filter_ids[best], self.observed[best]
 
-    def get_probability(self, baboon: Region):
+    def get_regions(self) -> List[BayesianRegion]:
         """
-        Gets the probability that this baboon is represented by the particle filter.
+        Gets the most likely region of every particle filter.
         """
+        return to_regions(*self.get_region_arrays())
 
-        return np.sum(
-            (
-                np.array(
-                    [
-                        bb_intersection_over_union(p.baboon.rectangle, baboon.rectangle)
-                        for p in self.particles
-                    ]
-                )
-                * self._weight
-            )
+
+def to_regions(
+    coordinates: np.ndarray, identities: np.ndarray, observed: np.ndarray
+) -> List[BayesianRegion]:
+    """
+    Creates the regions of particle filters from their arrays.
+    """
+    return [
+        BayesianRegion(
+            tuple(c),
+            id_str=str(i),
+            identity=i,
+            observed=o,
         )
+        for c, i, o in zip(coordinates.tolist(), identities.tolist(), observed.tolist())
+    ]
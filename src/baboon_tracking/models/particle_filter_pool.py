@@ -0,0 +1,264 @@
+"""
+Runs particle filters in long-lived worker processes.
+"""
+
+from multiprocessing import Process, get_context
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple
+
+import numpy as np
+
+from baboon_tracking.models.bayesian_region import BayesianRegion
+from baboon_tracking.models.particle_filter import (
+    ParticleFilterEngine,
+    ParticleHistoryStep,
+    to_regions,
+)
+
+# The frame's homography is stored ahead of the observations in shared memory.
+_TRANSFORMATION_SIZE = 9
+
+# Forking a process after numba's threading layer has started hangs it on exit, so
+# workers are started from a clean server process instead.  Its children also share
+# this process' resource tracker.
+_CONTEXT = get_context("forkserver")
+_CONTEXT.set_forkserver_preload([__name__])
+
+
+def _read_frame(
+    shared_memory: SharedMemory, count: int, has_transformation: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    data = np.ndarray(
+        (_TRANSFORMATION_SIZE + count * 4,), dtype=np.float64, buffer=shared_memory.buf
+    )
+
+    transformation = None
+    if has_transformation:
+        transformation = data[:_TRANSFORMATION_SIZE].reshape(3, 3).copy()
+
+    boxes = data[_TRANSFORMATION_SIZE:].reshape(count, 4).astype(np.int64)
+
+    return boxes, transformation
+
+
+def _worker(
+    connection: Connection,
+    particle_count: int,
+    seed_sequence: np.random.SeedSequence,
+    record_history: bool,
+):
+    engine = ParticleFilterEngine(
+        particle_count, np.random.default_rng(seed_sequence), record_history
+    )
+    shared_memory: SharedMemory = None
+
+    while True:
+        command, *args = connection.recv()
+
+        if command == "advance":
+            name, count, has_transformation = args
+
+            if shared_memory is None or shared_memory.name != name:
+                if shared_memory is not None:
+                    shared_memory.close()
+
+                # The worker shares the pool's resource tracker, so attaching does
+                # not track the shared memory a second time.
+                shared_memory = SharedMemory(name=name)
+
+            boxes, transformation = _read_frame(
+                shared_memory, count, has_transformation
+            )
+            probabilities = engine.advance(boxes, transformation)
+
+            connection.send((engine.identities, probabilities))
+
+        elif command == "finish":
+            remove_ids, add_boxes, add_ids = args
+
+            engine.remove_filters(remove_ids)
+            engine.add_filters(add_boxes, add_ids)
+
+            connection.send((engine.get_region_arrays(), engine.pop_history()))
+
+        elif command == "close":
+            break
+
+    if shared_memory is not None:
+        shared_memory.close()
+
+    connection.close()
+
+
+class ParticleFilterPool:
+    """
+    Runs particle filters in long-lived worker processes.
+
+    Each worker owns the filters whose id modulo the worker count is its index, so
+    filter state never leaves the worker.  The observations and homography of a
+    frame are written once to shared memory for every worker to read.  Workers are
+    seeded from the same seed, so results are repeatable for a given worker count.
+    """
+
+    def __init__(
+        self, particle_count: int, workers: int, seed: int, record_history=True
+    ):
+        self._workers: List[Tuple[Process, Connection]] = []
+        for seed_sequence in np.random.SeedSequence(seed).spawn(workers):
+            connection, child_connection = _CONTEXT.Pipe()
+            process = _CONTEXT.Process(
+                target=_worker,
+                args=(child_connection, particle_count, seed_sequence, record_history),
+                daemon=True,
+            )
+            process.start()
+
+            self._workers.append((process, connection))
+
+        self._shared_memory: SharedMemory = None
+        self._identities = np.zeros(0, dtype=np.int64)
+        self._remove_ids = np.zeros(0, dtype=np.int64)
+        self._add_boxes = np.zeros((0, 4), dtype=np.int64)
+        self._add_ids = np.zeros(0, dtype=np.int64)
+
+        self.history: List[ParticleHistoryStep] = []
+
+    @property
+    def identities(self) -> np.ndarray:
+        """
+        The ids of the particle filters, in order.
+        """
+        return self._identities
+
+    def _write_frame(self, boxes: np.ndarray, transformation: np.ndarray) -> str:
+        size = (_TRANSFORMATION_SIZE + boxes.size) * 8
+
+        if self._shared_memory is None or self._shared_memory.size < size:
+            self._close_shared_memory()
+            self._shared_memory = SharedMemory(create=True, size=max(size * 2, 4096))
+
+        data = np.ndarray(
+            (_TRANSFORMATION_SIZE + boxes.size,),
+            dtype=np.float64,
+            buffer=self._shared_memory.buf,
+        )
+        if transformation is not None:
+            data[:_TRANSFORMATION_SIZE] = transformation.reshape(-1)
+        data[_TRANSFORMATION_SIZE:] = boxes.reshape(-1)
+
+        return self._shared_memory.name
+
+    def _close_shared_memory(self):
+        if self._shared_memory is None:
+            return
+
+        self._shared_memory.close()
+        self._shared_memory.unlink()
+        self._shared_memory = None
+
+    def advance(
+        self, boxes: np.ndarray, transformation: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Runs every step of the particle filters for a frame and gets the
+        probabilities of the observed boxes.
+        """
+        name = self._write_frame(boxes, transformation)
+
+        for _, connection in self._workers:
+            connection.send(("advance", name, len(boxes), transformation is not None))
+
+        results = [connection.recv() for _, connection in self._workers]
+        identities = np.concatenate([i for i, _ in results])
+        probabilities = np.concatenate([p for _, p in results])
+
+        order = np.argsort(identities, kind="stable")
+        self._identities = identities[order]
+
+        return probabilities[order]
+
+    def remove_filters(self, ids: np.ndarray):
+        """
+        Removes the particle filters with the specified ids.
+        """
+        self._remove_ids = np.append(self._remove_ids, ids)
+        self._identities = self._identities[~np.isin(self._identities, ids)]
+
+    def add_filters(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Creates a particle filter for each of the specified boxes.  The filters
+        are created in the workers by the next call to get_regions.
+        """
+        ids = ParticleFilterEngine.allocate_ids(len(boxes))
+
+        self._add_boxes = np.concatenate((self._add_boxes, boxes))
+        self._add_ids = np.append(self._add_ids, ids)
+        self._identities = np.append(self._identities, ids)
+
+        return ids
+
+    def get_regions(self) -> List[BayesianRegion]:
+        """
+        Applies any added or removed filters and gets the most likely region of
+        every particle filter.
+        """
+        count = len(self._workers)
+
+        for idx, (_, connection) in enumerate(self._workers):
+            owned = self._add_ids % count == idx
+
+            connection.send(
+                (
+                    "finish",
+                    self._remove_ids[self._remove_ids % count == idx],
+                    self._add_boxes[owned],
+                    self._add_ids[owned],
+                )
+            )
+
+        results = [connection.recv() for _, connection in self._workers]
+
+        self._remove_ids = np.zeros(0, dtype=np.int64)
+        self._add_boxes = np.zeros((0, 4), dtype=np.int64)
+        self._add_ids = np.zeros(0, dtype=np.int64)
+
+        self._merge_history([h for _, h in results])
+
+        coordinates, identities, observed = (
+            np.concatenate(a) for a in zip(*[r for r, _ in results])
+        )
+        order = np.argsort(identities, kind="stable")
+
+        return to_regions(coordinates[order], identities[order], observed[order])
+
+    def _merge_history(self, worker_history: List[List[ParticleHistoryStep]]):
+        # Every worker runs the same steps, so steps are merged by position.
+        for steps in zip(*worker_history):
+            self.history.append(
+                ParticleHistoryStep(
+                    steps[0].step_name,
+                    *(np.concatenate(a) for a in list(zip(*steps))[1:]),
+                )
+            )
+
+    def pop_history(self) -> List[ParticleHistoryStep]:
+        """
+        Gets the history steps recorded since the last call and forgets them.
+        """
+        history = self.history
+        self.history = []
+
+        return history
+
+    def close(self):
+        """
+        Stops the workers and releases the shared memory.
+        """
+        for process, connection in self._workers:
+            connection.send(("close",))
+            process.join()
+            connection.close()
+
+        self._workers = []
+        self._close_shared_memory()
@@ -22,7 +22,7 @@ class MotionTrackerPipeline(Pipeline):
         Pipeline.__init__(
             self,
             "MotionTrackerPipeline",
-            factory(GetVideoFrame, video_path),
+            factory(GetVideoFrame, video_path, runtime_config),
             PreprocessFrame,
             MotionDetector,
             SaveMotionRegions,
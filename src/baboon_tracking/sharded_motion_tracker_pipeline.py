@@ -0,0 +1,242 @@
+"""
+Runs the motion tracker over chunks of a video in parallel processes.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+import os
+from os import remove
+from os.path import exists, splitext
+import shutil
+from sqlite3 import connect
+from typing import Dict, List, Tuple
+
+from tqdm import tqdm
+
+from baboon_tracking.motion_tracker_pipeline import MotionTrackerPipeline
+from baboon_tracking.stages.get_video_frame import GetVideoFrame
+from library.config import get_config, get_config_part, set_config
+from library.region_fingerprint import fingerprint_table
+from library.results_db import upgrade_results_db
+
+IDENTITY_COLUMNS = ["identity", "filter_identity"]
+
+# The metadata keys of the stages which fingerprint regions, and their tables.
+FINGERPRINTED_TABLES = {
+    "SaveRegions": "regions",
+    "SaveComputedRegions": "bayesian_filter_regions",
+}
+
+
+def _run_shard(video_path: str, runtime_config: Dict[str, any], config: Dict):
+    set_config(config)
+
+    MotionTrackerPipeline(video_path, runtime_config=runtime_config).run()
+
+
+class ShardedMotionTrackerPipeline:
+    """
+    Runs the MotionTrackerPipeline over chunks of a video in parallel processes.
+
+    Each chunk starts early enough that, by the first frame it is responsible for,
+    its state is the same as a serial run's.  The chunk databases are then merged
+    into a single results database whose rows match a serial run.
+
+    Identities are offset per chunk so they do not collide, but tracks are not
+    linked across chunk boundaries.
+    """
+
+    def __init__(self, video_path: str, runtime_config=None):
+        self._video_path = video_path
+        self._runtime_config = runtime_config or {}
+
+        self._shards = self._runtime_config.get("shards", None) or os.cpu_count()
+        self._results_file = (
+            self._runtime_config.get("results_file", None) or "./output/results.db"
+        )
+
+    def _get_shard_ranges(self) -> List[Tuple[int, int]]:
+        video = GetVideoFrame(self._video_path)
+        frame_count = int(video.frame_count)
+        video.on_destroy()
+
+        shards = max(1, min(self._shards, frame_count))
+
+        starts = [1 + (i * frame_count) // shards for i in range(shards)]
+        ends = [s - 1 for s in starts[1:]] + [None]
+
+        return list(zip(starts, ends))
+
+    def _get_shard_file(self, idx: int) -> str:
+        name, extension = splitext(self._results_file)
+        return f"{name}.shard{idx}{extension}"
+
+    def _get_warm_up_frames(self) -> int:
+        history_frames = get_config_part("motion_detector/history_frames")
+
+        # Incremental registration chains each history frame's transformation from
+        # when it was the previous frame, so those frames also need a full history.
+        if get_config_part("motion_detector/registration/incremental"):
+            return 2 * history_frames - 1
+
+        return history_frames
+
+    def _get_shard_runtime_config(
+        self, idx: int, start: int, end: int, warm_up_frames: int
+    ) -> Dict[str, any]:
+        runtime_config = dict(self._runtime_config)
+        runtime_config.update(
+            {
+                "display": False,
+                "save": False,
+                "timings": False,
+                "progress": False,
+                "start_frame": max(1, start - warm_up_frames),
+                "end_frame": end,
+                "results_file": self._get_shard_file(idx),
+            }
+        )
+
+        return runtime_config
+
+    def run(self):
+        """
+        Runs every chunk and merges the results once all of them finish.
+        """
+
+        warm_up_frames = self._get_warm_up_frames()
+        shard_ranges = self._get_shard_ranges()
+
+        # Forking after numba's threading layer has started hangs on exit, so the
+        # chunks are started from a clean server process.
+        with ProcessPoolExecutor(
+            max_workers=len(shard_ranges), mp_context=get_context("forkserver")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_shard,
+                    self._video_path,
+                    self._get_shard_runtime_config(i, start, end, warm_up_frames),
+                    get_config(),
+                )
+                for i, (start, end) in enumerate(shard_ranges)
+            ]
+
+            progress = self._runtime_config.get("progress", False)
+            for future in tqdm(
+                as_completed(futures), total=len(futures), disable=not progress
+            ):
+                future.result()
+
+        self._merge_shards(shard_ranges)
+
+    def _get_identity_offset(self, cursor, columns: Dict[str, List[str]]) -> int:
+        # Every shard numbers its identities from 0, so each one is moved past
+        # the identities already merged.
+        identities = [
+            cursor.execute(f"SELECT MAX({c}) FROM {t}").fetchone()[0]
+            for t, table_columns in columns.items()
+            for c in table_columns
+            if c in IDENTITY_COLUMNS
+        ]
+        identities = [i for i in identities if i is not None]
+
+        return max(identities) + 1 if identities else 0
+
+    def _get_shard_select(self, columns: List[str], offset: int) -> str:
+        expressions = []
+        for column in columns:
+            if column in IDENTITY_COLUMNS:
+                expressions.append(f"{column} + {offset}")
+            elif column == "id_str" and "identity" in columns:
+                # id_str is str(identity) unless a stage named the region.
+                expressions.append(
+                    f"""CASE WHEN id_str = CAST(identity AS text)
+                        THEN CAST(identity + {offset} AS text)
+                        ELSE id_str END"""
+                )
+            else:
+                expressions.append(column)
+
+        return ", ".join(expressions)
+
+    def _merge_shards(self, shard_ranges: List[Tuple[int, int]]):
+        if exists(self._results_file):
+            remove(self._results_file)
+
+        shutil.copyfile(self._get_shard_file(0), self._results_file)
+
+        connection = connect(self._results_file)
+        cursor = connection.cursor()
+
+        tables = [
+            t
+            for (t,) in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+            if t not in ("metadata", "stages")
+        ]
+
+        columns = {
+            t: [c for (_, c, *_) in cursor.execute(f"PRAGMA table_info({t})")]
+            for t in tables
+        }
+
+        # The fingerprints of shard 0 only cover its rows.
+        fingerprinted = [
+            k
+            for (k,) in cursor.execute("SELECT key FROM metadata").fetchall()
+            if k in FINGERPRINTED_TABLES
+        ]
+        cursor.execute(
+            """DELETE FROM metadata
+                WHERE key IN (
+                    'end_time', 'SaveRegions', 'SaveComputedRegions', 'schema_version'
+                )""",
+        )
+
+        for idx, (start, _) in enumerate(shard_ranges[1:], start=1):
+            cursor.execute("ATTACH DATABASE ? AS shard", (self._get_shard_file(idx),))
+
+            offset = self._get_identity_offset(cursor, columns)
+            for table in tables:
+                cursor.execute(
+                    f"""INSERT INTO {table}
+                        SELECT {self._get_shard_select(columns[table], offset)}
+                        FROM shard.{table} WHERE frame >= ?""",
+                    (start,),
+                )
+
+            connection.commit()
+            cursor.execute("DETACH DATABASE shard")
+
+        algorithm = self._runtime_config.get("fingerprint", None)
+        fingerprint_args = {"algorithm": algorithm} if algorithm else {}
+
+        (pipeline,) = cursor.execute("SELECT pipeline FROM metadata LIMIT 1").fetchone()
+        cursor.executemany(
+            "INSERT INTO metadata VALUES (?, ?, ?)",
+            [
+                (
+                    pipeline,
+                    key,
+                    fingerprint_table(
+                        connection, FINGERPRINTED_TABLES[key], **fingerprint_args
+                    ),
+                )
+                for key in fingerprinted
+            ],
+        )
+
+        upgrade_results_db(connection)
+
+        cursor.execute(
+            "INSERT INTO metadata VALUES (?, ?, ?)",
+            (pipeline, "end_time", datetime.utcnow()),
+        )
+
+        connection.commit()
+        connection.close()
+
+        for idx in range(len(shard_ranges)):
+            remove(self._get_shard_file(idx))
@@ -21,7 +21,7 @@ class SqliteParticleFilterPipeline(Pipeline):
         Pipeline.__init__(
             self,
             "SqliteParticleFilterPipeline",
-            factory(GetVideoFrame, video_path),
+            factory(GetVideoFrame, video_path, runtime_config),
             GetSqliteBaboon,
             ParticleFilter,
             SaveComputedRegions,
@@ -26,7 +26,9 @@ class GetRegionFileRegionBase(Stage, BaboonsMixin):
 
     def execute(self) -> StageResult:
         self.baboons = (
-            list(self._region_file.frame_regions(self._frame.frame.get_frame_number()))
+            self._region_file.frame_batch(
+                self._frame.frame.get_frame_number()
+            ).to_regions()
             if self._region_file
             else []
         )
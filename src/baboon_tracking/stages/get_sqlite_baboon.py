@@ -3,53 +3,143 @@ Gets regions from a Sqlite database.
 """
 
 from sqlite3 import connect
+from typing import Any, Dict, List
 
 import numpy as np
 
 from baboon_tracking.decorators.debug import debug
 from baboon_tracking.mixins.frame_mixin import FrameMixin
 from baboon_tracking.mixins.baboons_mixin import BaboonsMixin
+from baboon_tracking.mixins.rectangles_mixin import RectanglesMixin
 from baboon_tracking.mixins.transformation_matrices_mixin import (
     TransformationMatricesMixin,
 )
 from baboon_tracking.models.region import Region
+from library.results_db import has_frame_indexes
 from pipeline import Stage
-from pipeline.decorators import stage
+from pipeline.decorators import runtime_config, stage
 from pipeline.stage_result import StageResult
 
 
 @debug(FrameMixin, (0, 255, 0))
+@runtime_config("config")
 @stage("frame")
-class GetSqliteBaboon(Stage, BaboonsMixin, TransformationMatricesMixin):
+class GetSqliteBaboon(
+    Stage, BaboonsMixin, RectanglesMixin, TransformationMatricesMixin
+):
     """
     Gets regions from a Sqlite database.
+
+    If the runtime config enables "preload_motion_regions", the motion regions and
+    transformations are read once into arrays sorted by frame.  Each frame is then
+    served as a slice of those arrays instead of querying the database.  Databases
+    without frame indexes are always preloaded, since each query would scan them.
+
+    The regions are exposed as an array through RectanglesMixin.  Region objects
+    are only created when a stage reads baboons.
     """
 
-    def __init__(self, frame: FrameMixin) -> None:
+    def __init__(self, frame: FrameMixin, config: Dict[str, Any]) -> None:
+        self._baboons: List[Region] = None
+
         Stage.__init__(self)
         BaboonsMixin.__init__(self)
+        RectanglesMixin.__init__(self)
         TransformationMatricesMixin.__init__(self)
 
         self._frame = frame
 
+        config = config or {}
+        self._file_name = config.get("results_file", None) or "./output/results.db"
+        self._preload = config.get("preload_motion_regions", False)
+
         self._connection = None
         self._cursor = None
 
-    def on_init(self) -> None:
-        file_name = "./output/results.db"
+        self._regions: np.ndarray = None
+        self._region_offsets: np.ndarray = None
+        self._transformations: np.ndarray = None
+        self._transformation_offsets: np.ndarray = None
 
+    @property
+    def baboons(self) -> List[Region]:
+        if self._baboons is None and self.rectangles is not None:
+            self._baboons = [Region(r) for r in self.rectangles.tolist()]
+
+        return self._baboons
+
+    @baboons.setter
+    def baboons(self, baboons: List[Region]):
+        self._baboons = baboons
+
+    def on_init(self) -> None:
         if self._connection is None:
-            self._connection = connect(file_name)
+            self._connection = connect(self._file_name)
             self._cursor = self._connection.cursor()
 
-    def execute(self) -> StageResult:
-        frame = self._frame.frame.get_frame_number()
-        regions = list(
+        if not has_frame_indexes(self._connection):
+            self._preload = True
+
+        if self._preload:
+            self._preload_results()
+
+    def on_destroy(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+
+            self._connection = None
+            self._cursor = None
+
+    def _preload_results(self):
+        regions = np.array(
+            self._cursor.execute(
+                "SELECT frame, x1, y1, x2, y2 FROM motion_regions ORDER BY frame, rowid"
+            ).fetchall(),
+            dtype=np.int64,
+        ).reshape(-1, 5)
+        transformations = np.array(
+            self._cursor.execute(
+                """
+                SELECT  frame,
+                        t11, t12, t13,
+                        t21, t22, t23,
+                        t31, t32, t33
+                FROM transformations ORDER BY frame, rowid
+                """
+            ).fetchall(),
+            dtype=np.float64,
+        ).reshape(-1, 10)
+
+        self._regions = regions[:, 1:]
+        self._region_offsets = self._get_frame_offsets(regions[:, 0])
+        self._transformations = transformations[:, 1:]
+        self._transformation_offsets = self._get_frame_offsets(transformations[:, 0])
+
+        # Each frame is served as a view of these arrays, so they are read only.
+        self._regions.flags.writeable = False
+        self._transformations.flags.writeable = False
+
+    def _get_frame_offsets(self, frames: np.ndarray) -> np.ndarray:
+        # The rows of frame f are [offsets[f], offsets[f + 1]).
+        max_frame = int(frames[-1]) if frames.size else 0
+        return np.searchsorted(frames, np.arange(max_frame + 2))
+
+    def _get_frame_rows(
+        self, array: np.ndarray, offsets: np.ndarray, frame: int
+    ) -> np.ndarray:
+        if frame + 1 >= offsets.size:
+            return array[:0]
+
+        return array[offsets[frame] : offsets[frame + 1]]
+
+    def _query_frame(self, frame: int):
+        regions = np.array(
             self._cursor.execute(
                 "SELECT x1, y1, x2, y2 FROM motion_regions WHERE frame = ?", (frame,)
-            )
-        )
-        matrix_results = list(
+            ).fetchall(),
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        matrix_results = np.array(
             self._cursor.execute(
                 """
                 SELECT  t11, t12, t13,
@@ -58,15 +148,32 @@ class GetSqliteBaboon(Stage, BaboonsMixin, TransformationMatricesMixin):
                 FROM transformations WHERE frame = ?
                 """,
                 (frame,),
-            )
+            ).fetchall(),
+            dtype=np.float64,
+        ).reshape(-1, 9)
+
+        return regions, matrix_results
+
+    def _preloaded_frame(self, frame: int):
+        regions = self._get_frame_rows(self._regions, self._region_offsets, frame)
+        matrix_results = self._get_frame_rows(
+            self._transformations, self._transformation_offsets, frame
         )
 
-        if regions and matrix_results:
-            self.baboons = [Region(r) for r in regions]
-            t11, t12, t13, t21, t22, t23, t31, t32, t33 = matrix_results[0]
-            self.current_frame_transformation = np.array(
-                [[t11, t12, t13], [t21, t22, t23], [t31, t32, t33]]
-            )
+        return regions, matrix_results
+
+    def execute(self) -> StageResult:
+        frame = self._frame.frame.get_frame_number()
+
+        if self._preload:
+            regions, matrix_results = self._preloaded_frame(frame)
+        else:
+            regions, matrix_results = self._query_frame(frame)
+
+        if len(regions) and len(matrix_results):
+            self.rectangles = regions
+            self.baboons = None
+            self.current_frame_transformation = matrix_results[0].reshape(3, 3)
 
             result = StageResult(True, True)
         else:
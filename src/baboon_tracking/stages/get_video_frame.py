@@ -3,8 +3,12 @@ Get a video frame from a video file.
 """
 from os import listdir
 from os.path import basename, isdir
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import Dict, Tuple
 
 import cv2
+import numpy as np
 
 from baboon_tracking.mixins.capture_mixin import CaptureMixin
 from baboon_tracking.mixins.frame_mixin import FrameMixin
@@ -18,14 +22,21 @@ from pipeline.stage_result import StageResult
 class GetVideoFrame(Stage, FrameMixin, CaptureMixin):
     """
     Get a video frame from a video file.
+
+    If the runtime config provides a positive "prefetch_frames" value, frames are
+    decoded ahead of time on a background thread into a queue of that size.
+
+    The optional "start_frame" and "end_frame" runtime config values restrict the
+    frames read to that inclusive range, which is used to run chunks of a video.
     """
 
-    def __init__(self, video_path: str):
+    def __init__(self, video_path: str, runtime_config: Dict[str, any] = None):
         FrameMixin.__init__(self)
         CaptureMixin.__init__(self)
         Stage.__init__(self)
 
         self._files = None
+        self._capture: cv2.VideoCapture = None
         self._video_path = video_path
 
         self._is_video_file = self._get_is_video(video_path)
@@ -39,9 +50,41 @@ class GetVideoFrame(Stage, FrameMixin, CaptureMixin):
         if self.name is None:
             self.name = basename(video_path)
 
-        self._frame_number = 1
+        runtime_config = runtime_config or {}
+
+        start_frame = runtime_config.get("start_frame", None) or 1
+        end_frame = runtime_config.get("end_frame", None)
+
+        self._frame_number = start_frame
+        self._stop_frame = self._get_stop_frame(end_frame)
+        if self._is_video_file:
+            # Seeking is not frame accurate in videos with inter frames, so the frames
+            # before the start are decoded and dropped instead.
+            for _ in range(start_frame - 1):
+                if not self._capture.grab():
+                    break
+
+        prefetch_frames = runtime_config.get("prefetch_frames", 0)
+
+        self._prefetch_queue: Queue = None
+        self._prefetch_thread: Thread = None
+        self._stop_prefetch = Event()
+        if prefetch_frames > 0:
+            self._prefetch_queue = Queue(maxsize=prefetch_frames)
+            self._prefetch_thread = Thread(target=self._prefetch, daemon=True)
+
+        Pipeline.iterations = (end_frame or self.frame_count) - start_frame + 1
+
+    def _get_stop_frame(self, end_frame: int) -> int:
+        # The frame at which the stage reports the end of the stream.
+        # Image directories report it while reading their last image.
+        if self._is_video_file:
+            return end_frame + 1 if end_frame else None
 
-        Pipeline.iterations = self.frame_count
+        if end_frame:
+            return min(end_frame + 1, self.frame_count)
+
+        return self.frame_count
 
     def _get_is_video(self, video_path: str):
         return not isdir(video_path)
@@ -68,6 +111,63 @@ class GetVideoFrame(Stage, FrameMixin, CaptureMixin):
 
             self.name = "/".join(parts[(idx + 1) : -1])
 
+    def _read_frame(self, frame_number: int) -> Tuple[bool, np.ndarray]:
+        if self._is_video_file:
+            if self._stop_frame is not None and frame_number >= self._stop_frame:
+                return (False, None)
+
+            return self._capture.read()
+
+        return (
+            True,
+            cv2.imread(f"{self._video_path}/{self._files[frame_number - 1]}"),
+        )
+
+    def _prefetch(self):
+        frame_number = self._frame_number
+
+        while not self._stop_prefetch.is_set():
+            try:
+                item = self._read_frame(frame_number)
+            except Exception as exc:  # pylint: disable=broad-except
+                item = exc
+
+            while not self._stop_prefetch.is_set():
+                try:
+                    self._prefetch_queue.put(item, timeout=0.1)
+                    break
+                except Full:
+                    continue
+
+            if isinstance(item, Exception) or not item[0]:
+                return
+
+            frame_number += 1
+            if not self._is_video_file and frame_number > self._stop_frame:
+                return
+
+    def _next_frame(self) -> Tuple[bool, np.ndarray]:
+        if self._prefetch_queue is None:
+            return self._read_frame(self._frame_number)
+
+        item = self._prefetch_queue.get()
+        if isinstance(item, Exception):
+            raise item
+
+        return item
+
+    def on_init(self) -> None:
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.start()
+
+    def on_destroy(self) -> None:
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            self._stop_prefetch.set()
+            self._prefetch_thread.join()
+
+        if self._capture is not None:
+            self._capture.release()
+
     def execute(self) -> StageResult:
         """
         Get a video frame from a video file.
@@ -81,7 +181,7 @@ class GetVideoFrame(Stage, FrameMixin, CaptureMixin):
         return result
 
     def _execute_video_file(self) -> StageResult:
-        success, frame = self._capture.read()
+        success, frame = self._next_frame()
 
         self.frame = Frame(frame, self._frame_number)
         self._frame_number += 1
@@ -89,9 +189,9 @@ class GetVideoFrame(Stage, FrameMixin, CaptureMixin):
         return StageResult(success, success)
 
     def _execute_image_directory(self) -> StageResult:
-        frame = cv2.imread(f"{self._video_path}/{self._files[self._frame_number - 1]}")
+        _, frame = self._next_frame()
 
         self.frame = Frame(frame, self._frame_number)
         self._frame_number += 1
 
-        return StageResult(self._frame_number <= self.frame_count, True)
+        return StageResult(self._frame_number <= self._stop_frame, True)
@@ -15,7 +15,7 @@ from pipeline.decorators import stage
 
 
 @stage("moving_foreground")
-@stage("shifted_masks")
+@stage("shifted_mask")
 @stage("frame")
 @save_video_result
 @show_result
@@ -27,25 +27,24 @@ class ApplyMasks(Stage, MovingForegroundMixin):
     def __init__(
         self,
         moving_foreground: MovingForegroundMixin,
-        shifted_masks: ShiftedMasksMixin,
+        shifted_mask: ShiftedMasksMixin,
         frame: FrameMixin,
     ) -> None:
         Stage.__init__(self)
         MovingForegroundMixin.__init__(self)
 
         self._moving_foreground = moving_foreground
-        self._shifted_masks = shifted_masks
+        self._shifted_mask = shifted_mask
         self._frame = frame
 
     def execute(self) -> StageResult:
         # This cleans up the edges after performing image registration.
-        for mask in self._shifted_masks.shifted_masks:
-            self.moving_foreground = Frame(
-                np.multiply(
-                    self._moving_foreground.moving_foreground.get_frame(),
-                    mask.get_frame(),
-                ),
-                self._frame.frame.get_frame_number(),
-            )
+        self.moving_foreground = Frame(
+            np.multiply(
+                self._moving_foreground.moving_foreground.get_frame(),
+                self._shifted_mask.shifted_mask.get_frame(),
+            ),
+            self._frame.frame.get_frame_number(),
+        )
 
         return StageResult(True, True)
@@ -3,6 +3,7 @@ Computes the moving foreground using the subcomponents previously computed
 """
 import math
 import numpy as np
+from numba import jit, prange
 from baboon_tracking.decorators.save_img_result import save_img_result
 
 from baboon_tracking.mixins.foreground_mixin import ForegroundMixin
@@ -18,6 +19,77 @@ from pipeline.stage_result import StageResult
 from pipeline.decorators import config, stage
 
 
+@jit(nopython=True)
+def _gray_level(value, low, high):
+    # The medium test is an or of both bounds, so every value counts as medium.
+    level = 0
+    if value <= low:
+        level += 1
+    if low < value or value < high:
+        level += 2
+    if value >= high:
+        level += 3
+
+    return level
+
+
+@jit(nopython=True, parallel=True)
+def _moving_foreground(
+    weights,
+    foreground,
+    dissimilarity,
+    weights_low,
+    weights_high,
+    gray_low,
+    gray_high,
+    output,
+):
+    for y in prange(weights.shape[0]):
+        for x in range(weights.shape[1]):
+            weight = weights[y, x]
+
+            weight_level = 0
+            if weight <= weights_low:
+                weight_level += 1
+            if weights_low < weight < weights_high:
+                weight_level += 2
+
+            foreground_level = _gray_level(foreground[y, x], gray_low, gray_high)
+            dissimilarity_level = _gray_level(dissimilarity[y, x], gray_low, gray_high)
+
+            if (weight_level == 2 and foreground_level >= dissimilarity_level) or (
+                weight_level == 1
+                and dissimilarity_level == 1
+                and foreground_level > dissimilarity_level
+            ):
+                output[y, x] = 255
+            else:
+                output[y, x] = 0
+
+
+def get_moving_foreground(weights, foreground, dissimilarity, history_frames, out):
+    """
+    Calculates moving foreground into out according to figure 14 of paper
+    Each of W and D (weights and dissimilarity) is assigned to high, medium, and low
+
+    Medium commonality AND low commonality but low dissimiliarity are considered moving foreground
+    Otherwise, it is either a still or flickering background
+    """
+    history_frame_count_third = math.floor(float(history_frames - 1) / 3)
+    third_gray = 255.0 / 3.0
+
+    _moving_foreground(
+        weights,
+        foreground,
+        dissimilarity,
+        history_frame_count_third,
+        history_frames - 1,
+        math.floor(third_gray),
+        math.floor(2 * third_gray),
+        out,
+    )
+
+
 @stage("history_of_dissimilarity")
 @stage("foreground")
 @stage("weights")
@@ -45,6 +117,7 @@ class ComputeMovingForeground(Stage, MovingForegroundMixin):
         self._weights = weights
         self._frame = frame_mixin
         self._history_frames = history_frames
+        self._output: np.ndarray = None
 
     def execute(self) -> StageResult:
         weights = self._weights.weights
@@ -61,63 +134,11 @@ class ComputeMovingForeground(Stage, MovingForegroundMixin):
         return StageResult(True, True)
 
     def _get_moving_foreground(self, weights, foreground, dissimilarity):
-        """
-        Calculates moving foreground according to figure 14 of paper
-        Each of W and D (weights and dissimilarity) is assigned to high, medium, and low
-
-        Medium commonality AND low commonality but low dissimiliarity are considered moving foreground
-        Otherwise, it is either a still or flickering background
-
-        Return frame representing moving foreground
-        """
-
-        history_frame_count_third = math.floor(float(self._history_frames - 1) / 3)
-        third_gray = 255.0 / 3.0
-
-        weights_low = (weights <= history_frame_count_third).astype(np.uint8)
-        weights_medium = (
-            np.logical_and(
-                history_frame_count_third < weights, weights < self._history_frames - 1
-            ).astype(np.uint8)
-            * 2
-        )
+        if self._output is None or self._output.shape != weights.shape:
+            self._output = np.empty(weights.shape, dtype=np.uint8)
 
-        weight_levels = weights_low + weights_medium
-
-        foreground_low = (foreground <= math.floor(third_gray)).astype(np.uint8)
-        foreground_medium = (
-            (math.floor(third_gray) < foreground)
-            + (foreground < math.floor(2 * third_gray))
-        ).astype(np.uint8) * 2
-        foreground_high = (foreground >= math.floor(2 * third_gray)).astype(
-            np.uint8
-        ) * 3
-
-        foreground_levels = foreground_low + foreground_medium + foreground_high
-
-        dissimilarity_low = (dissimilarity <= math.floor(third_gray)).astype(np.uint8)
-        dissimilarity_medium = (
-            (math.floor(third_gray) < dissimilarity)
-            + (dissimilarity < math.floor(2 * third_gray))
-        ).astype(np.uint8) * 2
-        dissimilarity_high = (dissimilarity >= math.floor(2 * third_gray)).astype(
-            np.uint8
-        ) * 3
-
-        dissimilarity_levels = (
-            dissimilarity_low + dissimilarity_medium + dissimilarity_high
+        get_moving_foreground(
+            weights, foreground, dissimilarity, self._history_frames, self._output
         )
 
-        moving_foreground = np.logical_and(
-            weight_levels == 2,
-            np.greater_equal(foreground_levels, dissimilarity_levels),
-        ).astype(np.uint8)
-        moving_foreground = moving_foreground + np.logical_and(
-            weight_levels == 1,
-            np.logical_and(
-                dissimilarity_levels == 1,
-                np.greater(foreground_levels, dissimilarity_levels),
-            ),
-        ).astype(np.uint8)
-
-        return moving_foreground * 255
+        return self._output
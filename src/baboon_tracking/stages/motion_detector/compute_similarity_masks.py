@@ -0,0 +1,57 @@
+"""
+Computes which pixels are similar between consecutive quantized history frames.
+"""
+
+import cv2
+import numpy as np
+from baboon_tracking.mixins.quantized_frames_mixin import QuantizedFramesMixin
+from baboon_tracking.mixins.similarity_masks_mixin import SimilarityMasksMixin
+from pipeline import Stage
+from pipeline.decorators import stage
+from pipeline.stage_result import StageResult
+
+
+def compute_similarity_masks(
+    quantized_frames: np.ndarray, differences: np.ndarray, out: np.ndarray
+):
+    """
+    Computes into out which pixels are similar between consecutive quantized frames.
+    differences is a uint8 buffer of the same shape as out.
+    """
+    # Quantized frames are unsigned, so the difference is taken with cv2.absdiff,
+    # which does not wrap around.  The stacks are viewed as one tall image.
+    width = quantized_frames.shape[2]
+    cv2.absdiff(
+        quantized_frames[1:].reshape(-1, width),
+        quantized_frames[:-1].reshape(-1, width),
+        dst=differences.reshape(-1, width),
+    )
+    np.less_equal(differences, 1, out=out)
+
+
+@stage("quantized_frames")
+class ComputeSimilarityMasks(Stage, SimilarityMasksMixin):
+    """
+    Computes which pixels are similar between consecutive quantized history frames.
+    """
+
+    def __init__(self, quantized_frames: QuantizedFramesMixin) -> None:
+        Stage.__init__(self)
+        SimilarityMasksMixin.__init__(self)
+
+        self._quantized_frames = quantized_frames
+        self._differences: np.ndarray = None
+
+    def execute(self) -> StageResult:
+        quantized_frames = self._quantized_frames.quantized_frames
+
+        shape = (len(quantized_frames) - 1,) + quantized_frames.shape[1:]
+        if self._differences is None or self._differences.shape != shape:
+            self._differences = np.empty(shape, dtype=quantized_frames.dtype)
+            self.similarity_masks = np.empty(shape, dtype=bool)
+
+        compute_similarity_masks(
+            quantized_frames, self._differences, self.similarity_masks
+        )
+
+        return StageResult(True, True)
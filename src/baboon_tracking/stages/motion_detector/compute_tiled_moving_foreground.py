@@ -0,0 +1,234 @@
+"""
+Computes the noise reduced moving foreground one tile of the frame at a time.
+"""
+import math
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+from baboon_tracking.decorators.save_video_result import save_video_result
+from baboon_tracking.decorators.show_result import show_result
+from baboon_tracking.mixins.history_frames_mixin import HistoryFramesMixin
+from baboon_tracking.mixins.moving_foreground_mixin import MovingForegroundMixin
+from baboon_tracking.mixins.preprocessed_frame_mixin import PreprocessedFrameMixin
+from baboon_tracking.mixins.shifted_masks_mixin import ShiftedMasksMixin
+from baboon_tracking.mixins.transformation_matrices_mixin import (
+    TransformationMatricesMixin,
+)
+from baboon_tracking.models.frame import Frame
+from baboon_tracking.stages.motion_detector.compute_moving_foreground import (
+    get_moving_foreground,
+)
+from baboon_tracking.stages.motion_detector.compute_similarity_masks import (
+    compute_similarity_masks,
+)
+from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.intersect_frames import (
+    intersect_frames,
+)
+from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.subtract_background import (
+    subtract_background,
+)
+from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.union_intersections import (
+    union_frames,
+)
+from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.generate_history_of_dissimilarity import (
+    get_history_of_dissimilarity,
+)
+from baboon_tracking.stages.motion_detector.generate_weights import get_weights
+from baboon_tracking.stages.motion_detector.noise_reduction.db_scan_filter import (
+    remove_noise,
+)
+from baboon_tracking.stages.motion_detector.quantize_history_frames import (
+    get_quantize_lookup_table,
+    quantize_frames,
+)
+from pipeline import Stage
+from pipeline.decorators import config, stage
+from pipeline.stage_result import StageResult
+
+
+@show_result
+@save_video_result
+@config(parameter_name="tile_size", key="motion_detector/tiling/tile_size")
+@config(parameter_name="halo", key="motion_detector/tiling/halo")
+@config(parameter_name="history_frame_count", key="motion_detector/history_frames")
+@config(
+    parameter_name="scale_factor", key="motion_detector/quantize_frames/scale_factor"
+)
+@config(parameter_name="dbscan_eps", key="motion_detector/dbscan/eps")
+@config(parameter_name="dbscan_min_samples", key="motion_detector/dbscan/min_samples")
+@config(parameter_name="kernel", key="motion_detector/dbscan/kernel")
+@config(parameter_name="method", key="motion_detector/dbscan/method")
+@stage("history_frames")
+@stage("transformation_matrices")
+@stage("shifted_mask")
+@stage("preprocessed_frame")
+class ComputeTiledMovingForeground(Stage, MovingForegroundMixin):
+    """
+    Computes the noise reduced moving foreground one tile of the frame at a time.
+
+    Runs the work of ShiftHistoryFrames through DbScanFilter on each tile, so only
+    the tile's history stack, masks and weights are held in memory.  Each tile is
+    computed with a halo of neighbouring pixels, which the noise reduction needs,
+    and only its interior is kept.  The result is the same as the untiled stages.
+    """
+
+    def __init__(
+        self,
+        tile_size: int,
+        halo: int,
+        history_frame_count: int,
+        scale_factor: float,
+        dbscan_eps: float,
+        dbscan_min_samples: int,
+        kernel: int,
+        method: str,
+        history_frames: HistoryFramesMixin,
+        transformation_matrices: TransformationMatricesMixin,
+        shifted_mask: ShiftedMasksMixin,
+        preprocessed_frame: PreprocessedFrameMixin,
+    ) -> None:
+        Stage.__init__(self)
+        MovingForegroundMixin.__init__(self)
+
+        required_halo = 2 * math.floor(dbscan_eps) + 2 * (kernel // 2)
+        if halo < required_halo:
+            raise ValueError(
+                f"A tiling halo of {halo} is too small, "
+                f"the noise reduction needs at least {required_halo}."
+            )
+
+        self._tile_size = tile_size
+        self._halo = halo
+        self._history_frame_count = history_frame_count
+        self._lookup_table = get_quantize_lookup_table(scale_factor)
+        self._dbscan_eps = dbscan_eps
+        self._dbscan_min_samples = dbscan_min_samples
+        self._kernel = kernel
+        self._method = method
+
+        self._history_frames = history_frames
+        self._transformation_matrices = transformation_matrices
+        self._shifted_mask = shifted_mask
+        self._preprocessed_frame = preprocessed_frame
+
+        self._buffers: Dict[Tuple[int, int, int], Dict[str, np.ndarray]] = {}
+        self._output: np.ndarray = None
+
+    def _get_buffers(self, count: int, height: int, width: int):
+        # Tiles near the edges of the frame are cut short, so there is a set of
+        # buffers for each tile shape.  Each axis can have several tile sizes, more
+        # when the halo spans several tiles, and the shapes combine both axes.
+        # They are cleared when the frame size changes.
+        key = (count, height, width)
+        if key not in self._buffers:
+            stack = (count, height, width)
+            pairs = (count - 1, height, width)
+
+            self._buffers[key] = {
+                "shifted": np.empty(stack, dtype=np.uint8),
+                "quantized": np.empty(stack, dtype=np.uint8),
+                "differences": np.empty(pairs, dtype=np.uint8),
+                "similarity_masks": np.empty(pairs, dtype=bool),
+                "dissimilarity_parts": np.empty(pairs, dtype=np.uint8),
+                "intersected": np.empty(pairs, dtype=np.uint8),
+                "weights": np.empty((height, width), dtype=np.uint8),
+                "union": np.empty((height, width), dtype=np.uint8),
+                "moving_foreground": np.empty((height, width), dtype=np.uint8),
+            }
+
+        return self._buffers[key]
+
+    def _compute_tile(self, top: int, bottom: int, left: int, right: int):
+        history_frames = self._history_frames.history_frames
+        transformation_matrices = self._transformation_matrices.transformation_matrices
+        frame = self._preprocessed_frame.processed_frame.get_frame()
+        shifted_mask = self._shifted_mask.shifted_mask.get_frame()
+
+        height = bottom - top
+        width = right - left
+        buffers = self._get_buffers(len(history_frames), height, width)
+
+        # Moves the tile's top left corner to the origin of the warped image.
+        translation = np.array([[1.0, 0.0, -left], [0.0, 1.0, -top], [0.0, 0.0, 1.0]])
+
+        shifted = buffers["shifted"]
+        for history_frame, M, dst in zip(
+            history_frames, transformation_matrices, shifted
+        ):
+            cv2.warpPerspective(
+                history_frame.get_frame(), translation @ M, (width, height), dst=dst
+            )
+
+        similarity_masks = buffers["similarity_masks"]
+        quantize_frames(shifted, self._lookup_table, buffers["quantized"])
+        compute_similarity_masks(
+            buffers["quantized"], buffers["differences"], similarity_masks
+        )
+
+        weights = get_weights(similarity_masks, out=buffers["weights"])
+        dissimilarity = get_history_of_dissimilarity(
+            shifted, similarity_masks, buffers["dissimilarity_parts"]
+        )
+
+        intersect_frames(shifted, similarity_masks, buffers["intersected"])
+        union_frames(buffers["intersected"], buffers["union"])
+        foreground = subtract_background(
+            frame[top:bottom, left:right],
+            buffers["union"],
+            weights,
+            self._history_frame_count,
+        )
+
+        moving_foreground = buffers["moving_foreground"]
+        get_moving_foreground(
+            weights,
+            foreground,
+            dissimilarity,
+            self._history_frame_count,
+            moving_foreground,
+        )
+        np.multiply(
+            moving_foreground,
+            shifted_mask[top:bottom, left:right],
+            out=moving_foreground,
+        )
+
+        return remove_noise(
+            moving_foreground,
+            self._dbscan_eps,
+            self._dbscan_min_samples,
+            self._kernel,
+            self._method,
+        )
+
+    def execute(self) -> StageResult:
+        processed_frame = self._preprocessed_frame.processed_frame
+        height, width = processed_frame.get_frame().shape
+
+        if self._output is None or self._output.shape != (height, width):
+            self._output = np.empty((height, width), dtype=np.uint8)
+            self._buffers.clear()
+
+        for y in range(0, height, self._tile_size):
+            for x in range(0, width, self._tile_size):
+                bottom = min(y + self._tile_size, height)
+                right = min(x + self._tile_size, width)
+
+                top = max(y - self._halo, 0)
+                left = max(x - self._halo, 0)
+
+                tile = self._compute_tile(
+                    top,
+                    min(bottom + self._halo, height),
+                    left,
+                    min(right + self._halo, width),
+                )
+
+                self._output[y:bottom, x:right] = tile[
+                    y - top : bottom - top, x - left : right - left
+                ]
+
+        self.moving_foreground = Frame(self._output, processed_frame.get_frame_number())
+
+        return StageResult(True, True)
@@ -1,6 +1,8 @@
 """
 Compute the transformation matrices between the current frame and the historical frames.
 """
+from typing import Deque, Dict, Tuple
+
 import cv2
 import numpy as np
 from baboon_tracking.mixins.history_frames_mixin import HistoryFramesMixin
@@ -15,6 +17,47 @@ from pipeline.stage_result import StageResult
 from third_party.ssc import ssc
 
 
+def _get_best_matches(distances: np.ndarray, count: int) -> np.ndarray:
+    """
+    Gets the indexes of the count smallest distances, in the order a stable sort
+    would give them.
+    """
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    kth = np.partition(distances, count - 1)[count - 1]
+    below = np.flatnonzero(distances < kth)
+    equal = np.flatnonzero(distances == kth)[: count - below.size]
+
+    best = np.concatenate((below, equal))
+    return best[np.lexsort((best, distances[best]))]
+
+
+def _match_features(
+    descriptors1: np.ndarray, descriptors2: np.ndarray, good_match_percent: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matches each descriptor to its nearest neighbour and keeps the best matches, in
+    order of score.  Returns the query and train indexes of the kept matches.
+    """
+    # This is the brute force Hamming matcher's own kernel, which gives the matches
+    # as arrays instead of DMatch objects.
+    distances, train_idx = cv2.batchDistance(
+        descriptors1,
+        descriptors2,
+        cv2.CV_32S,
+        normType=cv2.NORM_HAMMING,
+        K=1,
+    )
+    distances = distances.reshape(-1)
+    train_idx = train_idx.reshape(-1)
+
+    num_good_matches = int(distances.size * good_match_percent)
+    query_idx = _get_best_matches(distances, num_good_matches)
+
+    return query_idx, train_idx[query_idx]
+
+
 @config(
     parameter_name="good_match_percent",
     key="motion_detector/registration/good_match_percent",
@@ -31,11 +74,23 @@ from third_party.ssc import ssc
     parameter_name="ssc_tolerence",
     key="motion_detector/registration/ssc_tolerence",
 )
+@config(
+    parameter_name="incremental",
+    key="motion_detector/registration/incremental",
+)
+@config(
+    parameter_name="reregistration_interval",
+    key="motion_detector/registration/reregistration_interval",
+)
 @stage("preprocessed_frame")
 @stage("history_frames")
 class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
     """
     Compute the transformation matrices between the current frame and the historical frames.
+
+    In incremental mode only consecutive frames are registered.  The transformation
+    from each history frame is chained from the cached transformations, and is
+    registered directly again after "reregistration_interval" links to bound drift.
     """
 
     def __init__(
@@ -44,6 +99,8 @@ class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
         ransac_max_error: float,
         ssc_num_ret_points: int,
         ssc_tolerence: float,
+        incremental: bool,
+        reregistration_interval: int,
         preprocessed_frame: PreprocessedFrameMixin,
         history_frames: HistoryFramesMixin,
     ):
@@ -57,6 +114,12 @@ class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
         self._ransac_max_error = ransac_max_error
         self._ssc_num_ret_points = ssc_num_ret_points
         self._ssc_tolerence = ssc_tolerence
+        self._incremental = incremental
+        self._reregistration_interval = reregistration_interval
+
+        # The transformation from each history frame to the previous frame, and the
+        # number of registrations chained to compute it.
+        self._chained_transformations: Dict[Frame, Tuple[np.ndarray, int]] = {}
 
         self._preprocessed_frame = preprocessed_frame
         self._history_frames = history_frames
@@ -68,17 +131,14 @@ class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
             keypoints = self._fast.detect(frame.get_frame(), None)
             keypoints = ssc(
                 keypoints,
-                10000,
-                0.1,
+                self._ssc_num_ret_points,
+                self._ssc_tolerence,
                 frame.get_frame().shape[1],
                 frame.get_frame().shape[0],
             )
-            descriptors = self._orb.compute(frame.get_frame(), keypoints)
-
-            keypoints = descriptors[0]
-            descriptors = descriptors[1]
+            keypoints, descriptors = self._orb.compute(frame.get_frame(), keypoints)
 
-            self._feature_hash[frame] = (keypoints, descriptors)
+            self._feature_hash[frame] = (cv2.KeyPoint_convert(keypoints), descriptors)
 
         return self._feature_hash[frame]
 
@@ -87,25 +147,13 @@ class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
         keypoints2, descriptors2 = self._detect_and_compute(frame2)
 
         # Match features.
-        matcher = cv2.DescriptorMatcher_create(
-            cv2.DESCRIPTOR_MATCHER_BRUTEFORCE_HAMMING
+        query_idx, train_idx = _match_features(
+            descriptors1, descriptors2, self._good_match_percent
         )
-        matches = list(matcher.match(descriptors1, descriptors2, None))
-
-        # Sort matches by score
-        matches.sort(key=lambda x: x.distance, reverse=False)
-
-        # Remove not so good matches
-        num_good_matches = int(len(matches) * self._good_match_percent)
-        matches = matches[:num_good_matches]
 
         # Extract location of good matches
-        points1 = np.zeros((len(matches), 2), dtype=np.float32)
-        points2 = np.zeros((len(matches), 2), dtype=np.float32)
-
-        for i, match in enumerate(matches):
-            points1[i, :] = keypoints1[match.queryIdx].pt
-            points2[i, :] = keypoints2[match.trainIdx].pt
+        points1 = keypoints1[query_idx]
+        points2 = keypoints2[train_idx]
 
         # Find homography
         transformation_matrix, _ = cv2.findHomography(
@@ -125,6 +173,10 @@ class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
         processed_frame = self._preprocessed_frame.processed_frame
         history_frames = self._history_frames.history_frames
 
+        if self._incremental:
+            self._register_incremental(processed_frame, history_frames)
+            return StageResult(True, True)
+
         self.transformation_matrices = [
             self._register(f, processed_frame) for f in history_frames
         ]
@@ -133,3 +185,53 @@ class ComputeTransformationMatrices(Stage, TransformationMatricesMixin):
         )
 
         return StageResult(True, True)
+
+    def _register_incremental(
+        self, processed_frame: Frame, history_frames: Deque[Frame]
+    ):
+        previous_frame = history_frames[-1]
+        step = self._register(previous_frame, processed_frame)
+
+        chained_transformations = {}
+        for frame in history_frames:
+            if frame is previous_frame:
+                chained_transformations[frame] = (step, 1)
+                continue
+
+            transformation_matrix, links = self._chained_transformations.get(
+                frame, (None, 0)
+            )
+            links += 1
+
+            if (
+                step is None
+                or transformation_matrix is None
+                or (
+                    self._reregistration_interval
+                    and links > self._reregistration_interval
+                )
+            ):
+                chained_transformations[frame] = (
+                    self._register(frame, processed_frame),
+                    1,
+                )
+                continue
+
+            transformation_matrix = np.matmul(step, transformation_matrix)
+            chained_transformations[frame] = (
+                transformation_matrix / transformation_matrix[2, 2],
+                links,
+            )
+
+        self._chained_transformations = chained_transformations
+        self.transformation_matrices = [
+            chained_transformations[f][0] for f in history_frames
+        ]
+
+        if step is None:
+            self.current_frame_transformation = self._register(
+                processed_frame, previous_frame
+            )
+        else:
+            inverse = np.linalg.inv(step)
+            self.current_frame_transformation = inverse / inverse[2, 2]
@@ -1,34 +1,74 @@
 """
-Detect blobs using the built in OpenCV blob detector.
+Detect blobs using the built in OpenCV connected components.
 """
+from typing import Tuple
+
 import cv2
+import numpy as np
 from baboon_tracking.decorators.debug import debug
 from baboon_tracking.mixins.baboons_mixin import BaboonsMixin
-from baboon_tracking.mixins.frame_mixin import FrameMixin
 from baboon_tracking.mixins.moving_foreground_mixin import MovingForegroundMixin
 from baboon_tracking.models.region import Region
 
 from pipeline import Stage
-from pipeline.decorators import stage
+from pipeline.decorators import config, stage
 from pipeline.stage_result import StageResult
 
 
+def get_blobs(
+    foreground_mask: np.ndarray, min_size: int = 0, max_size: int = 0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gets the bounding boxes (x1, y1, x2, y2), areas and centroids of the blobs in a
+    foreground mask.  Blobs whose bounding box area is below min_size or above
+    max_size are dropped.  A size of 0 disables that limit.
+    """
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(
+        foreground_mask, connectivity=8, ltype=cv2.CV_32S
+    )
+
+    # The first component is the background.
+    stats = stats[1:]
+    centroids = centroids[1:]
+
+    boxes = np.empty((stats.shape[0], 4), dtype=np.int64)
+    boxes[:, :2] = stats[:, [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP]]
+    boxes[:, 2:] = boxes[:, :2] + stats[:, [cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT]]
+
+    box_areas = stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT]
+    keep = np.ones(box_areas.shape, dtype=bool)
+    if min_size:
+        keep &= box_areas >= min_size
+    if max_size:
+        keep &= box_areas <= max_size
+
+    return boxes[keep], stats[keep, cv2.CC_STAT_AREA], centroids[keep]
+
+
 @debug(MovingForegroundMixin, (0, 255, 0))
-@debug(FrameMixin, (0, 255, 0))
+@config("min_size", "motion_detector/detect_blobs/min_size")
+@config("max_size", "motion_detector/detect_blobs/max_size")
 @stage("moving_foreground")
 class DetectBlobs(Stage, BaboonsMixin):
     """
-    Detect blobs using the built in OpenCV blob detector.
+    Detect blobs using the built in OpenCV connected components.
     """
 
     def __init__(
         self,
+        min_size: int,
+        max_size: int,
         moving_foreground: MovingForegroundMixin,
     ) -> None:
         BaboonsMixin.__init__(self)
 
+        self._min_size = min_size
+        self._max_size = max_size
         self._moving_foregrouned = moving_foreground
 
+        self.areas: np.ndarray = None
+        self.centroids: np.ndarray = None
+
         Stage.__init__(self)
 
     def execute(self) -> StageResult:
@@ -39,11 +79,9 @@ class DetectBlobs(Stage, BaboonsMixin):
 
         foreground_mask = self._moving_foregrouned.moving_foreground.get_frame()
 
-        contours, _ = cv2.findContours(
-            foreground_mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE
+        boxes, self.areas, self.centroids = get_blobs(
+            foreground_mask, self._min_size, self._max_size
         )
-        rectangles = [cv2.boundingRect(c) for c in contours]
-        rectangles = [(r[0], r[1], r[0] + r[2], r[1] + r[3]) for r in rectangles]
 
-        self.baboons = [Region(r) for r in rectangles]
+        self.baboons = [Region(r) for r in boxes.tolist()]
         return StageResult(True, True)
@@ -3,9 +3,9 @@ Calculate the foreground of the current frame.
 """
 from typing import Dict
 
-from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.group_frames import (
-    GroupFrames,
-)
+# from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.group_frames import (
+#     GroupFrames,
+# )
 from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.intersect_frames import (
     IntersectFrames,
 )
@@ -30,7 +30,7 @@ class Foreground(Serial):
             self,
             "Foreground",
             rconfig,
-            GroupFrames,
+            # GroupFrames,
             IntersectFrames,
             UnionIntersections,
             SubtractBackground,
@@ -1,58 +1,62 @@
 "Intersect frames to pull out the foreground."
 import numpy as np
 from baboon_tracking.mixins.intersected_frames_mixin import IntersectedFramesMixin
-from baboon_tracking.mixins.group_shifted_history_frames_mixin import (
-    GroupShiftedHistoryFramesMixin,
+from baboon_tracking.mixins.shifted_history_frames_mixin import (
+    ShiftedHistoryFramesMixin,
 )
+from baboon_tracking.mixins.similarity_masks_mixin import SimilarityMasksMixin
 
 from pipeline import Stage
 from pipeline.decorators import stage
 from pipeline.stage_result import StageResult
 
 
-@stage("group_shifted_history_frames")
+def intersect_frames(frames: np.ndarray, similarity_masks: np.ndarray, out: np.ndarray):
+    """
+    Intersect each pair of consecutive frames into out to find common background
+    between those two frames
+    """
+    np.copyto(out, frames[:-1])
+    np.copyto(out, 0, where=similarity_masks)
+
+
+@stage("shifted_history_frames")
+@stage("similarity_masks")
 class IntersectFrames(Stage, IntersectedFramesMixin):
     "Intersect frames to pull out the foreground."
 
     def __init__(
-        self, group_shifted_history_frames: GroupShiftedHistoryFramesMixin
+        self,
+        shifted_history_frames: ShiftedHistoryFramesMixin,
+        similarity_masks: SimilarityMasksMixin,
     ) -> None:
         Stage.__init__(self)
         IntersectedFramesMixin.__init__(self)
-        self._group_shifted_history_frames = group_shifted_history_frames
+        self._shifted_history_frames = shifted_history_frames
+        self._similarity_masks = similarity_masks
 
     def execute(self) -> StageResult:
-        grouped_shifted_history_frames = (
-            self._group_shifted_history_frames.grouped_shifted_history_frames
-        )
-        grouped_quantized_frames = (
-            self._group_shifted_history_frames.grouped_quantized_frames
-        )
+        shifted_history_stack = self._shifted_history_frames.shifted_history_stack
+        similarity_masks = self._similarity_masks.similarity_masks
 
         self.intersected_frames = self._intersect_all_frames(
-            grouped_shifted_history_frames, grouped_quantized_frames
+            shifted_history_stack, similarity_masks
         )
 
         return StageResult(True, True)
 
-    def _intersect_frames(self, frames, q_frames):
+    def _intersect_all_frames(self, frames, similarity_masks):
         """
-        Intersect two consecutive frames to find common background between those two frames
-        Returns the single frame produced by intersection
+        Intersect each pair of consecutive frames to find common background between
+        those two frames
+        Returns array of intersects
         """
-        mask = np.abs(q_frames[0] - q_frames[1]) <= 1
-        combined = frames[0].get_frame().copy()
-        combined[mask] = 0
+        if (
+            not isinstance(self.intersected_frames, np.ndarray)
+            or self.intersected_frames.shape != similarity_masks.shape
+        ):
+            self.intersected_frames = np.empty(similarity_masks.shape, dtype=np.uint8)
 
-        return combined
+        intersect_frames(frames, similarity_masks, self.intersected_frames)
 
-    def _intersect_all_frames(
-        self, grouped_shifted_history_frames, grouped_quantized_frames
-    ):
-        """
-        Takes in two lists of frames, performs intersect on each pair and returns array of intersects
-        """
-        return [
-            self._intersect_frames(z[0], z[1])
-            for z in zip(grouped_shifted_history_frames, grouped_quantized_frames)
-        ]
+        return self.intersected_frames
@@ -15,6 +15,31 @@ from pipeline.decorators import config, stage
 from pipeline.stage_result import StageResult
 
 
+def _zero_weights(frame, weights, history_frames):
+    """
+    Gets foreground of frame by zeroing out all pixels with large weights,
+    i.e. pixels in which frequency of commonality
+    is really high, meaning that it hasn't changed much or at all in the
+    history frames, according to figure 13 of paper
+    Returns frame representing the foreground
+    """
+    f = frame.copy()
+    f[weights >= history_frames - 1] = 0
+
+    return f
+
+
+def subtract_background(frame, union, weights, history_frames):
+    """
+    Subtracts the union of the history frames from the frame where the weights
+    show the pixel has changed.
+    """
+    return cv2.absdiff(
+        _zero_weights(frame, weights, history_frames),
+        _zero_weights(union, weights, history_frames),
+    )
+
+
 @stage("preprocessed_frame")
 @stage("unioned_frames")
 @stage("weights")
@@ -48,24 +73,11 @@ class SubtractBackground(Stage, ForegroundMixin):
         union = self._unioned_frames.unioned_frames
         weights = self._weights.weights
 
-        frame_new = self._zero_weights(frame.get_frame(), weights)
-        union_new = self._zero_weights(union, weights)
-
         self.foreground = Frame(
-            cv2.absdiff(frame_new, union_new), self._frame.frame.get_frame_number()
+            subtract_background(
+                frame.get_frame(), union, weights, self._history_frames
+            ),
+            self._frame.frame.get_frame_number(),
         )
 
         return StageResult(True, True)
-
-    def _zero_weights(self, frame, weights):
-        """
-        Gets foreground of frame by zeroing out all pixels with large weights,
-        i.e. pixels in which frequency of commonality
-        is really high, meaning that it hasn't changed much or at all in the
-        history frames, according to figure 13 of paper
-        Returns frame representing the foreground
-        """
-        f = frame.copy()
-        f[weights >= self._history_frames - 1] = 0
-
-        return f
@@ -2,6 +2,7 @@
 Union frames that were previously intersected.
 """
 import numpy as np
+from numba import jit
 
 from baboon_tracking.mixins.intersected_frames_mixin import IntersectedFramesMixin
 from baboon_tracking.mixins.unioned_frames_mixin import UnionedFramesMixin
@@ -10,6 +11,27 @@ from pipeline.decorators import stage
 from pipeline.stage_result import StageResult
 
 
+@jit(nopython=True)
+def _union_frames(frames, union):
+    for y in range(frames.shape[1]):
+        for x in range(frames.shape[2]):
+            value = 0
+            for i in range(frames.shape[0] - 1, -1, -1):
+                if frames[i, y, x] != 0:
+                    value = frames[i, y, x]
+                    break
+
+            union[y, x] = value
+
+
+def union_frames(frames: np.ndarray, out: np.ndarray):
+    """
+    Union all frame intersections into out to produce acting background for all
+    frames.  Each pixel takes its value from the newest frame where it is not zero.
+    """
+    _union_frames(frames, out)
+
+
 @stage("intersected_frames")
 class UnionIntersections(Stage, UnionedFramesMixin):
     """
@@ -21,6 +43,7 @@ class UnionIntersections(Stage, UnionedFramesMixin):
         UnionedFramesMixin.__init__(self)
 
         self._intersected_frames = intersected_frames
+        self._union: np.ndarray = None
 
     def execute(self) -> StageResult:
         intersected_frames = self._intersected_frames.intersected_frames
@@ -31,14 +54,12 @@ class UnionIntersections(Stage, UnionedFramesMixin):
     def _union_frames(self, frames):
         """
         Union all frame intersections to produce acting background for all frames
+        Each pixel takes its value from the newest frame where it is not zero
         Returns the single union frame produced by unioning all frames in input
         """
-        union = np.zeros(frames[0].shape, dtype=np.uint8)
-
-        f_copy = frames.copy()
-        f_copy.reverse()
+        if self._union is None or self._union.shape != frames.shape[1:]:
+            self._union = np.empty(frames.shape[1:], dtype=np.uint8)
 
-        for f in f_copy:
-            union[union == 0] = f[union == 0]
+        union_frames(frames, self._union)
 
-        return union
+        return self._union
@@ -9,10 +9,10 @@ from baboon_tracking.mixins.frame_mixin import FrameMixin
 from baboon_tracking.mixins.history_of_dissimilarity_mixin import (
     HistoryOfDissimilarityMixin,
 )
-from baboon_tracking.mixins.quantized_frames_mixin import QuantizedFramesMixin
 from baboon_tracking.mixins.shifted_history_frames_mixin import (
     ShiftedHistoryFramesMixin,
 )
+from baboon_tracking.mixins.similarity_masks_mixin import SimilarityMasksMixin
 from library.utils import scale_ndarray
 
 from pipeline import Stage
@@ -20,8 +20,30 @@ from pipeline.decorators import stage
 from pipeline.stage_result import StageResult
 
 
+def get_history_of_dissimilarity(
+    frames: np.ndarray, similarity_masks: np.ndarray, parts: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate history of dissimilarity according to figure 10 of paper
+    parts is a uint8 buffer of the same shape as similarity_masks
+    Returns frame representing history of dissimilarity
+    """
+    # cv2.absdiff works on 2-D images, so the stacks are viewed as one tall image.
+    width = frames.shape[2]
+    cv2.absdiff(
+        frames[1:].reshape(-1, width),
+        frames[:-1].reshape(-1, width),
+        dst=parts.reshape(-1, width),
+    )
+    np.copyto(parts, 0, where=similarity_masks)
+
+    dissimilarity = np.sum(parts, axis=0, dtype=np.uint32)
+
+    return (dissimilarity // len(frames)).astype(np.uint8)
+
+
 @stage("shifted_history_frames")
-@stage("quantized_frames")
+@stage("similarity_masks")
 @stage("frame")
 @save_img_result
 class GenerateHistoryOfDissimilarity(Stage, HistoryOfDissimilarityMixin):
@@ -32,22 +54,23 @@ class GenerateHistoryOfDissimilarity(Stage, HistoryOfDissimilarityMixin):
     def __init__(
         self,
         shifted_history_frames: ShiftedHistoryFramesMixin,
-        quantized_frames: QuantizedFramesMixin,
+        similarity_masks: SimilarityMasksMixin,
         frame: FrameMixin,
     ) -> None:
         Stage.__init__(self)
         HistoryOfDissimilarityMixin.__init__(self)
 
         self._shifted_history_frames = shifted_history_frames
-        self._quantized_frames = quantized_frames
+        self._similarity_masks = similarity_masks
         self._frame = frame
+        self._dissimilarity_parts: np.ndarray = None
 
     def execute(self) -> StageResult:
-        shifted_history_frames = self._shifted_history_frames.shifted_history_frames
-        quantized_frames = self._quantized_frames.quantized_frames
+        shifted_history_stack = self._shifted_history_frames.shifted_history_stack
+        similarity_masks = self._similarity_masks.similarity_masks
 
         self.history_of_dissimilarity = self._get_history_of_dissimilarity(
-            shifted_history_frames, quantized_frames
+            shifted_history_stack, similarity_masks
         )
         self.history_of_dissimilarity_frame = scale_ndarray(
             self.history_of_dissimilarity, self._frame.frame.get_frame_number()
@@ -55,22 +78,13 @@ class GenerateHistoryOfDissimilarity(Stage, HistoryOfDissimilarityMixin):
 
         return StageResult(True, True)
 
-    def _get_history_of_dissimilarity(self, frames, q_frames):
-        """
-        Calculate history of dissimilarity according to figure 10 of paper
-        Returns frame representing history of dissimilarity
-        """
-        dissimilarity = np.zeros(frames[0].get_frame().shape, dtype=np.uint32)
-
-        for i, _ in enumerate(frames):
-            if i == 0:
-                continue
+    def _get_history_of_dissimilarity(self, frames, similarity_masks):
+        if (
+            self._dissimilarity_parts is None
+            or self._dissimilarity_parts.shape != similarity_masks.shape
+        ):
+            self._dissimilarity_parts = np.empty(similarity_masks.shape, dtype=np.uint8)
 
-            mask = np.abs(q_frames[i] - q_frames[i - 1]) <= 1
-            dissimilarity_part = cv2.absdiff(
-                frames[i].get_frame(), frames[i - 1].get_frame()
-            )
-            dissimilarity_part[mask] = 0
-            dissimilarity += dissimilarity_part
-
-        return (dissimilarity / len(frames)).astype(np.uint8)
+        return get_history_of_dissimilarity(
+            frames, similarity_masks, self._dissimilarity_parts
+        )
@@ -4,7 +4,7 @@ Generates a set of weights to represent how often a pixel changes.
 import numpy as np
 
 from baboon_tracking.mixins.frame_mixin import FrameMixin
-from baboon_tracking.mixins.quantized_frames_mixin import QuantizedFramesMixin
+from baboon_tracking.mixins.similarity_masks_mixin import SimilarityMasksMixin
 from baboon_tracking.mixins.weights_mixin import WeightsMixin
 from baboon_tracking.decorators.save_img_result import save_img_result
 from library.utils import scale_ndarray
@@ -13,7 +13,16 @@ from pipeline.stage_result import StageResult
 from pipeline.decorators import stage
 
 
-@stage("quantized_frames")
+def get_weights(similarity_masks: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Calculate weights based on frequency of commonality between frames according
+    to figure 12 of paper
+    Returns frame representing frequency of commonality
+    """
+    return np.sum(similarity_masks, axis=0, dtype=np.uint8, out=out)
+
+
+@stage("similarity_masks")
 @stage("frame")
 @save_img_result
 class GenerateWeights(Stage, WeightsMixin):
@@ -22,37 +31,20 @@ class GenerateWeights(Stage, WeightsMixin):
     """
 
     def __init__(
-        self, quantized_frames: QuantizedFramesMixin, frame: FrameMixin
+        self, similarity_masks: SimilarityMasksMixin, frame: FrameMixin
     ) -> None:
         Stage.__init__(self)
         WeightsMixin.__init__(self)
 
-        self._quantized_frames = quantized_frames
+        self._similarity_masks = similarity_masks
         self._frame = frame
 
     def execute(self) -> StageResult:
-        quantized_frames = self._quantized_frames.quantized_frames
+        similarity_masks = self._similarity_masks.similarity_masks
 
-        self.weights = self._get_weights(quantized_frames)
+        self.weights = get_weights(similarity_masks)
         self.weights_frame = scale_ndarray(
             self.weights, self._frame.frame.get_frame_number()
         )
 
         return StageResult(True, True)
-
-    def _get_weights(self, q_frames):
-        """
-        Calculate weights based on frequency of commonality between frames according
-        to figure 12 of paper
-        Returns frame representing frequency of commonality
-        """
-        weights = np.zeros(q_frames[0].shape).astype(np.uint8)
-
-        for i, _ in enumerate(q_frames):
-            if i == 0:
-                continue
-
-            mask = (np.abs(q_frames[i] - q_frames[i - 1]) <= 1).astype(np.uint8)
-            weights = weights + mask
-
-        return weights
@@ -8,6 +8,12 @@ from baboon_tracking.stages.motion_detector.apply_masks import ApplyMasks
 from baboon_tracking.stages.motion_detector.compute_moving_foreground import (
     ComputeMovingForeground,
 )
+from baboon_tracking.stages.motion_detector.compute_similarity_masks import (
+    ComputeSimilarityMasks,
+)
+from baboon_tracking.stages.motion_detector.compute_tiled_moving_foreground import (
+    ComputeTiledMovingForeground,
+)
 from baboon_tracking.stages.motion_detector.compute_transformation_matrices import (
     ComputeTransformationMatrices,
 )
@@ -30,37 +36,57 @@ from baboon_tracking.stages.motion_detector.noise_reduction.db_scan_filter impor
 from baboon_tracking.stages.motion_detector.quantize_history_frames import (
     QuantizeHistoryFrames,
 )
+from baboon_tracking.stages.motion_detector.transformed_frames.compute_shifted_masks import (
+    ComputeShiftedMasks,
+)
 from baboon_tracking.stages.motion_detector.transformed_frames.transformed_frames import (
     TransformedFrames,
 )
+from baboon_tracking.stages.motion_detector.scale_regions import ScaleRegions
 from baboon_tracking.stages.motion_detector.store_history_frame import StoreHistoryFrame
 
 # from baboon_tracking.stages.save_video import SaveVideo
 from pipeline import Serial
-from pipeline.decorators import runtime_config
+from pipeline.decorators import config, runtime_config
 
 
+@config(parameter_name="tile_size", key="motion_detector/tiling/tile_size")
 @runtime_config("rconfig")
 class MotionDetector(Serial):
     """
     Implements a motion tracker pipeline.
+
+    When tiling/tile_size is set, the per-pixel stages run one tile at a time in
+    ComputeTiledMovingForeground, which bounds their memory on very large frames.
     """
 
-    def __init__(self, rconfig: Dict[str, any]):
+    def __init__(self, tile_size: int, rconfig: Dict[str, any]):
+        if tile_size:
+            moving_foreground_stages = (
+                ComputeShiftedMasks,
+                ComputeTiledMovingForeground,
+            )
+        else:
+            moving_foreground_stages = (
+                TransformedFrames,
+                QuantizeHistoryFrames,
+                ComputeSimilarityMasks,
+                GenerateWeights,
+                GenerateMaskSubcomponents,
+                ComputeMovingForeground,
+                ApplyMasks,
+                DbScanFilter,
+                # NoiseReduction,
+            )
+
         Serial.__init__(
             self,
             "MotionDetector",
             rconfig,
             StoreHistoryFrame,
             ComputeTransformationMatrices,
-            TransformedFrames,
-            QuantizeHistoryFrames,
-            GenerateWeights,
-            GenerateMaskSubcomponents,
-            ComputeMovingForeground,
-            ApplyMasks,
-            DbScanFilter,
-            # NoiseReduction,
+            *moving_foreground_stages,
             DetectBlobs,
             # MinSizeFilter,
+            ScaleRegions,
         )
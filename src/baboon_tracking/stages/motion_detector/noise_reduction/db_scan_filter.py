@@ -16,12 +16,90 @@ from pipeline.decorators import config, stage
 from pipeline.stage_result import StageResult
 
 
+def get_eps_kernel(eps: float) -> np.ndarray:
+    """
+    Gets a kernel covering every pixel offset within eps of its center.
+    """
+    radius = int(np.floor(eps))
+    y, x = np.mgrid[-radius : radius + 1, -radius : radius + 1]
+
+    return (x * x + y * y <= eps * eps).astype(np.uint8)
+
+
+def dbscan_mask(frame: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+    """
+    Keeps the pixels of the frame which DBSCAN does not consider noise.
+    """
+    x, y = np.where(frame == 255)
+    image = np.zeros((len(x), 2))
+    image[:, 0] = x
+    image[:, 1] = y
+
+    labels = DBSCAN(eps=eps, min_samples=min_samples).fit(image).labels_
+    image = image[labels != -1].astype(np.uint32)
+
+    mask = np.zeros_like(frame)
+    mask[image[:, 0], image[:, 1]] = 255
+
+    return mask
+
+
+def grid_dbscan_mask(frame: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+    """
+    Keeps the pixels of the frame which DBSCAN does not consider noise, computed on
+    the pixel grid.  A pixel is a core point if at least min_samples foreground pixels
+    are within eps of it, and it is kept if it is within eps of a core point.
+    """
+    kernel = get_eps_kernel(eps)
+    foreground = (frame == 255).astype(np.uint8)
+
+    density = cv2.filter2D(
+        foreground,
+        cv2.CV_32F,
+        kernel.astype(np.float32),
+        borderType=cv2.BORDER_CONSTANT,
+    )
+    # Large kernels are convolved with a DFT, so counts are compared with a margin.
+    core = ((density > min_samples - 0.5) & (foreground == 1)).astype(np.uint8)
+
+    mask = cv2.dilate(core, kernel)
+    mask &= foreground
+
+    return mask * 255
+
+
+def remove_noise(
+    frame: np.ndarray, eps: float, min_samples: int, kernel: int, method: str
+) -> np.ndarray:
+    """
+    Removes the pixels DBSCAN considers noise, then closes the gaps left in the
+    remaining blobs.  Pixels within 2 * floor(eps) + 2 * (kernel // 2) of the edge
+    of the frame depend on what lies beyond it.
+    """
+    if method == "grid":
+        noiseless_frame = grid_dbscan_mask(frame, eps, min_samples)
+    else:
+        noiseless_frame = np.zeros_like(frame)
+        try:
+            # creates clusters and eliminates noise from the 2dframe
+            noiseless_frame = dbscan_mask(frame, eps, min_samples)
+        except ValueError:
+            tqdm.write("Warning dbscan did not find anything.")
+
+    # applies dilate filter and saves the residual frame
+    kernel = np.ones((kernel, kernel), np.uint8)
+    dilated = cv2.dilate(noiseless_frame, kernel, iterations=1)
+
+    return cv2.erode(dilated, kernel, iterations=1)
+
+
 @show_result
 @save_video_result
 @save_img_result
 @config(parameter_name="dbscan_eps", key="motion_detector/dbscan/eps")
 @config(parameter_name="dbscan_min_samples", key="motion_detector/dbscan/min_samples")
 @config(parameter_name="kernel", key="motion_detector/dbscan/kernel")
+@config(parameter_name="method", key="motion_detector/dbscan/method")
 @stage("moving_foreground")
 class DbScanFilter(Stage, MovingForegroundMixin):
     """
@@ -34,6 +112,7 @@ class DbScanFilter(Stage, MovingForegroundMixin):
         dbscan_eps: int,
         dbscan_min_samples: int,
         kernel: int,
+        method: str,
         moving_foreground: MovingForegroundMixin,
     ) -> None:
         Stage.__init__(self)
@@ -42,46 +121,22 @@ class DbScanFilter(Stage, MovingForegroundMixin):
         self._dbscan_eps = dbscan_eps
         self._dbscan_min_samples = dbscan_min_samples
         self._kernel = kernel
+        self._method = method
 
         self._moving_foreground = moving_foreground
 
-    def _eliminate_noise(self, labels_array, frame_2d):
-        """
-        Takes the DBSCAN Labeled set and the 2d frame, then returns
-        the corrected frame and labels array
-        """
-        frame_2d = np.delete(frame_2d, np.where(labels_array == -1), axis=0)
-        labels_array = np.delete(labels_array, np.where(labels_array == -1), axis=0)
-
-        return frame_2d, labels_array
-
     def execute(self) -> StageResult:
         moving_foreground = self._moving_foreground.moving_foreground
         two_d_frame = moving_foreground.get_frame()
 
-        x, y = np.where(two_d_frame == 255)
-        image = np.zeros((len(x), 2))
-        image[:, 0] = x
-        image[:, 1] = y
-
-        noiseless_frame = np.zeros_like(two_d_frame)
-        try:
-            # creates clusters and eliminates noise from labels and 2dframe
-            dbscan = DBSCAN(
-                eps=self._dbscan_eps, min_samples=self._dbscan_min_samples
-            ).fit(image)
-            labels = dbscan.labels_
-            image, _ = self._eliminate_noise(labels, image)
-            image = image.astype(np.uint32)
-            noiseless_frame[image[:, 0], image[:, 1]] = 255
-        except ValueError:
-            tqdm.write("Warning dbscan did not find anything.")
-
-        # applies dilate filter and saves the residual frame
-        kernel = np.ones((self._kernel, self._kernel), np.uint8)
-        dilated = cv2.dilate(noiseless_frame, kernel, iterations=1)
         self.moving_foreground = Frame(
-            cv2.erode(dilated, kernel, iterations=1),
+            remove_noise(
+                two_d_frame,
+                self._dbscan_eps,
+                self._dbscan_min_samples,
+                self._kernel,
+                self._method,
+            ),
             moving_foreground.get_frame_number(),
         )
 
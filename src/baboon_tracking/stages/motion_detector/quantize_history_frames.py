@@ -1,16 +1,35 @@
 """Quantizes the shifted history frame."""
 
+import cv2
 import numpy as np
 from baboon_tracking.mixins.shifted_history_frames_mixin import (
     ShiftedHistoryFramesMixin,
 )
-from baboon_tracking.models.frame import Frame
 from baboon_tracking.mixins.quantized_frames_mixin import QuantizedFramesMixin
 from pipeline.decorators import config, stage
 from pipeline.stage import Stage
 from pipeline.stage_result import StageResult
 
 
+def get_quantize_lookup_table(scale_factor: float) -> np.ndarray:
+    """
+    Gets the table normalizing pixel values from 0-255 to values from 0-scale_factor,
+    with the same float32 arithmetic used to quantize each frame directly.
+    """
+    return np.floor(np.arange(256, dtype=np.float32) * scale_factor / 255.0).astype(
+        np.uint8
+    )
+
+
+def quantize_frames(frames: np.ndarray, lookup_table: np.ndarray, out: np.ndarray):
+    """
+    Quantizes a stack of frames into out using the lookup table.
+    """
+    # cv2.LUT works on 2-D images, so the stack is viewed as one tall image.
+    width = frames.shape[2]
+    cv2.LUT(frames.reshape(-1, width), lookup_table, dst=out.reshape(-1, width))
+
+
 @config(
     parameter_name="scale_factor", key="motion_detector/quantize_frames/scale_factor"
 )
@@ -27,20 +46,20 @@ class QuantizeHistoryFrames(Stage, QuantizedFramesMixin):
         self._scale_factor = scale_factor
         self._shifted_history_frames = shifted_history_frames
 
-    def _quantize_frame(self, frame: Frame):
+        self._lookup_table = get_quantize_lookup_table(self._scale_factor)
+
+    def _quantize_frames(self, frames: np.ndarray):
         """
         Normalize pixel values from 0-255 to values from 0-self._scale_factor
-        Returns quantized frame
+        Returns quantized frames
         """
-        return np.floor(
-            frame.get_frame().astype(np.float32) * self._scale_factor / 255.0
-        ).astype(np.int32)
+        if self.quantized_frames is None or self.quantized_frames.shape != frames.shape:
+            self.quantized_frames = np.empty(frames.shape, dtype=np.uint8)
+
+        quantize_frames(frames, self._lookup_table, self.quantized_frames)
 
     def execute(self) -> StageResult:
         """Quantizes the shifted history frame."""
-        self.quantized_frames = [
-            self._quantize_frame(f)
-            for f in self._shifted_history_frames.shifted_history_frames
-        ]
+        self._quantize_frames(self._shifted_history_frames.shifted_history_stack)
 
         return StageResult(True, True)
@@ -0,0 +1,75 @@
+"""
+Maps the detected regions and transformations back to the video resolution.
+"""
+
+import numpy as np
+from baboon_tracking.decorators.debug import debug
+from baboon_tracking.mixins.baboons_mixin import BaboonsMixin
+from baboon_tracking.mixins.frame_mixin import FrameMixin
+from baboon_tracking.mixins.transformation_matrices_mixin import (
+    TransformationMatricesMixin,
+)
+from baboon_tracking.models.region import Region
+
+from pipeline import Stage
+from pipeline.decorators import config, stage
+from pipeline.stage_result import StageResult
+
+
+@debug(FrameMixin, (0, 255, 0))
+@config(parameter_name="scale", key="preprocess/scale")
+@stage("baboons")
+@stage("transformation_matrices")
+class ScaleRegions(Stage, BaboonsMixin, TransformationMatricesMixin):
+    """
+    Maps the detected regions and transformations back to the video resolution,
+    undoing ScaleFrame.
+    """
+
+    def __init__(
+        self,
+        scale: float,
+        baboons: BaboonsMixin,
+        transformation_matrices: TransformationMatricesMixin,
+    ) -> None:
+        BaboonsMixin.__init__(self)
+        TransformationMatricesMixin.__init__(self)
+        Stage.__init__(self)
+
+        self._scale = scale
+        self._baboons = baboons
+        self._transformation_matrices = transformation_matrices
+
+        # A homography H of the scaled frames is S^-1 H S in video coordinates.
+        self._to_scaled = np.diag([scale, scale, 1.0])
+        self._from_scaled = np.diag([1.0 / scale, 1.0 / scale, 1.0])
+
+    def _scale_transformation(self, transformation: np.ndarray) -> np.ndarray:
+        if transformation is None:
+            return None
+
+        return self._from_scaled @ transformation @ self._to_scaled
+
+    def execute(self) -> StageResult:
+        baboons = self._baboons.baboons
+        matrices = self._transformation_matrices
+
+        if self._scale == 1:
+            self.baboons = baboons
+            self.transformation_matrices = matrices.transformation_matrices
+            self.current_frame_transformation = matrices.current_frame_transformation
+
+            return StageResult(True, True)
+
+        rectangles = np.array([b.rectangle for b in baboons], dtype=np.float64)
+        rectangles = np.round(rectangles.reshape(-1, 4) / self._scale)
+
+        self.baboons = [Region(r) for r in rectangles.astype(np.int64).tolist()]
+        self.transformation_matrices = [
+            self._scale_transformation(m) for m in matrices.transformation_matrices
+        ]
+        self.current_frame_transformation = self._scale_transformation(
+            matrices.current_frame_transformation
+        )
+
+        return StageResult(True, True)
@@ -3,7 +3,6 @@ Compute shifted masks for use in throwing pixels not common between frames.
 """
 import cv2
 import numpy as np
-from baboon_tracking.mixins.history_frames_mixin import HistoryFramesMixin
 from baboon_tracking.mixins.preprocessed_frame_mixin import PreprocessedFrameMixin
 
 from baboon_tracking.mixins.shifted_masks_mixin import ShiftedMasksMixin
@@ -15,9 +14,60 @@ from pipeline.decorators import stage
 from pipeline.stage import Stage
 from pipeline.stage_result import StageResult
 
+# Fractional bits used to rasterize the mask polygon.
+_SHIFT = 8
+
+
+def get_shifted_mask(shape, transformation_matrices) -> np.ndarray:
+    """
+    Computes a mask of the pixels which are inside the frame after every one of the
+    transformations.  Each transformed frame boundary is a convex polygon, so the
+    polygons are intersected and the result is filled once.
+
+    The corners are the centres of the corner pixels, which gives the same mask as
+    multiplying warped images of ones for translations.  Along slanted edges the two
+    round differently, so pixels next to the boundary can differ.
+    """
+    height, width = shape[:2]
+    corners = np.array(
+        [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+        dtype=np.float32,
+    )
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    polygon = corners
+    unsupported = []
+
+    for M in transformation_matrices:
+        shifted = cv2.perspectiveTransform(corners[None], M)[0].astype(np.float32)
+
+        # A boundary which crosses the horizon is not convex.
+        if not cv2.isContourConvex(shifted):
+            unsupported.append(M)
+            continue
+
+        area, polygon = cv2.intersectConvexConvex(polygon, shifted)
+        if polygon is None or area <= 0:
+            return mask
+
+        polygon = polygon.reshape(-1, 2)
+
+    cv2.fillConvexPoly(
+        mask,
+        np.round(polygon * (1 << _SHIFT)).astype(np.int32),
+        1,
+        shift=_SHIFT,
+    )
+
+    for M in unsupported:
+        mask *= cv2.warpPerspective(
+            np.ones(mask.shape, dtype=np.uint8), M, (width, height)
+        )
+
+    return mask
+
 
 @stage("transformation_matrices")
-@stage("history_frames")
 @stage("frame")
 class ComputeShiftedMasks(Stage, ShiftedMasksMixin):
     """
@@ -27,32 +77,21 @@ class ComputeShiftedMasks(Stage, ShiftedMasksMixin):
     def __init__(
         self,
         transformation_matrices: TransformationMatricesMixin,
-        history_frames: HistoryFramesMixin,
         frame: PreprocessedFrameMixin,
     ):
         ShiftedMasksMixin.__init__(self)
         Stage.__init__(self)
 
         self._transformation_matrices = transformation_matrices
-        self._history_frames = history_frames
         self._frame = frame
 
     def execute(self) -> StageResult:
         transformation_matrices = self._transformation_matrices.transformation_matrices
-        history_frames = self._history_frames.history_frames
         frame = self._frame.processed_frame
 
-        img = np.ones(frame.get_frame().shape).astype(np.uint8)
-        self.shifted_masks = [
-            Frame(
-                cv2.warpPerspective(
-                    img,
-                    M,
-                    (frame.get_frame().shape[1], frame.get_frame().shape[0]),
-                ),
-                h.get_frame_number(),
-            )
-            for M, h in zip(transformation_matrices, history_frames)
-        ]
+        self.shifted_mask = Frame(
+            get_shifted_mask(frame.get_frame().shape, transformation_matrices),
+            frame.get_frame_number(),
+        )
 
         return StageResult(True, True)
@@ -43,19 +43,28 @@ class ShiftHistoryFrames(Stage, ShiftedHistoryFramesMixin):
 
         transformation_matrices = self._transformation_matrices.transformation_matrices
 
+        shape = (len(history_frames),) + history_frames[0].get_frame().shape
+        if (
+            self.shifted_history_stack is None
+            or self.shifted_history_stack.shape != shape
+        ):
+            self.shifted_history_stack = np.empty(shape, dtype=np.uint8)
+
+        for history_frame, M, shifted in zip(
+            history_frames, transformation_matrices, self.shifted_history_stack
+        ):
+            cv2.warpPerspective(
+                history_frame.get_frame(),
+                M,
+                (shape[2], shape[1]),
+                dst=shifted,
+            )
+
         self.shifted_history_frames = [
-            Frame(
-                cv2.warpPerspective(
-                    history_frame.get_frame(),
-                    M,
-                    (
-                        history_frame.get_frame().shape[1],
-                        history_frame.get_frame().shape[0],
-                    ),
-                ).astype(np.uint8),
-                history_frame.get_frame_number(),
+            Frame(shifted, history_frame.get_frame_number())
+            for history_frame, shifted in zip(
+                history_frames, self.shifted_history_stack
             )
-            for history_frame, M in zip(history_frames, transformation_matrices)
         ]
 
         return StageResult(True, True)
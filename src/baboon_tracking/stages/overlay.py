@@ -1,6 +1,7 @@
 """
 Creates a video overlaying the blobs over the original video.
 """
+import cv2
 import numpy as np
 
 from baboon_tracking.decorators.save_video_result import save_video_result
@@ -35,7 +36,17 @@ class Overlay(Stage):
         frame = self._frame.frame
         moving_foreground = self._moving_foreground.moving_foreground
 
-        scaled_foreground = moving_foreground.get_frame().astype(np.float32) / 255
+        foreground = moving_foreground.get_frame()
+        height, width = frame.get_frame().shape[:2]
+
+        # The foreground is smaller than the frame when motion is detected on a
+        # scaled frame.
+        if foreground.shape[:2] != (height, width):
+            foreground = cv2.resize(
+                foreground, (width, height), interpolation=cv2.INTER_NEAREST
+            )
+
+        scaled_foreground = foreground.astype(np.float32) / 255
         scaled_foreground[scaled_foreground == 0] = 0.5
         scaled_foreground = np.tile(scaled_foreground, (3, 1, 1))
         scaled_foreground = np.swapaxes(scaled_foreground, 0, 1)
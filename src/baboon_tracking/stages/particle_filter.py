@@ -2,48 +2,30 @@
 Defines a stage which uses a paticle filter to fill in missing regions.
 """
 
-import concurrent.futures
+from typing import Any, Dict, List
 
-from typing import Any, Dict, List, Set
+import numpy as np
 
-from numpy import ndarray
 from baboon_tracking.decorators.debug import debug
 from baboon_tracking.mixins.frame_mixin import FrameMixin
 from baboon_tracking.mixins.transformation_matrices_mixin import (
     TransformationMatricesMixin,
 )
-from baboon_tracking.models.region import Region
 from baboon_tracking.mixins.particle_filter_history_mixin import (
     ParticleFilterHistoryMixin,
 )
 from baboon_tracking.mixins.baboons_mixin import BaboonsMixin
-from baboon_tracking.models.particle_filter import ParticleFilter
-from library.utils import flatten
+from baboon_tracking.mixins.rectangles_mixin import RectanglesMixin
+from baboon_tracking.models.particle_filter import (
+    ParticleFilterEngine,
+    ParticleHistoryStep,
+)
+from baboon_tracking.models.particle_filter_pool import ParticleFilterPool
 from pipeline import Stage
 from pipeline.stage_result import StageResult
 from pipeline.decorators import runtime_config, stage
 
 
-def process_pool(
-    particle_filter: ParticleFilter,
-    baboons: List[Region],
-    transformation_matrix: ndarray,
-):
-    """
-    Runs particle filter steps.
-    """
-
-    particle_filter.predict()
-
-    if transformation_matrix is not None:
-        particle_filter.transform(transformation_matrix)
-
-    particle_filter.update(baboons)
-    particle_filter.resample()
-
-    return particle_filter
-
-
 @debug(FrameMixin, (0, 0, 255))
 @stage("baboons")
 @stage("transformation_matrices")
@@ -63,66 +45,69 @@ class ParticleFilterStage(Stage, ParticleFilterHistoryMixin, BaboonsMixin):
         ParticleFilterHistoryMixin.__init__(self)
         BaboonsMixin.__init__(self)
 
-        self._executor = concurrent.futures.ProcessPoolExecutor()
         self._baboons = baboons
         self._transformation_matrices = transformation_matrices
-        self._particle_filters: Set[ParticleFilter] = {}
         self._particle_count = 5
         self._probability_thresh = 0
         self._runtime_config = config
 
+        # Without a seed, one is drawn from the global generator, so np.random.seed
+        # also makes runs repeatable.
+        seed = config.get("seed", None)
+        if seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+
+        # The history steps of the current frame.
+        record_history = config.get("particle_history", True)
+        self._history: List[ParticleHistoryStep] = []
+
+        workers = config.get("particle_filter_workers", None)
+        if workers:
+            self._particle_filters = ParticleFilterPool(
+                self._particle_count, workers, seed, record_history
+            )
+        else:
+            self._particle_filters = ParticleFilterEngine(
+                self._particle_count, np.random.default_rng(seed), record_history
+            )
+
     @property
-    def particle_filter_history(self):
-        return [(p.instance_id, p.particle_history) for p in self._particle_filters]
+    def particle_filter_history(self) -> List[ParticleHistoryStep]:
+        return self._history
 
     def on_destroy(self) -> None:
-        self._executor.shutdown()
+        if isinstance(self._particle_filters, ParticleFilterPool):
+            self._particle_filters.close()
 
     def execute(self) -> StageResult:
-        futures = [
-            self._executor.submit(
-                process_pool,
-                p,
-                self._baboons.baboons,
-                self._transformation_matrices.current_frame_transformation,
-            )
-            for p in self._particle_filters
-        ]
-        self._particle_filters = {f.result() for f in futures}
+        particle_filters = self._particle_filters
+        if isinstance(self._baboons, RectanglesMixin):
+            baboons = np.asarray(self._baboons.rectangles, dtype=np.int64)
+        else:
+            baboons = np.array(
+                [b.rectangle for b in self._baboons.baboons], dtype=np.int64
+            ).reshape(-1, 4)
+        transformation_matrix = (
+            self._transformation_matrices.current_frame_transformation
+        )
 
-        probs = [
-            [(p.get_probability(b), b, p) for b in self._baboons.baboons]
-            for p in self._particle_filters
-        ]
-        probs = flatten(probs)
-        probs.sort(key=lambda p: p[0], reverse=True)
+        probs = (
+            particle_filters.advance(baboons, transformation_matrix)
+            > self._probability_thresh
+        )
 
         if (
             "enable_persist" not in self._runtime_config
             or not self._runtime_config["enable_persist"]
         ):
-            used_particle_filters = {
-                pf for p, _, pf in probs if p > self._probability_thresh
-            }
-            unused_particle_filters = [
-                p for p in self._particle_filters if p not in used_particle_filters
-            ]
-            self._particle_filters.difference_update(unused_particle_filters)
-
-        thresh_probs = [(p, b) for p, b, _ in probs if p > self._probability_thresh]
-        used_babooons: Set[Region] = set()
-        for _, baboon in thresh_probs:
-            if baboon in used_babooons:
-                continue
-
-            used_babooons.add(baboon)
-
-        unused_baboons = [b for b in self._baboons.baboons if not b in used_babooons]
-
-        self._particle_filters.update(
-            ParticleFilter(b, self._particle_count) for b in unused_baboons
-        )
+            particle_filters.remove_filters(
+                particle_filters.identities[~np.any(probs, axis=1)]
+            )
+
+        used_baboons = np.any(probs, axis=0)
+        particle_filters.add_filters(baboons[~used_baboons])
 
-        self.baboons = [p.get_baboon() for p in self._particle_filters]
+        self.baboons = particle_filters.get_regions()
+        self._history = particle_filters.pop_history()
 
         return StageResult(True, True)
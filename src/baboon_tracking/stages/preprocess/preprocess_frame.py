@@ -5,6 +5,7 @@ from typing import Dict
 
 from baboon_tracking.stages.preprocess.blur_gray import BlurGray
 from baboon_tracking.stages.preprocess.convert_from_bgr2gray import ConvertFromBGR2Gray
+from baboon_tracking.stages.preprocess.scale_frame import ScaleFrame
 
 # from baboon_tracking.stages.preprocess.feature_reduction_pca import FeatureReductionPca
 
@@ -28,6 +29,7 @@ class PreprocessFrame(Serial):
             # DenoiseColor,
             # FeatureReductionPca,
             ConvertFromBGR2Gray,
+            ScaleFrame,
             # Denoise,
             BlurGray,
         )
@@ -0,0 +1,52 @@
+"""
+Scales a gray frame to the processing resolution.
+"""
+
+import cv2
+from baboon_tracking.decorators.show_result import show_result
+from baboon_tracking.mixins.preprocessed_frame_mixin import PreprocessedFrameMixin
+from baboon_tracking.models.frame import Frame
+from pipeline.decorators import stage, config
+from pipeline import Stage
+from pipeline.stage_result import StageResult
+
+
+@show_result
+@config(parameter_name="scale", key="preprocess/scale")
+@stage("preprocessed_frame")
+class ScaleFrame(Stage, PreprocessedFrameMixin):
+    """
+    Scales a gray frame to the processing resolution.  Motion detection runs on
+    the scaled frame and ScaleRegions maps its results back to the video.
+    """
+
+    def __init__(self, scale: float, preprocessed_frame: PreprocessedFrameMixin):
+        PreprocessedFrameMixin.__init__(self)
+        Stage.__init__(self)
+
+        self._scale = scale
+        self._preprocessed_frame = preprocessed_frame
+
+    def execute(self) -> StageResult:
+        """
+        Scales a gray frame to the processing resolution.
+        """
+
+        frame = self._preprocessed_frame.processed_frame
+
+        if self._scale == 1:
+            self.processed_frame = frame
+            return StageResult(True, True)
+
+        self.processed_frame = Frame(
+            cv2.resize(
+                frame.get_frame(),
+                None,
+                fx=self._scale,
+                fy=self._scale,
+                interpolation=cv2.INTER_AREA,
+            ),
+            frame.get_frame_number(),
+        )
+
+        return StageResult(True, True)
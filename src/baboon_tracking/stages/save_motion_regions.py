@@ -3,9 +3,6 @@ Saves the list of baboons in Sqlite database.
 """
 from os import remove
 from os.path import exists
-from sqlite3 import OperationalError
-
-import backoff
 
 from baboon_tracking.mixins.baboons_mixin import BaboonsMixin
 from baboon_tracking.mixins.capture_mixin import CaptureMixin
@@ -47,11 +44,10 @@ class SaveMotionRegions(SaveRegions):
         if exists(self.file_name):
             remove(self.file_name)
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def on_database_create(self) -> None:
         super().on_database_create()
 
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             """CREATE TABLE motion_regions (
                 x1 int,
                 y1 int,
@@ -61,7 +57,7 @@ class SaveMotionRegions(SaveRegions):
             )"""
         )
 
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             """CREATE TABLE transformations (
                 t11 real, t12 real, t13 real,
                 t21 real, t22 real, t23 real,
@@ -70,8 +66,6 @@ class SaveMotionRegions(SaveRegions):
             )"""
         )
 
-        SqliteBase.connection.commit()
-
         SqliteBase.insert_metadata(
             self,
             {
@@ -81,9 +75,6 @@ class SaveMotionRegions(SaveRegions):
             },
         )
 
-        SqliteBase.connection.commit()
-
-    @backoff.on_exception(backoff.expo, OperationalError)
     def execute(self) -> StageResult:
         stage_result = super().execute()
 
@@ -101,11 +92,11 @@ class SaveMotionRegions(SaveRegions):
             )
             for x1, y1, x2, y2 in baboons
         ]
-        SqliteBase.cursor.executemany(
+        SqliteBase.writer.executemany(
             "INSERT INTO motion_regions VALUES (?, ?, ?, ?, ?)",
             baboons,
         )
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             "INSERT INTO transformations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
             (
                 T[0, 0],
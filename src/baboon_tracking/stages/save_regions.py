@@ -2,10 +2,8 @@
 Base class for saving regions to Sqlite database.
 """
 
-from sqlite3 import OperationalError
 from typing import List
 
-import backoff
 from baboon_tracking.mixins.baboons_mixin import BaboonsMixin
 from baboon_tracking.mixins.frame_mixin import FrameMixin
 from baboon_tracking.models.region import Region
@@ -28,12 +26,11 @@ class SaveRegions(SqliteBase):
         self._baboons = baboons
         self._frame = frame
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def on_database_create(self) -> None:
         super().on_database_create()
 
-        SqliteBase.cursor.execute("DROP TABLE IF EXISTS regions")
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute("DROP TABLE IF EXISTS regions")
+        SqliteBase.writer.execute(
             """CREATE TABLE regions (
                 x1 int,
                 y1 int,
@@ -45,8 +42,6 @@ class SaveRegions(SqliteBase):
             )"""
         )
 
-        self.connection.commit()
-
     def before_database_close(self) -> None:
         self.save_hash("SaveRegions")
 
@@ -56,7 +51,6 @@ class SaveRegions(SqliteBase):
 
         return StageResult(True, True)
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def _save_baboons_for_frame(self, baboons: List[Region], frame_number: int):
         baboons = [(b.rectangle, b.id_str, b.identity) for b in baboons]
         baboons = [
@@ -72,11 +66,9 @@ class SaveRegions(SqliteBase):
             for (x1, y1, x2, y2), id_str, identity in baboons
         ]
         baboons.sort(key=lambda b: b[0])
-        SqliteBase.cursor.executemany(
+        SqliteBase.writer.executemany(
             "INSERT INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)",
             baboons,
         )
 
-        for baboon in baboons:
-            for data in baboon[:4]:
-                self.md5.update(str(data).encode())
+        self.fingerprint.update([b[:4] for b in baboons])
@@ -1,31 +1,54 @@
 from abc import ABC
 from datetime import datetime
 import json
-import hashlib
-from sqlite3 import Connection, Cursor, OperationalError, connect
 from typing import Dict
 
 import git
-import backoff
 from library.config import get_config
+from library.region_fingerprint import RegionFingerprint
+from library.results_db import upgrade_results_db
+from library.sqlite_writer import SqliteWriter
+from pipeline.decorators import runtime_config
 from pipeline.parent_stage import ParentStage
 from pipeline.pipeline import Pipeline
 from pipeline.stage import Stage
 
 
+@runtime_config("sqlite_set_runtime_config", is_property=True)
 class SqliteBase(Stage, ABC):
     created_metadata = False
     inserted_metadata = False
 
-    connection: Connection = None
-    cursor: Cursor = None
+    writer: SqliteWriter = None
+    committing_stage: "SqliteBase" = None
 
     def __init__(self):
         Stage.__init__(self)
 
         self.file_name = "./output/results.db"
-        self.md5 = hashlib.md5()
+        self.fingerprint = RegionFingerprint()
         self._pipeline_name: str = None
+        self._commit_frames = 100
+        self._commit_seconds = 5.0
+
+    def sqlite_set_runtime_config(self, rconfig: Dict[str, any]):
+        """
+        Allows the runtime config to override the database file with "results_file",
+        and how often results are committed with "commit_frames" and "commit_seconds".
+        "fingerprint" selects the algorithm used to fingerprint saved regions.
+        """
+
+        if "results_file" in rconfig and rconfig["results_file"]:
+            self.file_name = rconfig["results_file"]
+
+        if "commit_frames" in rconfig and rconfig["commit_frames"]:
+            self._commit_frames = rconfig["commit_frames"]
+
+        if "commit_seconds" in rconfig and rconfig["commit_seconds"]:
+            self._commit_seconds = rconfig["commit_seconds"]
+
+        if "fingerprint" in rconfig and rconfig["fingerprint"]:
+            self.fingerprint = RegionFingerprint(rconfig["fingerprint"])
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.on_destroy()
@@ -46,32 +69,30 @@ class SqliteBase(Stage, ABC):
         if SqliteBase.created_metadata:
             return
 
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             """CREATE TABLE IF NOT EXISTS metadata
                 (pipeline text, key text, value text)"""
         )
 
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             """CREATE TABLE IF NOT EXISTS stages
                 (pipeline text, name text, sort_order int)"""
         )
 
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             """DELETE FROM metadata
                 WHERE pipeline = ?""",
             (self._pipeline_name,),
         )
 
-        SqliteBase.cursor.execute(
+        SqliteBase.writer.execute(
             """DELETE FROM stages
                 WHERE pipeline = ?""",
             (self._pipeline_name,),
         )
 
-        SqliteBase.connection.commit()
         SqliteBase.created_metadata = True
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def _insert_start_metadata(self):
         if SqliteBase.inserted_metadata:
             return
@@ -84,10 +105,11 @@ class SqliteBase(Stage, ABC):
                 "start_time": datetime.utcnow(),
                 "git_commit": sha,
                 "config": json.dumps(get_config()),
+                "fingerprint": self.fingerprint.algorithm,
             }
         )
 
-        SqliteBase.cursor.executemany(
+        SqliteBase.writer.executemany(
             "INSERT INTO stages VALUES (?, ?, ?)",
             [
                 (self._pipeline_name, s.__class__.__name__, i)
@@ -95,51 +117,61 @@ class SqliteBase(Stage, ABC):
             ],
         )
 
-        SqliteBase.connection.commit()
         SqliteBase.inserted_metadata = True
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def on_init(self) -> None:
         self.before_database_create()
 
-        if SqliteBase.connection is None:
-            SqliteBase.connection = connect(self.file_name)
-            SqliteBase.cursor = self.connection.cursor()
+        if SqliteBase.writer is None:
+            SqliteBase.writer = SqliteWriter(
+                self.file_name, self._commit_frames, self._commit_seconds
+            )
 
             self._create_metadata_tables()
             self._insert_start_metadata()
 
+        # Stages are initialized in the order they run, so this ends as the last.
+        SqliteBase.committing_stage = self
+
         self.on_database_create()
 
+    def after_execute(self):
+        Stage.after_execute(self)
+
+        # Only the last SqliteBase stage marks the end of a frame, so each frame is
+        # counted once however many stages save results.
+        if self is SqliteBase.committing_stage:
+            SqliteBase.writer.commit()
+
     def before_database_close(self) -> None:
         """
         Called just before the connection to the database is closed.
         """
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def on_destroy(self) -> None:
-        if SqliteBase.connection is not None:
-            SqliteBase.connection.commit()
+        if SqliteBase.writer is not None:
+            try:
+                self.before_database_close()
 
-            self.before_database_close()
+                SqliteBase.writer.call(upgrade_results_db)
 
-            self.insert_metadata({"end_time": datetime.utcnow()})
+                self.insert_metadata({"end_time": datetime.utcnow()})
+            finally:
+                writer = SqliteBase.writer
 
-            SqliteBase.connection.commit()
-            SqliteBase.connection.close()
+                SqliteBase.writer = None
+                SqliteBase.committing_stage = None
+                SqliteBase.created_metadata = False
+                SqliteBase.inserted_metadata = False
 
-            SqliteBase.cursor = None
-            SqliteBase.connection = None
-            SqliteBase.created_metadata = False
-            SqliteBase.inserted_metadata = False
+                # Waits for every queued statement to be written.
+                writer.close()
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def save_hash(self, hash_key: str):
-        self.insert_metadata({hash_key: self.md5.hexdigest()})
+        self.insert_metadata({hash_key: self.fingerprint.hexdigest()})
 
-    @backoff.on_exception(backoff.expo, OperationalError)
     def insert_metadata(self, metadata: Dict[str, str]):
-        SqliteBase.cursor.executemany(
+        SqliteBase.writer.executemany(
             "INSERT INTO metadata VALUES (?, ?, ?)",
             [(self._pipeline_name, k, v) for k, v in metadata.items()],
         )
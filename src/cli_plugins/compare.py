@@ -4,8 +4,20 @@ Outputs the difference between the two sets.
 """
 
 from argparse import ArgumentParser, Namespace
-from sqlite3 import connect
+from sqlite3 import Connection, connect
 from cli_plugins.cli_plugin import CliPlugin
+from library.region_fingerprint import FINGERPRINT_ALGORITHMS, fingerprint_table
+
+FINGERPRINTED_TABLES = ["motion_regions", "regions", "bayesian_filter_regions"]
+
+
+def _get_tables(connection: Connection):
+    return {
+        t
+        for (t,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
 
 
 class Compare(CliPlugin):
@@ -29,12 +41,21 @@ class Compare(CliPlugin):
             help="The second input file.",
         )
 
+        parser.add_argument(
+            "--fingerprint",
+            choices=FINGERPRINT_ALGORITHMS,
+            default="blake2b",
+            help="The algorithm used to fingerprint the regions of each file.",
+        )
+
     def execute(self, args: Namespace):
         input1 = args.input1
         input2 = args.input2
 
         with connect(input1) as db1:
             with connect(input2) as db2:
+                self._print_fingerprints(db1, db2, args.fingerprint)
+
                 cursor1 = db1.cursor()
                 cursor2 = db2.cursor()
 
@@ -59,3 +80,13 @@ class Compare(CliPlugin):
 
                 print("Missing2")
                 print(missing2)
+
+    def _print_fingerprints(self, db1: Connection, db2: Connection, algorithm: str):
+        tables = _get_tables(db1) & _get_tables(db2)
+
+        for table in [t for t in FINGERPRINTED_TABLES if t in tables]:
+            fingerprint1 = fingerprint_table(db1, table, algorithm)
+            fingerprint2 = fingerprint_table(db2, table, algorithm)
+
+            status = "equal" if fingerprint1 == fingerprint2 else "different"
+            print(f"{table}: {fingerprint1} {fingerprint2} ({status})")
@@ -102,17 +102,26 @@ class Dataset(CliPlugin):
 
         return data
 
+    def _get_frame_index(self, data: np.ndarray):
+        """
+        Indexes the rows of each (frame, identity) once, so they are not searched
+        for in the whole array.
+        """
+        index = {}
+        for idx, key in enumerate(map(tuple, data[:, :2].tolist())):
+            index.setdefault(key, []).append(idx)
+
+        return index
+
     def _is_motion(
         self,
         frame: int,
         identity: int,
         data: np.ndarray,
+        index,
         hysteresis=(5, 5),
     ):
-        data = data.astype(float)
-
-        selector = np.logical_and(data[:, 0] == frame, data[:, 1] == identity)
-        idx = np.argmax(selector)
+        idx = index[(frame, identity)][0]
 
         for j, h in enumerate(hysteresis):
             direction = j * 2 - 1
@@ -121,14 +130,11 @@ class Dataset(CliPlugin):
                 k = i + 1
 
                 # Can we find it in the previous frame
-                previous_selector = np.logical_and(
-                    data[:, 0] == frame + direction * k,
-                    data[:, 1] == identity,
-                )
-                if not np.any(previous_selector):
+                previous_rows = index.get((frame + direction * k, identity), None)
+                if not previous_rows:
                     # We didn't see this item last frame
                     continue
-                previous_idx = np.argmax(previous_selector)
+                previous_idx = previous_rows[0]
 
                 region = Region(
                     (
@@ -179,18 +185,22 @@ class Dataset(CliPlugin):
             #     "./data/Datasets/Baboons/NeilThomas/001/gt/gt.txt"
             # ).to_numpy()
 
+            index = self._get_frame_index(data)
+            float_data = data.astype(float)
+            removed = []
+
             for frame in tqdm(unique_frames):
                 for identity in unique_identities:
-                    selector = np.logical_and(
-                        data[:, 0] == frame, data[:, 1] == identity
-                    )
-
-                    if not np.any(selector):
+                    rows = index.get((frame, identity), None)
+                    if not rows:
                         continue
 
-                    idx = np.argmax(selector)
-                    if not self._is_motion(frame, identity, data, hysteresis=[20, 30]):
-                        data = np.delete(data, idx, axis=0)
+                    if not self._is_motion(
+                        frame, identity, float_data, index, hysteresis=[20, 30]
+                    ):
+                        removed.append(rows.pop(0))
+
+            data = np.delete(data, removed, axis=0)
 
             # for identity in tqdm(unique_identities):
             #     frames = data[data[:, 1] == identity, 0]
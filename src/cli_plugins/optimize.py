@@ -105,6 +105,8 @@ class Optimize(CliPlugin):
             "save": False,
             "timings": False,
             "progress": True,
+            "preload_motion_regions": True,
+            "particle_history": False,
         }
         self._max_precision = (0, 0, 0)
         self._max_recall = (0, 0, 0)
@@ -6,6 +6,9 @@ import numpy as np
 
 import yaml
 from baboon_tracking import MotionTrackerPipeline
+from baboon_tracking.sharded_motion_tracker_pipeline import (
+    ShardedMotionTrackerPipeline,
+)
 from baboon_tracking.sqlite_particle_filter_pipeline import SqliteParticleFilterPipeline
 from cli_plugins.cli_plugin import CliPlugin
 from library.config import (
@@ -16,6 +19,8 @@ from library.config import (
 )
 from library.dataset import get_dataset_path  # pylint: disable=import-outside-toplevel
 from library.cli import str2bool, str2factory
+from library.columnar_results import export_results_npz
+from library.region_fingerprint import FINGERPRINT_ALGORITHMS
 
 
 def get_runtime_config(args: Namespace):
@@ -28,6 +33,14 @@ def get_runtime_config(args: Namespace):
         "save": args.save,
         "timings": True,
         "progress": True,
+        "results_file": "./output/results.db",
+        "parallel_threads": args.parallel_threads,
+        "prefetch_frames": args.prefetch_frames,
+        "shards": args.shards,
+        "particle_filter_workers": args.particle_filter_workers,
+        "particle_history": args.particle_history,
+        "export": args.export,
+        "fingerprint": args.fingerprint,
     }
 
 
@@ -49,6 +62,15 @@ def motion_tracker_factory(args: Namespace):
     return MotionTrackerPipeline(args.input, runtime_config=runtime_config)
 
 
+def sharded_motion_tracker_factory(args: Namespace):
+    """
+    Handles creating a motion tracker which runs chunks of the video in parallel.
+    """
+
+    runtime_config = get_runtime_config(args)
+    return ShardedMotionTrackerPipeline(args.input, runtime_config=runtime_config)
+
+
 class Run(CliPlugin):
     """
     Starts the motion tracker algorithm.
@@ -83,11 +105,66 @@ class Run(CliPlugin):
         parser.add_argument(
             "-p",
             "--pipeline",
-            type=str2factory(motion_tracker_factory, particle_filter_factory),
+            type=str2factory(
+                motion_tracker_factory,
+                particle_filter_factory,
+                sharded_motion_tracker_factory,
+            ),
             default="MotionTracker",
             help="Indicates which pipeline should be run.",
         )
 
+        parser.add_argument(
+            "-t",
+            "--parallel-threads",
+            type=int,
+            default=0,
+            help="Threads used to run parallel stages concurrently, 0 runs them serially.",
+        )
+
+        parser.add_argument(
+            "--prefetch-frames",
+            type=int,
+            default=0,
+            help="Frames decoded ahead of the pipeline on a background thread.",
+        )
+
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=0,
+            help="Chunks run in parallel by the ShardedMotionTracker pipeline.  "
+            "Defaults to the number of CPUs.",
+        )
+
+        parser.add_argument(
+            "--particle-filter-workers",
+            type=int,
+            default=0,
+            help="Worker processes which run the particle filters, 0 runs them in process.",
+        )
+
+        parser.add_argument(
+            "--particle-history",
+            type=str2bool,
+            default="yes",
+            help="Indicates if should save the history of the particle filters.",
+        )
+
+        parser.add_argument(
+            "--export",
+            choices=["npz"],
+            default=None,
+            help="Also writes the results in a columnar format when the run finishes.",
+        )
+
+        parser.add_argument(
+            "--fingerprint",
+            choices=FINGERPRINT_ALGORITHMS,
+            default="blake2b",
+            help="The algorithm used to fingerprint the saved regions, md5 matches older results.",
+        )
+
         parser.add_argument(
             "-c",
             "--config",
@@ -127,3 +204,8 @@ class Run(CliPlugin):
             args.input = f"{get_dataset_path(args.input[2:])}/img"
 
         args.pipeline(args).run()
+
+        # The pipeline has closed the database by now, for serial and sharded runs.
+        runtime_config = get_runtime_config(args)
+        if runtime_config["export"] == "npz":
+            export_results_npz(runtime_config["results_file"])
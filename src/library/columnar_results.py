@@ -0,0 +1,157 @@
+"""
+Exports the results database to columnar arrays and loads them back.
+"""
+
+import os
+from os.path import splitext
+import struct
+from sqlite3 import connect
+from typing import Dict, Sequence
+import zipfile
+
+import numpy as np
+
+# The columns exported from each results table, with their types.
+RESULT_TABLES = {
+    "motion_regions": {
+        "x1": np.int32,
+        "y1": np.int32,
+        "x2": np.int32,
+        "y2": np.int32,
+    },
+    "transformations": {
+        f"t{r}{c}": np.float64 for r in range(1, 4) for c in range(1, 4)
+    },
+    "regions": {
+        "x1": np.int32,
+        "y1": np.int32,
+        "x2": np.int32,
+        "y2": np.int32,
+        "identity": np.int64,
+        "id_str": str,
+    },
+    "bayesian_filter_regions": {
+        "x1": np.int32,
+        "y1": np.int32,
+        "x2": np.int32,
+        "y2": np.int32,
+        "identity": np.int64,
+        "id_str": str,
+        "observed": bool,
+    },
+}
+
+# The size of a zip local file header, before the file name and extra field.
+_LOCAL_HEADER_SIZE = 30
+
+
+def get_npz_file(results_file: str) -> str:
+    """
+    Gets the columnar export file for a results database.
+    """
+    return splitext(results_file)[0] + ".npz"
+
+
+def _to_column(values: Sequence, dtype) -> np.ndarray:
+    if dtype is str:
+        # Missing strings are stored empty, so the column is not an object array.
+        return np.array(["" if v is None else v for v in values], dtype=str)
+
+    if dtype is np.int64:
+        # Missing identities are stored as -1.
+        return np.array([-1 if v is None else v for v in values], dtype=dtype)
+
+    return np.array(values, dtype=dtype)
+
+
+def export_results_npz(results_file: str, npz_file: str = None):
+    """
+    Writes the result tables of a results database to a .npz file.
+
+    Each column is stored as "<table>.<column>", ordered by frame.  The rows of
+    frame f are [frame_offsets[f], frame_offsets[f + 1]) of "<table>.frame_offsets".
+    Missing identities are stored as -1 and missing id_str as an empty string.
+    """
+    npz_file = npz_file or get_npz_file(results_file)
+
+    connection = connect(results_file)
+    tables = {
+        t
+        for (t,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+
+    arrays: Dict[str, np.ndarray] = {}
+    for table, columns in RESULT_TABLES.items():
+        if table not in tables:
+            continue
+
+        rows = connection.execute(
+            f"SELECT {', '.join(columns)}, frame FROM {table} ORDER BY frame, rowid"
+        ).fetchall()
+        values = list(zip(*rows)) or [()] * (len(columns) + 1)
+
+        for (column, dtype), column_values in zip(columns.items(), values):
+            arrays[f"{table}.{column}"] = _to_column(column_values, dtype)
+
+        frames = np.array(values[-1], dtype=np.int64)
+        max_frame = int(frames[-1]) if len(frames) else 0
+
+        arrays[f"{table}.frame"] = frames.astype(np.int32)
+        arrays[f"{table}.frame_offsets"] = np.searchsorted(
+            frames, np.arange(max_frame + 2), side="left"
+        ).astype(np.int64)
+
+    connection.close()
+
+    # np.savez stores the arrays uncompressed, so they can be memory mapped.
+    temporary_file = f"{npz_file}.tmp.npz"
+    np.savez(temporary_file, **arrays)
+    os.replace(temporary_file, npz_file)
+
+
+def load_results_npz(npz_file: str) -> Dict[str, np.ndarray]:
+    """
+    Loads the arrays of a .npz file, memory mapping each of them.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+
+    with zipfile.ZipFile(npz_file) as archive, open(npz_file, "rb") as file:
+        for info in archive.infolist():
+            key = info.filename[: -len(".npy")]
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[key] = np.lib.format.read_array(member)
+
+                continue
+
+            file.seek(info.header_offset)
+            name_length, extra_length = struct.unpack(
+                "<HH", file.read(_LOCAL_HEADER_SIZE)[26:30]
+            )
+            file.seek(
+                info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length
+            )
+
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+
+            if not np.prod(shape):
+                arrays[key] = np.empty(shape, dtype=dtype)
+                continue
+
+            arrays[key] = np.memmap(
+                npz_file,
+                dtype=dtype,
+                mode="r",
+                offset=file.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+
+    return arrays
@@ -1,6 +1,8 @@
+import numpy as np
 from tqdm import tqdm
 import pandas as pd
 
+from library.region import bb_intersection_over_union_matrix
 from library.region_file import RegionFile
 
 
@@ -21,80 +23,68 @@ class Metrics:
         self._allow_overlap = allow_overlap
         self._threshold = threshold
 
+    def _get_size_mask(self, rectangles: np.ndarray):
+        widths = rectangles[:, 2] - rectangles[:, 0]
+        heights = rectangles[:, 3] - rectangles[:, 1]
+
+        mask = np.ones(len(rectangles), dtype=bool)
+        if self._max_width is not None:
+            mask &= widths <= self._max_width
+
+        if self._max_height is not None:
+            mask &= heights <= self._max_height
+
+        return mask
+
+    def _match(self, ious: np.ndarray, identities: np.ndarray, size_mask: np.ndarray):
+        """
+        Greedily matches each row to the column it overlaps most, in row order.
+        Unless overlap is allowed, a matched column excludes every column with the
+        same identity.  Returns the number of matched rows.
+        """
+        excluded = np.zeros(len(identities), dtype=bool)
+        matched = 0
+
+        for row in ious:
+            candidates = (row > 0) & (row >= self._threshold) & size_mask & ~excluded
+            if not np.any(candidates):
+                continue
+
+            # The first of the best candidates, as a stable sort would pick.
+            match = np.argmax(np.where(candidates, row, -1))
+
+            if not self._allow_overlap:
+                excluded |= identities == identities[match]
+
+            matched += 1
+
+        return matched
+
     def calculate_metrics(self):
+        frame_count = min(self._calculated.frame_count, self._ground_truth.frame_count)
+
+        rows = []
+        for frame in tqdm(range(1, frame_count + 1)):
+            calc = self._calculated.frame_batch(frame)
+            gd = self._ground_truth.frame_batch(frame)
+
+            ious = bb_intersection_over_union_matrix(calc.rectangles, gd.rectangles)
+
+            true_positive = self._match(
+                ious, gd.identities, self._get_size_mask(gd.rectangles)
+            )
+            false_positive = len(calc) - true_positive
+            false_negative = len(gd) - self._match(
+                ious.T, calc.identities, self._get_size_mask(calc.rectangles)
+            )
+
+            rows.append([frame, true_positive, false_negative, false_positive])
+
         df = pd.DataFrame(
-            columns=["frame", "true_positive", "false_negative", "false_positive"]
+            rows,
+            columns=["frame", "true_positive", "false_negative", "false_positive"],
         )
 
-        for calc, gd in tqdm(zip(self._calculated, self._ground_truth)):
-            if self._calculated.current_frame != self._ground_truth.current_frame:
-                raise ValueError("The frame numbers don't match")
-
-            true_positive = 0
-            false_negative = 0
-            false_positive = 0
-
-            calc = list(calc)
-            gd = list(gd)
-
-            selected_ground_regions = set()
-            for c in calc:
-                regions = [
-                    (r, c.iou(r))
-                    for r in gd
-                    if r.identity not in selected_ground_regions
-                ]
-                regions = [(g, i) for g, i in regions if i > 0 and i >= self._threshold]
-
-                if self._max_width is not None:
-                    regions = [(g, i) for g, i in regions if g.width <= self._max_width]
-
-                if self._max_height is not None:
-                    regions = [
-                        (g, i) for g, i in regions if g.height <= self._max_height
-                    ]
-
-                regions.sort(key=lambda x: x[1], reverse=True)
-                ground_region = regions[0][0] if regions else None
-
-                if not self._allow_overlap and ground_region:
-                    selected_ground_regions.add(ground_region.identity)
-
-                true_positive += 1 if ground_region else 0
-                false_positive += 1 if not ground_region else 0
-
-            selected_computed_region = set()
-            for g in gd:
-                regions = [
-                    (r, g.iou(r))
-                    for r in calc
-                    if r.identity not in selected_computed_region
-                ]
-                regions = [(c, i) for c, i in regions if i > 0 and i >= self._threshold]
-
-                if self._max_width is not None:
-                    regions = [(g, i) for g, i in regions if g.width <= self._max_width]
-
-                if self._max_height is not None:
-                    regions = [
-                        (g, i) for g, i in regions if g.height <= self._max_height
-                    ]
-
-                regions.sort(key=lambda x: x[1], reverse=True)
-                computed_region = regions[0][0] if regions else None
-
-                if not self._allow_overlap and computed_region:
-                    selected_computed_region.add(computed_region.identity)
-
-                false_negative += 1 if not computed_region else 0
-
-            df.loc[len(df.index)] = [
-                self._calculated.current_frame,
-                true_positive,
-                false_negative,
-                false_positive,
-            ]
-
         true_positive = df["true_positive"].sum()
         false_negative = df["false_negative"].sum()
         false_positive = df["false_positive"].sum()
@@ -46,6 +46,36 @@ def bb_intersection_over_union(
     return iou
 
 
+def bb_intersection_over_union_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray):
+    """
+    Calculate the intersect over union of every pair of (x1, y1, x2, y2) boxes,
+    returning a (len(boxes_a), len(boxes_b)) array.
+    """
+    boxes_a = np.asarray(boxes_a).reshape(-1, 1, 4)
+    boxes_b = np.asarray(boxes_b).reshape(1, -1, 4)
+
+    x_a = np.maximum(boxes_a[..., 0], boxes_b[..., 0])
+    y_a = np.maximum(boxes_a[..., 1], boxes_b[..., 1])
+    x_b = np.minimum(boxes_a[..., 2], boxes_b[..., 2])
+    y_b = np.minimum(boxes_a[..., 3], boxes_b[..., 3])
+
+    inter_area = np.abs(np.maximum(x_b - x_a, 0) * np.maximum(y_b - y_a, 0))
+
+    box_a_area = np.abs(
+        (boxes_a[..., 2] - boxes_a[..., 0]) * (boxes_a[..., 3] - boxes_a[..., 1])
+    )
+    box_b_area = np.abs(
+        (boxes_b[..., 2] - boxes_b[..., 0]) * (boxes_b[..., 3] - boxes_b[..., 1])
+    )
+
+    union_area = (box_a_area + box_b_area - inter_area).astype(float)
+
+    iou = np.zeros(inter_area.shape, dtype=float)
+    np.divide(inter_area, union_area, out=iou, where=inter_area != 0)
+
+    return iou
+
+
 def check_if_same_region(
     region_1: Tuple[int, int, int, int], region_2: Tuple[int, int, int, int]
 ):
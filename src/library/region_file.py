@@ -2,13 +2,52 @@ from abc import ABC
 from math import ceil, floor
 from os.path import basename, splitext
 from sqlite3 import connect
-from typing import Iterator
+from typing import Iterator, List, NamedTuple
 from xml.etree import ElementTree as ET
 
 import numpy as np
 import pandas as pd
 
 from baboon_tracking.models.region import Region
+from library.columnar_results import load_results_npz
+from library.results_db import has_frame_indexes
+
+
+class FrameRegions(NamedTuple):
+    """
+    The regions of a frame as arrays.  Missing identities are -1 and missing
+    id_str are empty.
+    """
+
+    rectangles: np.ndarray
+    identities: np.ndarray
+    id_strs: np.ndarray
+
+    def __len__(self):
+        return len(self.rectangles)
+
+    def to_regions(self) -> List[Region]:
+        """
+        Creates a Region for each row.
+        """
+        return [
+            Region(
+                tuple(rectangle),
+                id_str=id_str or None,
+                identity=None if identity == -1 else identity,
+            )
+            for rectangle, identity, id_str in zip(
+                self.rectangles.tolist(),
+                self.identities.tolist(),
+                self.id_strs.tolist(),
+            )
+        ]
+
+
+def _empty_frame_regions():
+    return FrameRegions(
+        np.empty((0, 4), dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=str)
+    )
 
 
 class RegionFile(ABC):
@@ -16,6 +55,11 @@ class RegionFile(ABC):
         self._frame = 0
         self._max_frame = 0
 
+        self._offsets: np.ndarray = None
+        self._rectangles: np.ndarray = None
+        self._identities: np.ndarray = None
+        self._id_strs: np.ndarray = None
+
     def __iter__(self):
         self._frame = 0
         self._max_frame = 0
@@ -32,19 +76,56 @@ class RegionFile(ABC):
         else:
             raise StopIteration
 
+    def _index_regions(
+        self,
+        frames: np.ndarray,
+        rectangles: np.ndarray,
+        identities: np.ndarray,
+        id_strs: np.ndarray,
+    ):
+        """
+        Sorts the regions by frame once, and indexes where each frame's rows start,
+        so the rows of frame f are [offsets[f], offsets[f + 1]).
+        """
+        order = np.argsort(frames, kind="stable")
+        frames = np.asarray(frames)[order]
+
+        max_frame = int(frames[-1]) if len(frames) else 0
+
+        self._offsets = np.searchsorted(frames, np.arange(max_frame + 2), side="left")
+        self._rectangles = np.asarray(rectangles)[order]
+        self._identities = np.asarray(identities)[order]
+        self._id_strs = np.asarray(id_strs)[order]
+
+    def _frame_rows(self, frame: int) -> slice:
+        if frame < 0 or frame + 1 >= len(self._offsets):
+            return slice(0, 0)
+
+        return slice(self._offsets[frame], self._offsets[frame + 1])
+
     def to_numpy(self):
         raise Exception("abstract method")
 
     @property
     def frame_count(self) -> int:
-        raise Exception("abstract method")
+        return max(len(self._offsets) - 2, 0)
 
     @property
     def current_frame(self) -> int:
         return self._frame
 
+    def frame_batch(self, frame: int) -> FrameRegions:
+        """
+        Gets the regions of a frame as arrays, without creating Region objects.
+        """
+        rows = self._frame_rows(frame)
+
+        return FrameRegions(
+            self._rectangles[rows], self._identities[rows], self._id_strs[rows]
+        )
+
     def frame_regions(self, frame: int) -> Iterator[Region]:
-        raise Exception("abstract method")
+        return iter(self.frame_batch(frame).to_regions())
 
 
 class GroundTruthTextRegionFile(RegionFile):
@@ -52,17 +133,15 @@ class GroundTruthTextRegionFile(RegionFile):
         super().__init__()
         self.array = pd.read_csv(file_name).to_numpy()
 
-    @property
-    def frame_count(self) -> int:
-        return np.max(self.array[:, 0])
-
-    def frame_regions(self, frame: int) -> Iterator[Region]:
-        frame_regions = self.array[self.array[:, 0] == frame, 1:6]
-        for identity, x1, y1, width, height in frame_regions:
-            x2 = x1 + width
-            y2 = y1 + height
+        x1, y1, width, height = (self.array[:, i] for i in range(2, 6))
+        identities = self.array[:, 1]
 
-            yield Region((x1, y1, x2, y2), id_str=str(identity), identity=identity)
+        self._index_regions(
+            self.array[:, 0],
+            np.stack((x1, y1, x1 + width, y1 + height), axis=1),
+            identities,
+            identities.astype(str),
+        )
 
 
 class SqliteRegionFile(RegionFile):
@@ -72,8 +151,31 @@ class SqliteRegionFile(RegionFile):
         self._connection = connect(file_name)
         self._cursor = self._connection.cursor()
 
+        # Without the frame index every query scans the table, so older
+        # databases are read once instead.
+        if not has_frame_indexes(self._connection):
+            self._load_regions()
+
+    def _load_regions(self):
+        rows = self._cursor.execute(
+            """
+            SELECT frame, x1, y1, x2, y2, identity, id_str FROM regions
+            ORDER BY rowid
+            """
+        ).fetchall()
+
+        self._index_regions(
+            np.array([r[0] for r in rows], dtype=int),
+            np.array([r[1:5] for r in rows]).reshape(-1, 4),
+            np.array([-1 if r[5] is None else r[5] for r in rows], dtype=int),
+            np.array(["" if r[6] is None else r[6] for r in rows], dtype=str),
+        )
+
     @property
     def frame_count(self) -> int:
+        if self._offsets is not None:
+            return super().frame_count
+
         return (
             next(
                 self._cursor.execute(
@@ -85,7 +187,32 @@ class SqliteRegionFile(RegionFile):
             or 0
         )
 
+    def frame_batch(self, frame: int) -> FrameRegions:
+        if self._offsets is not None:
+            return super().frame_batch(frame)
+
+        rows = self._cursor.execute(
+            """
+            SELECT x1, y1, x2, y2, identity, id_str FROM regions
+            WHERE frame = ?
+            """,
+            (frame,),
+        ).fetchall()
+
+        if not rows:
+            return _empty_frame_regions()
+
+        return FrameRegions(
+            np.array([r[:4] for r in rows]),
+            np.array([-1 if r[4] is None else r[4] for r in rows]),
+            np.array(["" if r[5] is None else r[5] for r in rows], dtype=str),
+        )
+
     def frame_regions(self, frame: int) -> Iterator[Region]:
+        if self._offsets is not None:
+            yield from super().frame_regions(frame)
+            return
+
         for x1, y1, x2, y2, id_str, identity in self._cursor.execute(
             """
             SELECT x1, y1, x2, y2, id_str, identity FROM regions
@@ -96,11 +223,44 @@ class SqliteRegionFile(RegionFile):
             yield Region((x1, y1, x2, y2), id_str=id_str, identity=identity)
 
 
+class NpzRegionFile(RegionFile):
+    """
+    Reads the regions of a results .npz file, memory mapped.
+    """
+
+    def __init__(self, file_name: str, table: str = "regions") -> None:
+        super().__init__()
+
+        arrays = load_results_npz(file_name)
+
+        # The export is already sorted by frame, so its offsets are used as is.
+        self._offsets = arrays[f"{table}.frame_offsets"]
+        self._coordinates = [arrays[f"{table}.{c}"] for c in ("x1", "y1", "x2", "y2")]
+        self._identities = arrays[f"{table}.identity"]
+        self._id_strs = arrays[f"{table}.id_str"]
+
+    def frame_batch(self, frame: int) -> FrameRegions:
+        rows = self._frame_rows(frame)
+
+        return FrameRegions(
+            np.stack([c[rows] for c in self._coordinates], axis=1),
+            np.asarray(self._identities[rows]),
+            np.asarray(self._id_strs[rows]),
+        )
+
+
 class CvatXmlRegionFile(RegionFile):
     def __init__(self, file_name: str) -> None:
         super().__init__()
         self._regions = self._get_regions_from_xml(file_name)
 
+        self._index_regions(
+            self._regions[:, 0],
+            self._regions[:, 2:6],
+            self._regions[:, 1],
+            self._regions[:, 1].astype(str),
+        )
+
     def _load_xml(self, xml_path: str):
         xml_tree = ET.parse(xml_path)
         root = xml_tree.getroot()
@@ -132,26 +292,12 @@ class CvatXmlRegionFile(RegionFile):
                 regions.append(region)
 
         regions.sort(key=lambda x: x[0])
-        regions = np.array(regions, dtype=int)
+        regions = np.array(regions, dtype=int).reshape(-1, 6)
         return regions
 
     def to_numpy(self):
         return self._regions
 
-    @property
-    def frame_count(self) -> int:
-        if self._max_frame == 0:
-            self._max_frame = max(f for f, _, _, _, _, _ in self._regions)
-
-        return self._max_frame
-
-    def frame_regions(self, frame: int) -> Iterator[Region]:
-        return [
-            Region((x1, y1, x2, y2), id_str=str(identity), identity=identity)
-            for f, identity, x1, y1, x2, y2 in self._regions
-            if f == frame
-        ]
-
 
 def region_factory(input_file: str) -> RegionFile:
     if basename(input_file) == "gt.txt":
@@ -160,5 +306,7 @@ def region_factory(input_file: str) -> RegionFile:
         return CvatXmlRegionFile(input_file)
     elif splitext(input_file)[1] == ".db":
         return SqliteRegionFile(input_file)
+    elif splitext(input_file)[1] == ".npz":
+        return NpzRegionFile(input_file)
 
     raise Exception("File type for region file not recognized.")
@@ -0,0 +1,89 @@
+"""
+Fingerprints the regions saved to a results database, so runs can be compared.
+"""
+
+import hashlib
+from sqlite3 import Connection
+from typing import Iterable, Sequence
+
+import numpy as np
+
+FINGERPRINT_ALGORITHMS = ["blake2b", "md5"]
+
+
+class RegionFingerprint:
+    """
+    Fingerprints regions in the order they are saved.
+
+    "blake2b" is a 16 byte BLAKE2b digest of the x1, y1, x2, y2 coordinates of
+    every region, packed as little endian int32.  Only the concatenated bytes are
+    hashed, so the digest does not depend on how regions are split between
+    updates, and can be recomputed from a table in rowid order.
+
+    "md5" is the original fingerprint, an MD5 digest of the decimal text of each
+    coordinate.  It is kept to compare against older results.
+    """
+
+    def __init__(self, algorithm: str = "blake2b"):
+        if algorithm not in FINGERPRINT_ALGORITHMS:
+            raise ValueError(f'Unknown fingerprint algorithm "{algorithm}".')
+
+        self.algorithm = algorithm
+
+        if algorithm == "blake2b":
+            self._hash = hashlib.blake2b(digest_size=16)
+        else:
+            self._hash = hashlib.md5()
+
+    def update(self, coordinates: Sequence[Sequence[int]]):
+        """
+        Adds the (x1, y1, x2, y2) coordinates of a batch of regions.
+        """
+        if self.algorithm == "md5":
+            for region in coordinates:
+                for data in region[:4]:
+                    self._hash.update(str(data).encode())
+
+            return
+
+        packed = np.asarray(coordinates, dtype="<i4").reshape(-1, 4)
+        self._hash.update(packed.tobytes())
+
+    def hexdigest(self) -> str:
+        """
+        Gets the fingerprint of every region added so far.
+        """
+        return self._hash.hexdigest()
+
+
+def fingerprint_rows(
+    rows: Iterable[Sequence[int]], algorithm: str = "blake2b", batch_size=100000
+) -> str:
+    """
+    Fingerprints (x1, y1, x2, y2) rows, packing them a batch at a time.
+    """
+    fingerprint = RegionFingerprint(algorithm)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            fingerprint.update(batch)
+            batch = []
+
+    fingerprint.update(batch)
+
+    return fingerprint.hexdigest()
+
+
+def fingerprint_table(
+    connection: Connection, table: str, algorithm: str = "blake2b"
+) -> str:
+    """
+    Fingerprints the regions of a results table in the order they were saved.
+    """
+    return fingerprint_rows(
+        connection.execute(f"SELECT x1, y1, x2, y2 FROM {table} ORDER BY rowid"),
+        algorithm,
+    )
@@ -0,0 +1,85 @@
+"""
+Maintains the schema of the results database.
+"""
+
+from sqlite3 import Connection
+
+# 1: original schema, 2: tables indexed by frame.
+SCHEMA_VERSION = 2
+
+FRAME_INDEXED_TABLES = [
+    "motion_regions",
+    "transformations",
+    "regions",
+    "bayesian_filter_regions",
+    "particle_filter_history",
+]
+
+
+def _get_tables(connection: Connection):
+    return {
+        t
+        for (t,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+
+
+def get_schema_version(connection: Connection) -> int:
+    """
+    Gets the schema version recorded in the metadata table, without writing to
+    the database.  Databases created before the version was recorded are version 1.
+    """
+    if "metadata" not in _get_tables(connection):
+        return 1
+
+    version = connection.execute(
+        "SELECT MAX(CAST(value AS int)) FROM metadata WHERE key = 'schema_version'"
+    ).fetchone()[0]
+
+    return version or 1
+
+
+def create_frame_indexes(connection: Connection):
+    """
+    Indexes every existing results table by frame.  Tables are indexed after they
+    are filled, which keeps inserts cheap.
+    """
+    tables = _get_tables(connection)
+
+    for table in FRAME_INDEXED_TABLES:
+        if table in tables:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_frame ON {table} (frame)"
+            )
+
+
+def has_frame_indexes(connection: Connection) -> bool:
+    """
+    Checks if the results tables are indexed by frame.  Readers use this instead
+    of upgrading the database, which they may not be able to write to.
+    """
+    return get_schema_version(connection) >= 2
+
+
+def upgrade_results_db(connection: Connection):
+    """
+    Upgrades a results database in place to the current schema version.
+    """
+    connection.execute(
+        """CREATE TABLE IF NOT EXISTS metadata
+            (pipeline text, key text, value text)"""
+    )
+
+    version = get_schema_version(connection)
+
+    create_frame_indexes(connection)
+
+    if version < SCHEMA_VERSION:
+        connection.execute("DELETE FROM metadata WHERE key = 'schema_version'")
+        connection.execute(
+            "INSERT INTO metadata VALUES (?, ?, ?)",
+            ("schema", "schema_version", str(SCHEMA_VERSION)),
+        )
+
+    connection.commit()
@@ -0,0 +1,180 @@
+"""
+Writes to a Sqlite database from a dedicated thread.
+"""
+
+from concurrent.futures import Future
+from queue import Empty, Queue
+from sqlite3 import Connection, OperationalError, connect
+from threading import Thread
+import time
+from typing import Any, Callable, Iterable
+
+import backoff
+
+_CLOSE = "close"
+_COMMIT = "commit"
+_EXECUTE = "execute"
+_EXECUTEMANY = "executemany"
+_CALL = "call"
+
+
+@backoff.on_exception(backoff.expo, OperationalError)
+def _execute(connection: Connection, command: str, sql: str, parameters: Any):
+    getattr(connection, command)(sql, parameters)
+
+
+@backoff.on_exception(backoff.expo, OperationalError)
+def _commit(connection: Connection):
+    connection.commit()
+
+
+class SqliteWriter:
+    """
+    Writes to a Sqlite database from a dedicated thread.
+
+    Statements are queued and run in order by the thread, which owns the
+    connection, so callers never wait on the disk unless the queue is full.
+    Writes are grouped into transactions, committed once commit has been called
+    commit_frames times or commit_seconds have passed.  While open, the database
+    uses write-ahead logging with synchronous=NORMAL, so it stays consistent if
+    the process stops and only loses the transaction in progress.
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        commit_frames: int = 100,
+        commit_seconds: float = 5.0,
+        queue_size: int = 256,
+    ):
+        self._commit_frames = commit_frames
+        self._commit_seconds = commit_seconds
+        self._queue: "Queue[tuple]" = Queue(maxsize=queue_size)
+        self._error: BaseException = None
+
+        self._thread = Thread(
+            target=self._run, args=(file_name,), name="SqliteWriter", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, *item):
+        self._raise_error()
+        self._queue.put(item)
+
+    def _raise_error(self):
+        # The first failure is raised to every later caller.
+        if self._error is not None:
+            raise self._error
+
+    def execute(self, sql: str, parameters: Iterable = ()):
+        """
+        Queues a statement.
+        """
+        self._put(_EXECUTE, sql, parameters)
+
+    def executemany(self, sql: str, parameters: Iterable[Iterable]):
+        """
+        Queues a statement for each set of parameters.
+        """
+        self._put(_EXECUTEMANY, sql, list(parameters))
+
+    def commit(self):
+        """
+        Marks the end of a frame's writes.  The transaction is committed once
+        enough frames have been marked or enough time has passed.
+        """
+        self._put(_COMMIT)
+
+    def call(self, function: Callable[[Connection], Any]) -> Any:
+        """
+        Runs the function with the connection on the writer thread, after every
+        queued statement, and returns its result.
+        """
+        future = Future()
+        self._put(_CALL, function, future)
+
+        return future.result()
+
+    def close(self):
+        """
+        Commits every queued statement and closes the database.
+        """
+        self._queue.put((_CLOSE,))
+        self._thread.join()
+
+        self._raise_error()
+
+    def _run(self, file_name: str):
+        connection: Connection = None
+        try:
+            connection = connect(file_name)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        except Exception as exc:  # pylint: disable=broad-except
+            self._error = exc
+
+        frames = 0
+        last_commit = time.monotonic()
+
+        while True:
+            timeout = max(last_commit + self._commit_seconds - time.monotonic(), 0)
+
+            try:
+                command, *args = self._queue.get(timeout=timeout)
+            except Empty:
+                command, args = _COMMIT, []
+                frames = self._commit_frames
+
+            if command == _CLOSE:
+                break
+
+            if self._error is not None:
+                # Statements after a failure may depend on it, so they are dropped.
+                if command == _CALL:
+                    args[1].set_exception(self._error)
+
+                continue
+
+            try:
+                if command == _COMMIT:
+                    frames += 1
+
+                    if (
+                        frames >= self._commit_frames
+                        or time.monotonic() - last_commit >= self._commit_seconds
+                    ):
+                        _commit(connection)
+
+                        frames = 0
+                        last_commit = time.monotonic()
+
+                elif command == _CALL:
+                    function, future = args
+                    future.set_result(function(connection))
+
+                else:
+                    _execute(connection, command, *args)
+
+            except Exception as exc:  # pylint: disable=broad-except
+                if command == _CALL:
+                    args[1].set_exception(exc)
+                else:
+                    self._error = exc
+
+        if connection is None:
+            return
+
+        if self._error is None:
+            _commit(connection)
+        else:
+            connection.rollback()
+
+        # Leaves a single database file behind for readers.  While another
+        # connection has the database open it stays in write-ahead logging mode,
+        # which readers handle as well.
+        try:
+            connection.execute("PRAGMA journal_mode=DELETE")
+        except OperationalError:
+            pass
+
+        connection.close()
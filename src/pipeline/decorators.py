@@ -80,8 +80,11 @@ def runtime_config(parameter: str, is_property=False):
     """
 
     def inner_function(function: Callable):
-        if not hasattr(function, "runtime_configuration"):
-            function.runtime_configuration = []
+        # Copy an inherited list so decorating a subclass doesn't modify its parent.
+        if "runtime_configuration" not in vars(function):
+            function.runtime_configuration = list(
+                getattr(function, "runtime_configuration", [])
+            )
 
         function.runtime_configuration.append((parameter, is_property))
 
@@ -1,18 +1,28 @@
 """
 Executes child stages in parallel.
 """
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Callable, List, Tuple, Dict
 
 import numpy as np
 from PIL import Image, ImageDraw
 
 from pipeline.parent_stage import ParentStage
+from pipeline.stage import Stage
 from pipeline.stage_result import StageResult
 
 
 class Parallel(ParentStage):
     """
     Executes child stages in parallel.
+
+    By default the children are executed one after another.  If the runtime config
+    provides a positive "parallel_threads" value, the children are executed
+    concurrently on a thread pool instead.  OpenCV and NumPy release the GIL for
+    most of the per-pixel work, so siblings overlap.  Siblings must not depend on
+    each other's results in this mode, and every child but the last must return
+    StageResult(True, True), since its siblings have already run by the time its
+    result is known.
     """
 
     def __init__(
@@ -20,16 +30,51 @@ class Parallel(ParentStage):
     ):
         ParentStage.__init__(self, name, runtime_config, *stage_types)
 
+        self._executor: ThreadPoolExecutor = None
+
+        threads = (runtime_config or {}).get("parallel_threads", 0)
+        if threads and len(self.stages) > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(threads, len(self.stages)),
+                thread_name_prefix=name,
+            )
+
+    def _execute_stage(self, stage: Stage) -> StageResult:
+        stage.before_execute()
+        result = stage.execute()
+        stage.after_execute()
+
+        return result
+
+    def _execute_concurrently(self) -> List[StageResult]:
+        futures = [self._executor.submit(self._execute_stage, s) for s in self.stages]
+
+        # Every child has to finish before the results are inspected,
+        # otherwise a short-circuit would leave siblings running into the next stage.
+        wait(futures)
+
+        results = [f.result() for f in futures]
+
+        for stage, result in zip(self.stages[:-1], results):
+            if not result.continue_pipeline or not result.next_stage:
+                raise RuntimeError(
+                    f"{type(stage).__name__} stopped its siblings in {self.name}, "
+                    "which cannot be done when they are executed concurrently."
+                )
+
+        return results
+
     def execute(self) -> StageResult:
         """
         Executes all stages in this pipeline in parallel.
         """
 
-        for stage in self.stages:
-            stage.before_execute()
-            result = stage.execute()
-            stage.after_execute()
+        if self._executor is None:
+            results = (self._execute_stage(s) for s in self.stages)
+        else:
+            results = self._execute_concurrently()
 
+        for result in results:
             if result.continue_pipeline and not result.next_stage:
                 break
 
@@ -77,3 +122,9 @@ class Parallel(ParentStage):
         end = self._array2tuple((img.size[0], img.size[1] / 2))
 
         return (img, start, end)
+
+    def on_destroy(self) -> None:
+        ParentStage.on_destroy(self)
+
+        if self._executor is not None:
+            self._executor.shutdown()
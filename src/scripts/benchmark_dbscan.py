@@ -0,0 +1,74 @@
+"""
+Compares the DBSCAN noise filter with its grid implementation on synthetic
+foreground frames.
+
+Run from the src directory:
+    python -m scripts.benchmark_dbscan --width 3840 --height 2160 --noise 0.02
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from baboon_tracking.stages.motion_detector.noise_reduction.db_scan_filter import (
+    dbscan_mask,
+    grid_dbscan_mask,
+)
+
+
+def _get_frame(
+    rng: np.random.Generator, width: int, height: int, blobs: int, noise: float
+):
+    frame = np.zeros((height, width), dtype=np.uint8)
+
+    for _ in range(blobs):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(frame, center, int(rng.integers(3, 20)), 255, -1)
+
+    frame[rng.random(frame.shape) < noise] = 255
+
+    return frame
+
+
+def main():
+    """
+    Times both filters on the same frames and checks that their masks are equal.
+    """
+    parser = ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--blobs", type=int, default=50)
+    parser.add_argument(
+        "--noise", type=float, default=0.01, help="Fraction of noise pixels."
+    )
+    parser.add_argument("--eps", type=float, default=4)
+    parser.add_argument("--min-samples", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [
+        _get_frame(rng, args.width, args.height, args.blobs, args.noise)
+        for _ in range(args.frames)
+    ]
+
+    timings = {}
+    masks = {}
+    for name, function in (("sklearn", dbscan_mask), ("grid", grid_dbscan_mask)):
+        start = perf_counter()
+        masks[name] = [function(f, args.eps, args.min_samples) for f in frames]
+        timings[name] = (perf_counter() - start) / len(frames)
+
+    equal = all(np.array_equal(a, b) for a, b in zip(masks["sklearn"], masks["grid"]))
+
+    for name, timing in timings.items():
+        print(f"{name}: {timing * 1000:.1f} ms per frame")
+
+    print(f"speedup: {timings['sklearn'] / timings['grid']:.1f}x")
+    print(f"masks equal: {equal}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,49 @@ Adapted from https://github.com/BAILOOL/ANMS-Codes
 
 import math
 
+import cv2
+import numpy as np
+from numba import jit
 
-def ssc(keypoints, num_ret_points, tolerance, cols, rows):
+
+@jit(nopython=True)
+def _cover(points, width, cols, rows):
+    c = width / 2  # initializing Grid
+    num_cell_cols = int(math.floor(cols / c))
+    num_cell_rows = int(math.floor(rows / c))
+    covered = np.zeros((num_cell_rows + 1, num_cell_cols + 1), dtype=np.bool_)
+
+    # range which a radius is covering
+    span = int(math.floor(width / c))
+
+    result = np.empty(points.shape[0], dtype=np.int64)
+    count = 0
+
+    for i in range(points.shape[0]):
+        # get position of the cell current point is located at
+        row = int(math.floor(points[i, 1] / c))
+        col = int(math.floor(points[i, 0] / c))
+
+        if not covered[row, col]:  # if the cell is not covered
+            result[count] = i
+            count += 1
+
+            row_min = max(row - span, 0)
+            row_max = min(row + span, num_cell_rows)
+            col_min = max(col - span, 0)
+            col_max = min(col + span, num_cell_cols)
+
+            # cover cells within the square bounding box with width w
+            covered[row_min : row_max + 1, col_min : col_max + 1] = True
+
+    return result[:count]
+
+
+def ssc_indexes(points, responses, num_ret_points, tolerance, cols, rows):
+    """
+    Selects well distributed points, preferring the strongest responses.  Takes an
+    (n, 2) array of point coordinates and returns the indexes of the selected points.
+    """
     exp1 = rows + cols + 2 * num_ret_points
     exp2 = (
         4 * cols
@@ -25,12 +66,15 @@ def ssc(keypoints, num_ret_points, tolerance, cols, rows):
     high = (
         sol1 if (sol1 > sol2) else sol2
     )  # binary search range initialization with positive solution
-    low = math.floor(math.sqrt(len(keypoints) / num_ret_points))
+    low = math.floor(math.sqrt(len(points) / num_ret_points))
+
+    # strongest points first
+    order = np.argsort(-np.asarray(responses), kind="stable")
+    points = np.ascontiguousarray(np.asarray(points, dtype=np.float64)[order])
 
     prev_width = -1
-    selected_keypoints = []
-    result_list = []
-    result = []
+    result_list = np.zeros(0, dtype=np.int64)
+    result = result_list
     complete = False
     k = num_ret_points
     k_min = round(k - (k * tolerance))
@@ -44,47 +88,7 @@ def ssc(keypoints, num_ret_points, tolerance, cols, rows):
             result_list = result  # return the keypoints from the previous iteration
             break
 
-        c = width / 2  # initializing Grid
-        num_cell_cols = int(math.floor(cols / c))
-        num_cell_rows = int(math.floor(rows / c))
-        covered_vec = [
-            [False for _ in range(num_cell_cols + 1)] for _ in range(num_cell_rows + 1)
-        ]
-        result = []
-
-        for i in range(len(keypoints)):
-            row = int(
-                math.floor(keypoints[i].pt[1] / c)
-            )  # get position of the cell current point is located at
-            col = int(math.floor(keypoints[i].pt[0] / c))
-            if not covered_vec[row][col]:  # if the cell is not covered
-                result.append(i)
-                # get range which current radius is covering
-                row_min = int(
-                    (row - math.floor(width / c))
-                    if ((row - math.floor(width / c)) >= 0)
-                    else 0
-                )
-                row_max = int(
-                    (row + math.floor(width / c))
-                    if ((row + math.floor(width / c)) <= num_cell_rows)
-                    else num_cell_rows
-                )
-                col_min = int(
-                    (col - math.floor(width / c))
-                    if ((col - math.floor(width / c)) >= 0)
-                    else 0
-                )
-                col_max = int(
-                    (col + math.floor(width / c))
-                    if ((col + math.floor(width / c)) <= num_cell_cols)
-                    else num_cell_cols
-                )
-                for row_to_cover in range(row_min, row_max + 1):
-                    for col_to_cover in range(col_min, col_max + 1):
-                        if not covered_vec[row_to_cover][col_to_cover]:
-                            # cover cells within the square bounding box with width w
-                            covered_vec[row_to_cover][col_to_cover] = True
+        result = _cover(points, float(width), float(cols), float(rows))
 
         if k_min <= len(result) <= k_max:  # solution found
             result_list = result
@@ -95,7 +99,29 @@ def ssc(keypoints, num_ret_points, tolerance, cols, rows):
             low = width + 1
         prev_width = width
 
-    for i in range(len(result_list)):
-        selected_keypoints.append(keypoints[result_list[i]])
+    return order[result_list]
+
+
+def ssc(keypoints, num_ret_points, tolerance, cols, rows):
+    """
+    Selects well distributed keypoints, preferring the strongest responses.
+    """
+    if not keypoints:
+        return []
+
+    # OpenCV has no array accessor for KeyPoint.response, so the responses are
+    # read once per keypoint here.  The coordinates are converted in one call.
+    responses = np.fromiter(
+        (k.response for k in keypoints), dtype=np.float32, count=len(keypoints)
+    )
+
+    selected = ssc_indexes(
+        cv2.KeyPoint_convert(keypoints),
+        responses,
+        num_ret_points,
+        tolerance,
+        cols,
+        rows,
+    )
 
-    return selected_keypoints
+    return [keypoints[i] for i in selected]
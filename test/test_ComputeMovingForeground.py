@@ -0,0 +1,101 @@
+import math
+import unittest
+
+import numpy as np
+
+from baboon_tracking.stages.motion_detector.compute_moving_foreground import (
+    get_moving_foreground,
+)
+
+
+def _get_levels(values: np.ndarray, low: int, high: int) -> np.ndarray:
+    return (
+        (values <= low).astype(np.uint8)
+        + ((low < values) + (values < high)).astype(np.uint8) * 2
+        + (values >= high).astype(np.uint8) * 3
+    )
+
+
+def _reference_moving_foreground(weights, foreground, dissimilarity, history_frames):
+    """
+    The array implementation the compiled kernel replaced.
+    """
+    history_frame_count_third = math.floor(float(history_frames - 1) / 3)
+    third_gray = 255.0 / 3.0
+
+    weight_levels = (weights <= history_frame_count_third).astype(np.uint8) + (
+        np.logical_and(
+            history_frame_count_third < weights, weights < history_frames - 1
+        ).astype(np.uint8)
+        * 2
+    )
+
+    low = math.floor(third_gray)
+    high = math.floor(2 * third_gray)
+    foreground_levels = _get_levels(foreground, low, high)
+    dissimilarity_levels = _get_levels(dissimilarity, low, high)
+
+    moving_foreground = np.logical_and(
+        weight_levels == 2,
+        np.greater_equal(foreground_levels, dissimilarity_levels),
+    ).astype(np.uint8)
+    moving_foreground = moving_foreground + np.logical_and(
+        weight_levels == 1,
+        np.logical_and(
+            dissimilarity_levels == 1,
+            np.greater(foreground_levels, dissimilarity_levels),
+        ),
+    ).astype(np.uint8)
+
+    return moving_foreground * 255
+
+
+class TestComputeMovingForeground(unittest.TestCase):
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+
+        for history_frames in (3, 5, 9, 12):
+            shape = (61, 83)
+            weights = rng.integers(0, history_frames, shape, dtype=np.uint8)
+            foreground = rng.integers(0, 256, shape, dtype=np.uint8)
+            dissimilarity = rng.integers(0, 256, shape, dtype=np.uint8)
+
+            out = np.empty(shape, dtype=np.uint8)
+            get_moving_foreground(
+                weights, foreground, dissimilarity, history_frames, out
+            )
+
+            np.testing.assert_array_equal(
+                out,
+                _reference_moving_foreground(
+                    weights, foreground, dissimilarity, history_frames
+                ),
+            )
+
+    def test_level_boundaries(self):
+        # Every combination of the values on either side of each threshold.
+        history_frames = 9
+        weight_values = np.arange(history_frames, dtype=np.uint8)
+        gray_values = np.array([0, 84, 85, 86, 169, 170, 171, 255], dtype=np.uint8)
+
+        weights, foreground, dissimilarity = (
+            a.astype(np.uint8)
+            for a in np.meshgrid(weight_values, gray_values, gray_values)
+        )
+        weights, foreground, dissimilarity = (
+            a.reshape(1, -1) for a in (weights, foreground, dissimilarity)
+        )
+
+        out = np.empty(weights.shape, dtype=np.uint8)
+        get_moving_foreground(weights, foreground, dissimilarity, history_frames, out)
+
+        np.testing.assert_array_equal(
+            out,
+            _reference_moving_foreground(
+                weights, foreground, dissimilarity, history_frames
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
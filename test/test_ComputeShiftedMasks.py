@@ -0,0 +1,131 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.stages.motion_detector.transformed_frames.compute_shifted_masks import (
+    get_shifted_mask,
+)
+
+SHAPE = (240, 320)
+
+
+def _get_rotation(angle: float, x: float = 0, y: float = 0) -> np.ndarray:
+    M = np.vstack(
+        (cv2.getRotationMatrix2D((SHAPE[1] / 2, SHAPE[0] / 2), angle, 1.0), [0, 0, 1])
+    )
+    M[:2, 2] += (x, y)
+
+    return M
+
+
+def _get_horizon_crossing() -> np.ndarray:
+    """
+    Gets a homography which maps the right of the frame behind the camera.
+    """
+    return np.array([[1, 0, -40], [0, 1, 0], [-0.005, 0, 1]]) @ np.array(
+        [[1, 0, 60], [0, 1, 0], [0, 0, 1]]
+    )
+
+
+def _reference_mask(transformation_matrices) -> np.ndarray:
+    """
+    The product of the warped images of ones ComputeShiftedMasks used before.
+    """
+    height, width = SHAPE
+    mask = np.ones(SHAPE, dtype=np.uint8)
+    for M in transformation_matrices:
+        mask *= cv2.warpPerspective(np.ones(SHAPE, dtype=np.uint8), M, (width, height))
+
+    return mask
+
+
+def _get_boundary(mask: np.ndarray) -> np.ndarray:
+    """
+    Gets the pixels within one pixel of the edge of the mask.
+    """
+    kernel = np.ones((3, 3), dtype=np.uint8)
+    inner = cv2.erode(mask, kernel, borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+    return cv2.dilate(mask, kernel) != inner
+
+
+class TestComputeShiftedMasks(unittest.TestCase):
+    def _assert_matches_reference(self, transformation_matrices, exact: bool, name):
+        mask = get_shifted_mask(SHAPE, transformation_matrices)
+        expected = _reference_mask(transformation_matrices)
+
+        self.assertEqual(mask.dtype, np.uint8)
+        self.assertEqual(mask.shape, SHAPE)
+
+        different = mask != expected
+        if exact:
+            self.assertEqual(np.count_nonzero(different), 0, name)
+            return
+
+        # Slanted edges are only allowed to round differently.
+        self.assertFalse((different & ~_get_boundary(expected)).any(), name)
+        self.assertLess(np.count_nonzero(different), sum(SHAPE) // 10, name)
+
+    def test_translation_matches_warp(self):
+        for name, transformation_matrices in (
+            ("identity", [np.eye(3)]),
+            ("whole pixels", [np.array([[1, 0, 7], [0, 1, -4], [0, 0, 1.0]])]),
+            ("sub-pixel", [np.array([[1, 0, 3.3], [0, 1, -2.7], [0, 0, 1.0]])]),
+            (
+                "history",
+                [
+                    np.array([[1, 0, 0.7 * i], [0, 1, -0.4 * i], [0, 0, 1.0]])
+                    for i in range(9)
+                ],
+            ),
+        ):
+            self._assert_matches_reference(transformation_matrices, True, name)
+
+        self.assertTrue(get_shifted_mask(SHAPE, [np.eye(3)]).all())
+
+    def test_rotation_and_perspective_within_boundary(self):
+        rng = np.random.default_rng(0)
+        perspective = [
+            np.eye(3)
+            + np.array(
+                [
+                    [rng.normal(0, 0.01), rng.normal(0, 0.01), rng.normal(0, 5)],
+                    [rng.normal(0, 0.01), rng.normal(0, 0.01), rng.normal(0, 5)],
+                    [rng.normal(0, 1e-5), rng.normal(0, 1e-5), 0],
+                ]
+            )
+            for _ in range(9)
+        ]
+
+        for name, transformation_matrices in (
+            ("rotation", [_get_rotation(3)]),
+            ("history", [_get_rotation(0.3 * i, 1.1 * i, -0.7 * i) for i in range(9)]),
+            ("perspective", perspective),
+        ):
+            self._assert_matches_reference(transformation_matrices, False, name)
+
+    def test_horizon_crossing_falls_back_to_warp(self):
+        M = _get_horizon_crossing()
+
+        corners = np.array([[0, 0], [319, 0], [319, 239], [0, 239]], dtype=np.float32)
+        self.assertFalse(
+            cv2.isContourConvex(cv2.perspectiveTransform(corners[None], M)[0])
+        )
+
+        self._assert_matches_reference([M], True, "horizon")
+        self._assert_matches_reference(
+            [_get_rotation(2, 3, 1), M, np.eye(3)], False, "horizon and rotation"
+        )
+        self.assertFalse(_reference_mask([M]).all())
+
+    def test_no_overlap(self):
+        mask = get_shifted_mask(
+            SHAPE, [np.eye(3), np.array([[1, 0, 400], [0, 1, 0], [0, 0, 1.0]])]
+        )
+
+        self.assertFalse(mask.any())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+from collections import deque
+from types import SimpleNamespace
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.models.frame import Frame
+from baboon_tracking.stages.motion_detector.compute_tiled_moving_foreground import (
+    ComputeTiledMovingForeground,
+)
+from baboon_tracking.stages.motion_detector.transformed_frames.compute_shifted_masks import (
+    get_shifted_mask,
+)
+
+HISTORY_FRAME_COUNT = 6
+
+
+def _get_inputs(rng: np.random.Generator, shape):
+    """
+    Gets a textured scene with a blob moving across it, seen by a slowly panning
+    camera.
+    """
+    background = cv2.GaussianBlur(
+        rng.integers(0, 256, shape, dtype=np.uint8), (0, 0), 3
+    )
+
+    frames = []
+    for i in range(HISTORY_FRAME_COUNT + 1):
+        image = background.copy()
+        cv2.circle(image, (20 + 9 * i, shape[0] // 2), 8, 255, -1)
+        frames.append(Frame(image, i + 1))
+
+    transformation_matrices = [
+        np.array(
+            [[1.0, 0.0, 0.3 * (i - HISTORY_FRAME_COUNT)], [0.0, 1.0, 0.2], [0, 0, 1]]
+        )
+        for i in range(HISTORY_FRAME_COUNT)
+    ]
+
+    processed_frame = frames[-1]
+
+    return (
+        SimpleNamespace(history_frames=deque(frames[:-1])),
+        SimpleNamespace(transformation_matrices=transformation_matrices),
+        SimpleNamespace(
+            shifted_mask=Frame(get_shifted_mask(shape, transformation_matrices), 0)
+        ),
+        SimpleNamespace(processed_frame=processed_frame),
+    )
+
+
+def _create_stage(tile_size: int, inputs) -> ComputeTiledMovingForeground:
+    stage = ComputeTiledMovingForeground(
+        tile_size, 16, HISTORY_FRAME_COUNT, 48, 4, 10, 5, "grid", *inputs
+    )
+
+    # Turns off displaying and saving the result, as the pipeline would.
+    for parameter, is_property in ComputeTiledMovingForeground.runtime_configuration:
+        if is_property:
+            getattr(ComputeTiledMovingForeground, parameter)(
+                stage, {"display": False, "save": False}
+            )
+
+    return stage
+
+
+def _get_moving_foreground(stage: ComputeTiledMovingForeground) -> np.ndarray:
+    stage.execute()
+    return stage.moving_foreground.get_frame().copy()
+
+
+class TestComputeTiledMovingForeground(unittest.TestCase):
+    def test_tiled_matches_untiled(self):
+        shape = (97, 130)
+        inputs = _get_inputs(np.random.default_rng(0), shape)
+
+        untiled = _get_moving_foreground(_create_stage(max(shape), inputs))
+        self.assertTrue(untiled.any())
+
+        for tile_size in (20, 32, 50):
+            np.testing.assert_array_equal(
+                _get_moving_foreground(_create_stage(tile_size, inputs)),
+                untiled,
+                err_msg=f"tile_size={tile_size}",
+            )
+
+    def test_frame_size_change(self):
+        rng = np.random.default_rng(1)
+        stage = _create_stage(32, _get_inputs(rng, (97, 130)))
+        _get_moving_foreground(stage)
+
+        shape = (80, 111)
+        inputs = _get_inputs(rng, shape)
+        (
+            stage._history_frames,
+            stage._transformation_matrices,
+            stage._shifted_mask,
+            stage._preprocessed_frame,
+        ) = inputs
+
+        np.testing.assert_array_equal(
+            _get_moving_foreground(stage),
+            _get_moving_foreground(_create_stage(max(shape), inputs)),
+        )
+        # Only the buffers of the new tile shapes are kept.
+        fresh = _create_stage(32, inputs)
+        _get_moving_foreground(fresh)
+        self.assertEqual(set(stage._buffers), set(fresh._buffers))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.stages.motion_detector.compute_transformation_matrices import (
+    _match_features,
+)
+
+
+def _get_descriptors(rng: np.random.Generator, count: int):
+    """
+    Gets ORB sized descriptors which differ from a repeated set of train
+    descriptors by a few bits, so many matches tie.
+    """
+    train = rng.integers(0, 256, (count // 2, 32), dtype=np.uint8)
+    train = np.concatenate((train, train[: count // 4]))
+
+    query = train[rng.integers(0, train.shape[0], count)]
+    bits = np.unpackbits(query, axis=1)
+    for row in bits:
+        row[rng.integers(0, bits.shape[1], rng.integers(0, 4))] ^= 1
+
+    return np.packbits(bits, axis=1), train
+
+
+def _reference_matches(descriptors1, descriptors2, good_match_percent: float):
+    """
+    The BFMatcher and DMatch sort registration used before the array matcher.
+    """
+    matcher = cv2.DescriptorMatcher_create(cv2.DESCRIPTOR_MATCHER_BRUTEFORCE_HAMMING)
+    matches = list(matcher.match(descriptors1, descriptors2, None))
+
+    matches.sort(key=lambda x: x.distance, reverse=False)
+    matches = matches[: int(len(matches) * good_match_percent)]
+
+    return [(m.queryIdx, m.trainIdx) for m in matches], [m.distance for m in matches]
+
+
+class TestComputeTransformationMatrices(unittest.TestCase):
+    def test_matches_match_bf_matcher(self):
+        rng = np.random.default_rng(0)
+
+        for count, good_match_percent in (
+            (3, 0.3),
+            (40, 0.3),
+            (500, 0.15),
+            (500, 0.3),
+            (500, 1.0),
+        ):
+            descriptors1, descriptors2 = _get_descriptors(rng, count)
+
+            expected, distances = _reference_matches(
+                descriptors1, descriptors2, good_match_percent
+            )
+            query_idx, train_idx = _match_features(
+                descriptors1, descriptors2, good_match_percent
+            )
+
+            self.assertEqual(
+                list(zip(query_idx.tolist(), train_idx.tolist())),
+                expected,
+                f"{count}, {good_match_percent}",
+            )
+            self.assertEqual(len(expected), int(count * good_match_percent))
+
+            if 0 < len(expected) < count:
+                # Only some of the matches at the cut-off distance are kept.
+                _, all_distances = _reference_matches(descriptors1, descriptors2, 1)
+                self.assertGreater(
+                    all_distances.count(distances[-1]), distances.count(distances[-1])
+                )
+
+    def test_no_matches_kept(self):
+        descriptors1, descriptors2 = _get_descriptors(np.random.default_rng(1), 3)
+
+        query_idx, train_idx = _match_features(descriptors1, descriptors2, 0.3)
+
+        self.assertEqual(query_idx.shape, (0,))
+        self.assertEqual(train_idx.shape, (0,))
+
+
+if __name__ == "__main__":
+    unittest.main()
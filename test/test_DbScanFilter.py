@@ -0,0 +1,64 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.stages.motion_detector.noise_reduction.db_scan_filter import (
+    dbscan_mask,
+    grid_dbscan_mask,
+    remove_noise,
+)
+
+
+def _get_frame(rng: np.random.Generator, shape=(90, 120), noise=0.03) -> np.ndarray:
+    frame = np.zeros(shape, dtype=np.uint8)
+    frame[rng.random(shape) < noise] = 255
+
+    # A few solid blobs among the noise.
+    for _ in range(4):
+        x, y = rng.integers(0, shape[1] - 10), rng.integers(0, shape[0] - 10)
+        w, h = rng.integers(3, 12, 2)
+        cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), 255, -1)
+
+    return frame
+
+
+class TestDbScanFilter(unittest.TestCase):
+    def test_grid_matches_dbscan(self):
+        rng = np.random.default_rng(0)
+
+        for eps, min_samples in ((1, 3), (1.5, 5), (4, 40), (5, 20), (3.7, 12)):
+            frame = _get_frame(rng)
+
+            np.testing.assert_array_equal(
+                grid_dbscan_mask(frame, eps, min_samples),
+                dbscan_mask(frame, eps, min_samples),
+                err_msg=f"eps={eps}, min_samples={min_samples}",
+            )
+
+    def test_grid_matches_dbscan_at_edges(self):
+        frame = np.zeros((20, 20), dtype=np.uint8)
+        frame[:4, :4] = 255
+        frame[-3:, 10:14] = 255
+        frame[10, -1] = 255
+
+        np.testing.assert_array_equal(
+            grid_dbscan_mask(frame, 2, 6), dbscan_mask(frame, 2, 6)
+        )
+
+    def test_grid_empty_frame(self):
+        frame = np.zeros((30, 40), dtype=np.uint8)
+
+        np.testing.assert_array_equal(grid_dbscan_mask(frame, 4, 40), frame)
+
+    def test_remove_noise_methods_match(self):
+        frame = _get_frame(np.random.default_rng(1))
+
+        np.testing.assert_array_equal(
+            remove_noise(frame, 4, 40, 5, "grid"),
+            remove_noise(frame, 4, 40, 5, "sklearn"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.models.frame import Frame
+from baboon_tracking.stages.motion_detector.detect_blobs import DetectBlobs, get_blobs
+
+
+def _get_mask() -> np.ndarray:
+    """
+    Gets a foreground mask with a few shapes, along with their bounding boxes
+    (x1, y1, x2, y2) and pixel counts in raster order.
+    """
+    mask = np.zeros((40, 60), dtype=np.uint8)
+
+    # A ring, whose hole is not a blob of its own.
+    mask[2:12, 3:13] = 255
+    mask[5:9, 6:10] = 0
+
+    # Two squares touching at a corner, which is connected.
+    mask[4:7, 30:33] = 255
+    mask[7:10, 33:36] = 255
+
+    # A single pixel.
+    mask[20, 50] = 255
+
+    # An L shape, whose box is much larger than its area.
+    mask[25:39, 5:7] = 255
+    mask[37:39, 5:25] = 255
+
+    blobs = [
+        ((3, 2, 13, 12), 100 - 16),
+        ((30, 4, 36, 10), 18),
+        ((50, 20, 51, 21), 1),
+        ((5, 25, 25, 39), 14 * 2 + 2 * 18),
+    ]
+
+    return mask, blobs
+
+
+def _get_box_area(box) -> int:
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+class TestDetectBlobs(unittest.TestCase):
+    def setUp(self):
+        self.mask, self.blobs = _get_mask()
+
+    def test_boxes_and_areas(self):
+        boxes, areas, centroids = get_blobs(self.mask)
+
+        self.assertEqual(boxes.tolist(), [list(b) for b, _ in self.blobs])
+        self.assertEqual(areas.tolist(), [a for _, a in self.blobs])
+        self.assertEqual(centroids.shape, (len(self.blobs), 2))
+        self.assertEqual(centroids[2].tolist(), [50, 20])
+
+        # The same boxes as the outer contours.  Listing every contour would also
+        # give the ring's hole.
+        contours, _ = cv2.findContours(
+            self.mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        rectangles = [cv2.boundingRect(c) for c in contours]
+        self.assertEqual(
+            sorted(boxes.tolist()),
+            sorted([x, y, x + w, y + h] for x, y, w, h in rectangles),
+        )
+
+    def test_size_limits(self):
+        box_areas = [_get_box_area(b) for b, _ in self.blobs]
+
+        for min_size, max_size in (
+            (0, 0),
+            (1, 0),
+            (2, 0),
+            (box_areas[1], 0),
+            (box_areas[1] + 1, 0),
+            (0, box_areas[1]),
+            (0, box_areas[1] - 1),
+            (box_areas[1], box_areas[0]),
+            (box_areas[3] + 1, 0),
+        ):
+            boxes, areas, centroids = get_blobs(self.mask, min_size, max_size)
+
+            # Limits are inclusive, and the bounding box area is limited.
+            expected = [
+                (b, a)
+                for (b, a), box_area in zip(self.blobs, box_areas)
+                if (not min_size or box_area >= min_size)
+                and (not max_size or box_area <= max_size)
+            ]
+
+            self.assertEqual(
+                boxes.tolist(), [list(b) for b, _ in expected], (min_size, max_size)
+            )
+            self.assertEqual(areas.tolist(), [a for _, a in expected])
+            self.assertEqual(len(centroids), len(expected))
+
+    def test_empty_mask(self):
+        boxes, areas, centroids = get_blobs(np.zeros((10, 10), dtype=np.uint8), 1, 5)
+
+        self.assertEqual(boxes.shape, (0, 4))
+        self.assertEqual(areas.shape, (0,))
+        self.assertEqual(centroids.shape, (0, 2))
+
+    def test_stage_defaults(self):
+        stage = DetectBlobs(
+            0, 0, SimpleNamespace(moving_foreground=Frame(self.mask, 1))
+        )
+        stage.execute()
+
+        self.assertEqual(
+            [list(r.rectangle) for r in stage.baboons], [list(b) for b, _ in self.blobs]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.stages.get_video_frame import GetVideoFrame
+
+FRAME_COUNT = 40
+
+
+def _write_video(file_name: str, rng: np.random.Generator):
+    """
+    Writes a video of noise, so that every frame differs from its neighbours.
+    """
+    writer = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48))
+    for _ in range(FRAME_COUNT):
+        writer.write(rng.integers(0, 256, (48, 64, 3), dtype=np.uint8))
+    writer.release()
+
+
+def _read_frames(video: GetVideoFrame):
+    frames = []
+    while True:
+        result = video.execute()
+        if not result.continue_pipeline:
+            break
+
+        frames.append((video.frame.get_frame_number(), video.frame.get_frame()))
+
+    video.on_destroy()
+
+    return frames
+
+
+class TestGetVideoFrame(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.video_file = join(self._directory.name, "video.mp4")
+        _write_video(self.video_file, np.random.default_rng(0))
+
+        self.frames = _read_frames(GetVideoFrame(self.video_file))
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_sequential(self):
+        self.assertEqual([n for n, _ in self.frames], list(range(1, FRAME_COUNT + 1)))
+
+    def test_start_frame_matches_sequential(self):
+        for start_frame, end_frame in ((1, 5), (2, None), (13, 20), (37, None)):
+            frames = _read_frames(
+                GetVideoFrame(
+                    self.video_file,
+                    {"start_frame": start_frame, "end_frame": end_frame},
+                )
+            )
+
+            expected = self.frames[start_frame - 1 : end_frame]
+            self.assertEqual(
+                [n for n, _ in frames], [n for n, _ in expected], str(start_frame)
+            )
+            for (frame_number, frame), (_, expected_frame) in zip(frames, expected):
+                self.assertTrue(
+                    np.array_equal(frame, expected_frame), f"frame={frame_number}"
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
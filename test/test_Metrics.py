@@ -0,0 +1,151 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+import unittest
+
+import numpy as np
+
+from library.metrics import Metrics
+from library.region_file import GroundTruthTextRegionFile
+
+
+def _write_regions(file_name: str, rng: np.random.Generator, frame_count: int):
+    """
+    Writes a gt.txt with overlapping regions, repeated boxes and repeated
+    identities in each frame.
+    """
+    with open(file_name, "w", encoding="utf8") as f:
+        f.write("frame,identity,x1,y1,width,height,visible\n")
+
+        for frame in range(1, frame_count + 1):
+            count = int(rng.integers(0, 8))
+            boxes = np.concatenate(
+                (rng.integers(0, 40, (count, 2)), rng.integers(5, 40, (count, 2))),
+                axis=1,
+            )
+            if count and rng.random() < 0.2:
+                boxes[1:] = boxes[0]
+
+            for identity, box in zip(rng.integers(0, 5, count), boxes):
+                f.write(f"{frame},{identity},{','.join(map(str, box))},1\n")
+
+
+def _reference_match(rows, columns, max_width, max_height, allow_overlap, threshold):
+    """
+    The per-region matching Metrics used before the IoU matrix.  Returns how many
+    rows found a match.
+    """
+    selected = set()
+    matched = 0
+
+    for r in rows:
+        regions = [(c, r.iou(c)) for c in columns if c.identity not in selected]
+        regions = [(c, i) for c, i in regions if i > 0 and i >= threshold]
+
+        if max_width is not None:
+            regions = [(c, i) for c, i in regions if c.width <= max_width]
+
+        if max_height is not None:
+            regions = [(c, i) for c, i in regions if c.height <= max_height]
+
+        regions.sort(key=lambda x: x[1], reverse=True)
+        column = regions[0][0] if regions else None
+
+        if not allow_overlap and column:
+            selected.add(column.identity)
+
+        matched += 1 if column else 0
+
+    return matched
+
+
+def _reference_counts(calculated, ground_truth, *args):
+    counts = []
+    for calc, gd in zip(calculated, ground_truth):
+        calc = list(calc)
+        gd = list(gd)
+
+        true_positive = _reference_match(calc, gd, *args)
+        false_negative = len(gd) - _reference_match(gd, calc, *args)
+
+        counts.append(
+            [
+                calculated.current_frame,
+                true_positive,
+                false_negative,
+                len(calc) - true_positive,
+            ]
+        )
+
+    return counts
+
+
+def _reference_summary(counts):
+    true_positive, false_negative, false_positive = np.sum(
+        np.array(counts)[:, 1:], axis=0
+    )
+
+    precision = 0
+    recall = 0
+    f1 = 0
+
+    if true_positive + false_positive != 0:
+        precision = true_positive / (true_positive + false_positive)
+    if true_positive + false_negative != 0:
+        recall = true_positive / (true_positive + false_negative)
+    if precision + recall != 0:
+        f1 = (2 * precision * recall) / (precision + recall)
+
+    return recall, precision, f1
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+
+        rng = np.random.default_rng(0)
+
+        self.calculated_file = join(self._directory.name, "calculated.txt")
+        self.ground_truth_file = join(self._directory.name, "gt.txt")
+        _write_regions(self.calculated_file, rng, 150)
+        _write_regions(self.ground_truth_file, rng, 140)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_matches_reference(self):
+        true_positives = 0
+        for max_width, max_height, allow_overlap, threshold in (
+            (None, None, False, 0),
+            (None, None, True, 0),
+            (None, None, False, 0.3),
+            (20, None, False, 0.1),
+            (None, 15, True, 0),
+            (25, 25, True, 0.3),
+        ):
+            args = (max_width, max_height, allow_overlap, threshold)
+
+            recall, precision, f1, df = Metrics(
+                GroundTruthTextRegionFile(self.calculated_file),
+                GroundTruthTextRegionFile(self.ground_truth_file),
+                *args,
+            ).calculate_metrics()
+
+            expected = _reference_counts(
+                GroundTruthTextRegionFile(self.calculated_file),
+                GroundTruthTextRegionFile(self.ground_truth_file),
+                *args,
+            )
+            self.assertEqual(df.to_numpy().tolist(), expected, str(args))
+
+            for value, expected_value in zip(
+                (recall, precision, f1), _reference_summary(expected)
+            ):
+                self.assertAlmostEqual(value, expected_value)
+
+            true_positives += df["true_positive"].sum()
+
+        self.assertGreater(true_positives, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import time
+import unittest
+
+from pipeline.parallel import Parallel
+from pipeline.stage import Stage
+from pipeline.stage_result import StageResult
+
+
+class _Child(Stage):
+    delay = 0.05
+
+    def __init__(self):
+        Stage.__init__(self)
+
+        self.result = StageResult(True, True)
+        self.executions = 0
+
+    def execute(self) -> StageResult:
+        time.sleep(self.delay)
+        self.executions += 1
+
+        return self.result
+
+
+class _First(_Child):
+    delay = 0.02
+
+
+class _Second(_Child):
+    delay = 0.04
+
+
+class _Third(_Child):
+    delay = 0.06
+
+
+def _create_parallel(threads: int) -> Parallel:
+    return Parallel("Children", {"parallel_threads": threads}, _First, _Second, _Third)
+
+
+def _execute(parallel: Parallel, results):
+    for stage, result in zip(parallel.stages, results):
+        stage.result = result
+
+    return parallel.execute(), [s.executions for s in parallel.stages]
+
+
+def _assert_result(test_case, result: StageResult, continue_pipeline, next_stage):
+    test_case.assertEqual(
+        (result.continue_pipeline, result.next_stage), (continue_pipeline, next_stage)
+    )
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.parallels = [_create_parallel(0), _create_parallel(3)]
+
+    def tearDown(self):
+        for parallel in self.parallels:
+            parallel.on_destroy()
+
+    def test_serial_short_circuits(self):
+        parallel = self.parallels[0]
+
+        result, executions = _execute(parallel, [StageResult(True, False)])
+        _assert_result(self, result, True, True)
+        self.assertEqual(executions, [1, 0, 0])
+
+        result, executions = _execute(
+            parallel, [StageResult(True, True), StageResult(False, None)]
+        )
+        _assert_result(self, result, False, None)
+        self.assertEqual(executions, [2, 1, 0])
+
+    def test_concurrent_matches_serial(self):
+        for results, expected in (
+            ([StageResult(True, True)] * 3, (True, True)),
+            ([StageResult(True, True)] * 2 + [StageResult(True, False)], (True, True)),
+            ([StageResult(True, True)] * 2 + [StageResult(False, None)], (False, None)),
+        ):
+            for parallel in self.parallels:
+                result, executions = _execute(parallel, results)
+
+                _assert_result(self, result, *expected)
+                self.assertEqual(executions, [executions[0]] * 3)
+
+    def test_concurrent_break_raises(self):
+        parallel = self.parallels[1]
+
+        for results in (
+            [StageResult(True, False)],
+            [StageResult(True, True), StageResult(False, None)],
+        ):
+            with self.assertRaises(RuntimeError):
+                _execute(parallel, results)
+
+    def test_concurrent_times_each_child(self):
+        parallel = self.parallels[1]
+
+        start = time.perf_counter()
+        for _ in range(3):
+            parallel.before_execute()
+            parallel.execute()
+            parallel.after_execute()
+        elapsed = (time.perf_counter() - start) / 3
+
+        # The children overlap, but each is only charged for its own work.
+        self.assertLess(elapsed, sum(s.delay for s in parallel.stages))
+
+        timing = parallel.get_time()
+        for stage, child in zip(parallel.stages, timing.children):
+            self.assertEqual(child.name, type(stage).__name__)
+            self.assertGreaterEqual(child.execution_time, stage.delay)
+            self.assertLess(child.execution_time, stage.delay + 0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+from math import sqrt
+from typing import Dict, List
+import unittest
+
+import numpy as np
+
+from baboon_tracking.models.particle_filter import ParticleFilterEngine
+from library.region import bb_intersection_over_union
+
+
+class _Region:
+    def __init__(self, rectangle, observed):
+        self.rectangle = tuple(int(c) for c in rectangle)
+        self.observed = observed
+
+
+class _Particle:
+    def __init__(self, region: _Region, weight: float):
+        self.region = region
+        self.weight = weight
+
+
+class _ReferenceParticleFilter:
+    """
+    The per-object particle filter the engine replaced, without the random draws
+    of the predict step, which are passed in instead.
+    """
+
+    def __init__(self, box, particle_count: int):
+        self._particle_count = particle_count
+        self._weight = 1.0 / float(particle_count)
+
+        region = _Region(box, True)
+        self.particles = [
+            _Particle(region, self._weight) for _ in range(particle_count)
+        ]
+
+    def predict(self, normals: np.ndarray, randoms: np.ndarray):
+        for particle, normal, random in zip(self.particles, normals, randoms):
+            x1, y1, x2, y2 = particle.region.rectangle
+            length = sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+
+            sample = np.abs(normal) * length
+            degs = random * 2 * np.pi
+
+            delta_x = int(np.round(sample * np.sin(degs)).item())
+            delta_y = int(np.round(sample * np.cos(degs)).item())
+
+            particle.region = _Region(
+                (x1 + delta_x, y1 + delta_y, x2 + delta_x, y2 + delta_y), False
+            )
+
+    def transform(self, transformation: np.ndarray):
+        for particle in self.particles:
+            x1, y1, x2, y2 = particle.region.rectangle
+
+            top_left = np.round(np.matmul(transformation, [x1, y1, 1])).astype(np.int32)
+            bottom_right = np.round(np.matmul(transformation, [x2, y2, 1])).astype(
+                np.int32
+            )
+
+            particle.region = _Region(
+                (top_left[0], top_left[1], bottom_right[0], bottom_right[1]),
+                particle.region.observed,
+            )
+
+    def update(self, boxes: np.ndarray):
+        for particle in self.particles:
+            ious = [
+                (bb_intersection_over_union(particle.region.rectangle, b), b)
+                for b in map(tuple, boxes.tolist())
+            ]
+            ious.sort(key=lambda i: i[0], reverse=True)
+
+            weight, box = ious[0]
+            if weight == 0:
+                continue
+
+            particle.weight *= weight
+            particle.region = _Region(box, True)
+
+    def _get_region_weights(self) -> Dict[_Region, float]:
+        region_weights: Dict[_Region, float] = {}
+
+        for particle in self.particles:
+            region_weights.setdefault(particle.region, 0.0)
+            region_weights[particle.region] += particle.weight
+
+        return region_weights
+
+    def resample(self):
+        region_weights = self._get_region_weights()
+
+        normalizer = np.sum(np.array(list(region_weights.values())))
+        regions_weights = list(region_weights.items())
+        regions_weights.sort(key=lambda r: r[1], reverse=True)
+
+        self.particles = []
+        for region, weight in regions_weights:
+            count = int(np.round((weight / normalizer) / self._weight).item())
+            count = min(count, self._particle_count - len(self.particles))
+
+            if count == 0:
+                break
+
+            self.particles.extend(
+                [_Particle(region, self._weight) for _ in range(count)]
+            )
+
+    def get_region(self) -> _Region:
+        region_weights = self._get_region_weights()
+        return max(region_weights, key=region_weights.get)
+
+    def get_probability(self, box) -> float:
+        return np.sum(
+            np.array(
+                [
+                    bb_intersection_over_union(p.region.rectangle, box)
+                    for p in self.particles
+                ]
+            )
+            * self._weight
+        )
+
+
+class _FixedRandom:
+    """
+    Gives the engine the draws chosen by the test.
+    """
+
+    def __init__(self):
+        self.normals: np.ndarray = None
+        self.randoms: np.ndarray = None
+
+    def normal(self, scale: float, size: int):
+        assert size == len(self.normals)
+        return self.normals * scale
+
+    def random(self, size: int):
+        assert size == len(self.randoms)
+        return self.randoms
+
+
+def _get_boxes(rng: np.random.Generator, count: int) -> np.ndarray:
+    top_left = rng.integers(0, 200, (count, 2))
+    size = rng.integers(10, 40, (count, 2))
+
+    return np.concatenate((top_left, top_left + size), axis=1)
+
+
+class TestParticleFilterEngine(unittest.TestCase):
+    def _run(self, transformations: List[np.ndarray]):
+        particle_count = 20
+        rng = np.random.default_rng(1)
+
+        random = _FixedRandom()
+        engine = ParticleFilterEngine(particle_count, random, record_history=False)
+
+        initial_boxes = _get_boxes(rng, 6)
+        engine.add_filters(initial_boxes, np.arange(len(initial_boxes)))
+        references = [
+            _ReferenceParticleFilter(b, particle_count) for b in initial_boxes.tolist()
+        ]
+
+        for transformation in transformations:
+            # Observations near the tracked regions, so some particles overlap them.
+            boxes = np.concatenate(
+                (
+                    initial_boxes + rng.integers(-8, 9, initial_boxes.shape),
+                    _get_boxes(rng, 3),
+                )
+            )
+
+            count = sum(len(r.particles) for r in references)
+            random.normals = rng.normal(size=count)
+            random.randoms = rng.random(count)
+
+            probabilities = engine.advance(boxes, transformation)
+
+            start = 0
+            for reference in references:
+                end = start + len(reference.particles)
+                reference.predict(
+                    random.normals[start:end] * 0.01, random.randoms[start:end]
+                )
+                start = end
+
+                if transformation is not None:
+                    reference.transform(transformation)
+                reference.update(boxes)
+                reference.resample()
+
+            np.testing.assert_allclose(
+                probabilities,
+                [
+                    [r.get_probability(b) for b in map(tuple, boxes.tolist())]
+                    for r in references
+                ],
+            )
+
+            regions = engine.get_regions()
+            self.assertEqual(len(regions), len(references))
+            for region, reference in zip(regions, references):
+                self.assertEqual(region.rectangle, reference.get_region().rectangle)
+                self.assertEqual(region.observed, reference.get_region().observed)
+
+    def test_matches_per_object_filters(self):
+        self._run([None] * 10)
+
+    def test_matches_per_object_filters_with_transformation(self):
+        transformation = np.array([[1.0, 0.01, 3.4], [-0.01, 1.0, -2.6], [0, 0, 1]])
+        self._run([transformation] * 10)
+
+    def test_remove_filters(self):
+        engine = ParticleFilterEngine(5, np.random.default_rng(0))
+        engine.add_filters(_get_boxes(np.random.default_rng(0), 3), np.arange(3))
+
+        engine.remove_filters(np.array([1]))
+
+        np.testing.assert_array_equal(engine.identities, [0, 2])
+        self.assertEqual(engine.coordinates.shape, (10, 4))
+
+    def test_history(self):
+        engine = ParticleFilterEngine(5, np.random.default_rng(0))
+        engine.add_filters(_get_boxes(np.random.default_rng(0), 2), np.arange(2))
+        engine.advance(_get_boxes(np.random.default_rng(1), 2))
+
+        history = engine.pop_history()
+
+        self.assertEqual(
+            [h.step_name for h in history], ["initial", "predict", "update", "resample"]
+        )
+        self.assertEqual(engine.pop_history(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
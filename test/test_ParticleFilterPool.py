@@ -0,0 +1,112 @@
+import unittest
+
+import numpy as np
+
+from baboon_tracking.models.particle_filter import ParticleFilterEngine
+from baboon_tracking.models.particle_filter_pool import ParticleFilterPool
+
+
+def _get_boxes(rng: np.random.Generator, count: int) -> np.ndarray:
+    top_left = rng.integers(0, 200, (count, 2))
+    size = rng.integers(10, 40, (count, 2))
+
+    return np.concatenate((top_left, top_left + size), axis=1)
+
+
+class TestParticleFilterPool(unittest.TestCase):
+    def setUp(self):
+        self.particle_count = 10
+        self.workers = 2
+        self.seed = 7
+
+        self.pool = ParticleFilterPool(self.particle_count, self.workers, self.seed)
+
+        # Each worker's filters, run in this process with the worker's seed.
+        self.engines = [
+            ParticleFilterEngine(self.particle_count, np.random.default_rng(s))
+            for s in np.random.SeedSequence(self.seed).spawn(self.workers)
+        ]
+
+    def tearDown(self):
+        self.pool.close()
+
+    def _advance(self, boxes: np.ndarray, transformation: np.ndarray = None):
+        probabilities = self.pool.advance(boxes, transformation)
+
+        identities = np.concatenate([e.identities for e in self.engines])
+        expected = np.concatenate(
+            [e.advance(boxes, transformation) for e in self.engines]
+        )
+        order = np.argsort(identities, kind="stable")
+
+        np.testing.assert_array_equal(self.pool.identities, identities[order])
+        np.testing.assert_array_equal(probabilities, expected[order])
+
+    def _add_filters(self, boxes: np.ndarray) -> np.ndarray:
+        ids = self.pool.add_filters(boxes)
+
+        for idx, engine in enumerate(self.engines):
+            owned = ids % self.workers == idx
+            engine.add_filters(boxes[owned], ids[owned])
+
+        return ids
+
+    def _remove_filters(self, ids: np.ndarray):
+        self.pool.remove_filters(ids)
+
+        for engine in self.engines:
+            engine.remove_filters(ids)
+
+    def _assert_regions(self):
+        regions = self.pool.get_regions()
+
+        expected = sorted(
+            (r for e in self.engines for r in e.get_regions()),
+            key=lambda r: r.identity,
+        )
+
+        self.assertEqual(
+            [(r.rectangle, r.identity, r.observed) for r in regions],
+            [(r.rectangle, r.identity, r.observed) for r in expected],
+        )
+
+    def test_matches_engines(self):
+        rng = np.random.default_rng(3)
+        transformation = np.array([[1.0, 0.0, 2.0], [0.0, 1.0, -1.0], [0, 0, 1]])
+
+        ids = self._add_filters(_get_boxes(rng, 5))
+        self._assert_regions()
+
+        for frame in range(6):
+            self._advance(_get_boxes(rng, 7), transformation if frame % 2 else None)
+
+            if frame == 2:
+                self._remove_filters(ids[:2])
+                self._add_filters(_get_boxes(rng, 3))
+
+            self._assert_regions()
+
+    def test_history(self):
+        rng = np.random.default_rng(4)
+
+        self._add_filters(_get_boxes(rng, 4))
+        self.pool.get_regions()
+        self._advance(_get_boxes(rng, 4))
+        self.pool.get_regions()
+
+        steps = self.pool.pop_history()
+
+        # Every worker records each add, even an empty one, so the steps of the
+        # workers line up.
+        self.assertEqual(
+            [s.step_name for s in steps],
+            ["initial", "predict", "update", "resample", "initial"],
+        )
+        self.assertEqual(steps[0].filter_ids.size, 4 * self.particle_count)
+        self.assertEqual(steps[3].filter_ids.size, 4 * self.particle_count)
+        self.assertEqual(steps[4].filter_ids.size, 0)
+        self.assertEqual(self.pool.pop_history(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+from os.path import join
+from sqlite3 import connect
+from tempfile import TemporaryDirectory
+import unittest
+
+import numpy as np
+
+from library.region_file import (
+    CvatXmlRegionFile,
+    GroundTruthTextRegionFile,
+    SqliteRegionFile,
+)
+from library.results_db import create_frame_indexes
+
+
+def _get_rows(rng: np.random.Generator, count: int, max_frame: int):
+    """
+    Gets (frame, identity, x1, y1, x2, y2) rows, out of frame order and with frames
+    missing.
+    """
+    frames = rng.integers(1, max_frame + 1, count)
+    frames[frames == max_frame // 2] = 1
+
+    top_left = rng.integers(0, 500, (count, 2))
+    bottom_right = top_left + rng.integers(3, 40, (count, 2))
+
+    return [
+        (int(f), int(i), *(int(c) for c in tl), *(int(c) for c in br))
+        for f, i, tl, br in zip(
+            frames, rng.integers(0, 20, count), top_left, bottom_right
+        )
+    ]
+
+
+def _reference_frame_regions(rows, frame: int):
+    """
+    The scan of every row the frame index replaced.
+    """
+    return [
+        ((x1, y1, x2, y2), str(identity), identity)
+        for f, identity, x1, y1, x2, y2 in rows
+        if f == frame
+    ]
+
+
+def _get_keys(regions):
+    return [(tuple(r.rectangle), r.id_str, r.identity) for r in regions]
+
+
+class TestRegionFile(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.rows = _get_rows(np.random.default_rng(0), 400, 60)
+        self.frame_count = max(f for f, *_ in self.rows)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _assert_matches_reference(self, region_file, rows):
+        self.assertEqual(region_file.frame_count, self.frame_count)
+
+        frames = list(region_file)
+        self.assertEqual(len(frames), self.frame_count)
+
+        for frame, regions in enumerate(frames, start=1):
+            expected = _reference_frame_regions(rows, frame)
+
+            self.assertEqual(_get_keys(regions), expected, f"frame={frame}")
+            self.assertEqual(
+                _get_keys(region_file.frame_batch(frame).to_regions()), expected
+            )
+
+        for frame in (-1, 0, self.frame_count + 1, self.frame_count + 10):
+            self.assertEqual(len(region_file.frame_batch(frame)), 0)
+            self.assertEqual(list(region_file.frame_regions(frame)), [])
+
+    def test_ground_truth_text(self):
+        file_name = join(self._directory.name, "gt.txt")
+        with open(file_name, "w", encoding="utf8") as f:
+            f.write("frame,identity,x1,y1,width,height,visible\n")
+            for frame, identity, x1, y1, x2, y2 in self.rows:
+                f.write(f"{frame},{identity},{x1},{y1},{x2 - x1},{y2 - y1},1\n")
+
+        self._assert_matches_reference(GroundTruthTextRegionFile(file_name), self.rows)
+
+    def test_cvat_xml(self):
+        file_name = join(self._directory.name, "annotations.xml")
+        with open(file_name, "w", encoding="utf8") as f:
+            f.write("<annotations>\n")
+            for identity in sorted({r[1] for r in self.rows}):
+                f.write(f'<track id="{identity}">\n')
+                for frame, _, x1, y1, x2, y2 in (
+                    r for r in self.rows if r[1] == identity
+                ):
+                    # Fractional corners are widened to whole pixels.
+                    f.write(
+                        f'<box frame="{frame - 1}" xtl="{x1 + 0.5}" ytl="{y1}" '
+                        f'xbr="{x2 - 0.5}" ybr="{y2}"/>\n'
+                    )
+                f.write("</track>\n")
+            f.write("</annotations>\n")
+
+        # The old file sorted the boxes by frame, track by track, before scanning.
+        rows = sorted(sorted(self.rows, key=lambda r: r[1]), key=lambda r: r[0])
+
+        self._assert_matches_reference(CvatXmlRegionFile(file_name), rows)
+
+    def test_sqlite(self):
+        file_name = join(self._directory.name, "results.db")
+        connection = connect(file_name)
+        connection.execute(
+            """CREATE TABLE regions (
+                x1 int, y1 int, x2 int, y2 int, identity int, id_str text, frame int
+            )"""
+        )
+        connection.executemany(
+            "INSERT INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(x1, y1, x2, y2, i, str(i), f) for f, i, x1, y1, x2, y2 in self.rows],
+        )
+        connection.commit()
+
+        # Older databases without the frame index are read once, and newer ones
+        # are queried a frame at a time.
+        self._assert_matches_reference(SqliteRegionFile(file_name), self.rows)
+
+        create_frame_indexes(connection)
+        connection.commit()
+        connection.close()
+
+        self._assert_matches_reference(SqliteRegionFile(file_name), self.rows)
+
+    def test_sqlite_missing_identities(self):
+        file_name = join(self._directory.name, "results.db")
+        connection = connect(file_name)
+        connection.execute(
+            """CREATE TABLE regions (
+                x1 int, y1 int, x2 int, y2 int, identity int, id_str text, frame int
+            )"""
+        )
+        connection.executemany(
+            "INSERT INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(0, 0, 5, 5, None, None, 1), (1, 1, 6, 6, 3, "3", 1)],
+        )
+        connection.commit()
+        connection.close()
+
+        batch = SqliteRegionFile(file_name).frame_batch(1)
+        self.assertEqual(batch.identities.tolist(), [-1, 3])
+        self.assertEqual(batch.id_strs.tolist(), ["", "3"])
+        self.assertEqual(
+            _get_keys(batch.to_regions()),
+            [((0, 0, 5, 5), None, None), ((1, 1, 6, 6), "3", 3)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
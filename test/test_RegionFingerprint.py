@@ -0,0 +1,74 @@
+import hashlib
+from sqlite3 import connect
+import unittest
+
+import numpy as np
+
+from library.region_fingerprint import (
+    FINGERPRINT_ALGORITHMS,
+    RegionFingerprint,
+    fingerprint_rows,
+    fingerprint_table,
+)
+
+
+class TestRegionFingerprint(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.regions = [
+            tuple(int(c) for c in r) for r in rng.integers(0, 4000, (257, 4))
+        ]
+
+    def test_independent_of_batching(self):
+        for algorithm in FINGERPRINT_ALGORITHMS:
+            expected = fingerprint_rows(self.regions, algorithm)
+
+            for batch_size in (1, 2, 7, 256, 1000):
+                self.assertEqual(
+                    fingerprint_rows(self.regions, algorithm, batch_size),
+                    expected,
+                    f"{algorithm}, batch_size={batch_size}",
+                )
+
+            # Frames without regions are updated with an empty batch.
+            fingerprint = RegionFingerprint(algorithm)
+            for start, end in ((0, 0), (0, 3), (3, 3), (3, 100), (100, 257)):
+                fingerprint.update(self.regions[start:end])
+            self.assertEqual(fingerprint.hexdigest(), expected, algorithm)
+
+    def test_md5_matches_original(self):
+        fingerprint = RegionFingerprint("md5")
+        fingerprint.update(self.regions)
+
+        # The original fingerprint hashed the text of one coordinate at a time.
+        original = hashlib.md5()
+        for region in self.regions:
+            for data in region:
+                original.update(str(data).encode())
+
+        self.assertEqual(fingerprint.hexdigest(), original.hexdigest())
+
+    def test_table_matches_saved_order(self):
+        connection = connect(":memory:")
+        connection.execute("CREATE TABLE regions (x1 int, y1 int, x2 int, y2 int)")
+        connection.executemany("INSERT INTO regions VALUES (?, ?, ?, ?)", self.regions)
+
+        for algorithm in FINGERPRINT_ALGORITHMS:
+            self.assertEqual(
+                fingerprint_table(connection, "regions", algorithm),
+                fingerprint_rows(self.regions, algorithm),
+            )
+        self.assertEqual(
+            fingerprint_table(connection, "regions"),
+            fingerprint_rows(self.regions, "blake2b"),
+        )
+
+        connection.close()
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            RegionFingerprint("sha1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.models.frame import Frame
+from baboon_tracking.models.region import Region
+from baboon_tracking.stages.motion_detector.scale_regions import ScaleRegions
+from baboon_tracking.stages.preprocess.scale_frame import ScaleFrame
+
+SHAPE = (240, 320)
+
+
+def _create_scale_frame(scale: float, frame: Frame) -> ScaleFrame:
+    stage = ScaleFrame(scale, SimpleNamespace(processed_frame=frame))
+
+    # Turns off displaying and saving the result, as the pipeline would.
+    for parameter, is_property in ScaleFrame.runtime_configuration:
+        if is_property:
+            getattr(ScaleFrame, parameter)(stage, {"display": False, "save": False})
+
+    return stage
+
+
+def _get_homographies(rng: np.random.Generator, count: int):
+    return [
+        np.eye(3)
+        + np.array(
+            [
+                [rng.normal(0, 0.01), rng.normal(0, 0.01), rng.normal(0, 5)],
+                [rng.normal(0, 0.01), rng.normal(0, 0.01), rng.normal(0, 5)],
+                [rng.normal(0, 1e-5), rng.normal(0, 1e-5), 0],
+            ]
+        )
+        for _ in range(count)
+    ]
+
+
+def _to_scaled_homography(homography: np.ndarray, scale: float) -> np.ndarray:
+    """
+    Estimates the homography between scaled frames from scaled point pairs, as
+    registration of the scaled frames would.
+    """
+    points = np.array(
+        [[0, 0], [SHAPE[1], 0], [SHAPE[1], SHAPE[0]], [0, SHAPE[0]], [100, 70]],
+        dtype=np.float64,
+    )
+    mapped = cv2.perspectiveTransform(points[None], homography)[0]
+
+    scaled, _ = cv2.findHomography(points * scale, mapped * scale)
+    return scaled
+
+
+class TestScaleRegions(unittest.TestCase):
+    def test_half_scale_maps_back(self):
+        rng = np.random.default_rng(0)
+        scale = 0.5
+
+        top_left = rng.integers(0, 280, (20, 2))
+        rectangles = np.concatenate(
+            (top_left, top_left + rng.integers(1, 40, (20, 2))), 1
+        )
+        homographies = _get_homographies(rng, 9)
+
+        stage = ScaleRegions(
+            scale,
+            SimpleNamespace(
+                baboons=[Region(r) for r in np.round(rectangles * scale).tolist()]
+            ),
+            SimpleNamespace(
+                transformation_matrices=[
+                    _to_scaled_homography(h, scale) for h in homographies
+                ]
+                + [None],
+                current_frame_transformation=_to_scaled_homography(
+                    homographies[0], scale
+                ),
+            ),
+        )
+        stage.execute()
+
+        # Each coordinate was rounded once at the processing scale.
+        scaled_rectangles = np.array([b.rectangle for b in stage.baboons])
+        self.assertTrue((np.abs(scaled_rectangles - rectangles) <= 0.5 / scale).all())
+        self.assertTrue(all(isinstance(c, int) for c in stage.baboons[0].rectangle))
+
+        points = rng.random((50, 1, 2)) * SHAPE[::-1]
+        for expected, transformation in zip(
+            homographies + [None, homographies[0]],
+            stage.transformation_matrices + [stage.current_frame_transformation],
+        ):
+            if expected is None:
+                self.assertIsNone(transformation)
+                continue
+
+            np.testing.assert_allclose(
+                cv2.perspectiveTransform(points, transformation),
+                cv2.perspectiveTransform(points, expected),
+                atol=1e-6,
+            )
+
+    def test_half_scale_frame(self):
+        image = np.kron(
+            np.random.default_rng(1).integers(0, 256, (SHAPE[0] // 2, SHAPE[1] // 2)),
+            np.ones((2, 2)),
+        ).astype(np.uint8)
+
+        stage = _create_scale_frame(0.5, Frame(image, 7))
+        stage.execute()
+
+        self.assertEqual(stage.processed_frame.get_frame_number(), 7)
+        np.testing.assert_array_equal(
+            stage.processed_frame.get_frame(), image[::2, ::2]
+        )
+
+    def test_scale_one_is_noop(self):
+        frame = Frame(np.zeros(SHAPE, dtype=np.uint8), 3)
+        stage = _create_scale_frame(1, frame)
+        stage.execute()
+
+        self.assertIs(stage.processed_frame, frame)
+
+        baboons = [Region([1, 2, 3, 4]), Region([5, 6, 7, 8])]
+        homographies = _get_homographies(np.random.default_rng(2), 3)
+        matrices = SimpleNamespace(
+            transformation_matrices=homographies + [None],
+            current_frame_transformation=homographies[0],
+        )
+
+        stage = ScaleRegions(1, SimpleNamespace(baboons=baboons), matrices)
+        stage.execute()
+
+        self.assertIs(stage.baboons, baboons)
+        self.assertIs(stage.transformation_matrices, matrices.transformation_matrices)
+        self.assertIs(stage.current_frame_transformation, homographies[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+from os.path import join
+from sqlite3 import connect
+from tempfile import TemporaryDirectory
+import unittest
+
+import cv2
+import numpy as np
+
+from baboon_tracking.motion_tracker_pipeline import MotionTrackerPipeline
+from baboon_tracking.sharded_motion_tracker_pipeline import (
+    FINGERPRINTED_TABLES,
+    ShardedMotionTrackerPipeline,
+)
+from library.config import set_config, set_config_part
+from library.region_fingerprint import fingerprint_rows, fingerprint_table
+
+RUNTIME_CONFIG = {"display": False, "save": False, "timings": False, "progress": False}
+
+
+def _create_shard(file_name: str, rng: np.random.Generator, frames: range):
+    """
+    Creates a shard database like the one SaveRegions and SaveComputedRegions write.
+    """
+    connection = connect(file_name)
+    connection.execute("CREATE TABLE metadata (pipeline text, key text, value text)")
+    connection.execute("CREATE TABLE stages (pipeline text, stage text, idx int)")
+
+    for table in FINGERPRINTED_TABLES.values():
+        connection.execute(
+            f"""CREATE TABLE {table} (
+                x1 int, y1 int, x2 int, y2 int, identity int, id_str text, frame int
+            )"""
+        )
+
+        rows = [
+            (*(int(c) for c in rng.integers(0, 100, 4)), i, str(i), f)
+            for f in frames
+            for i in range(int(rng.integers(0, 4)))
+        ]
+        connection.executemany(
+            f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+    connection.executemany(
+        "INSERT INTO metadata VALUES (?, ?, ?)",
+        [("MotionTracker", "start_time", "2026-01-01 00:00:00")]
+        + [("MotionTracker", k, "shard fingerprint") for k in FINGERPRINTED_TABLES],
+    )
+
+    connection.commit()
+    connection.close()
+
+
+def _write_video(file_name: str, rng: np.random.Generator, frame_count: int):
+    """
+    Writes a textured scene with blobs moving across it, seen by a slowly panning
+    camera.
+    """
+    background = cv2.GaussianBlur(
+        rng.integers(0, 256, (300, 400, 3), dtype=np.uint8), (0, 0), 2
+    )
+
+    writer = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*"MJPG"), 30, (320, 240))
+    for i in range(frame_count):
+        x, y = 2 * i, i
+        image = background[y : y + 240, x : x + 320].copy()
+        cv2.circle(image, (40 + 6 * i, 80), 7, (255, 255, 255), -1)
+        cv2.circle(image, (280 - 5 * i, 170), 6, (0, 0, 0), -1)
+        writer.write(image)
+    writer.release()
+
+
+def _get_rows(file_name: str):
+    connection = connect(file_name)
+    rows = {
+        t: connection.execute(f"SELECT * FROM {t} ORDER BY frame, rowid").fetchall()
+        for t in ("motion_regions", "transformations", "regions")
+    }
+    connection.close()
+
+    return rows
+
+
+class TestShardedMotionTrackerPipeline(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.results_file = join(self._directory.name, "results.db")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _merge(self, runtime_config):
+        pipeline = ShardedMotionTrackerPipeline(
+            None, runtime_config=dict(runtime_config, results_file=self.results_file)
+        )
+
+        rng = np.random.default_rng(0)
+        shard_ranges = [(1, 5), (6, 10)]
+        for idx, (start, end) in enumerate(shard_ranges):
+            # Shards after the first also hold their history frames.
+            _create_shard(
+                pipeline._get_shard_file(idx), rng, range(max(1, start - 2), end + 1)
+            )
+
+        pipeline._merge_shards(shard_ranges)
+
+        return connect(self.results_file)
+
+    def test_merge_fingerprints_every_table(self):
+        for runtime_config, algorithm in (
+            ({}, "blake2b"),
+            ({"fingerprint": "md5"}, "md5"),
+        ):
+            connection = self._merge(runtime_config)
+
+            for key, table in FINGERPRINTED_TABLES.items():
+                values = connection.execute(
+                    "SELECT value FROM metadata WHERE key = ?", (key,)
+                ).fetchall()
+                rows = connection.execute(
+                    f"SELECT x1, y1, x2, y2 FROM {table} ORDER BY rowid"
+                ).fetchall()
+
+                self.assertEqual(
+                    values, [(fingerprint_table(connection, table, algorithm),)]
+                )
+                self.assertEqual(values[0][0], fingerprint_rows(rows, algorithm))
+
+                frames = [
+                    f for (f,) in connection.execute(f"SELECT frame FROM {table}")
+                ]
+                self.assertEqual(frames, sorted(frames))
+                self.assertTrue(set(frames) <= set(range(1, 11)))
+
+            connection.close()
+
+    def test_matches_serial_run(self):
+        video_file = join(self._directory.name, "video.avi")
+        _write_video(video_file, np.random.default_rng(0), 40)
+
+        serial_file = join(self._directory.name, "serial.db")
+
+        try:
+            for incremental in (False, True):
+                set_config(None)
+                set_config_part("motion_detector/registration/incremental", incremental)
+                set_config_part(
+                    "motion_detector/registration/reregistration_interval", 3
+                )
+
+                MotionTrackerPipeline(
+                    video_file,
+                    runtime_config=dict(RUNTIME_CONFIG, results_file=serial_file),
+                ).run()
+                ShardedMotionTrackerPipeline(
+                    video_file,
+                    runtime_config=dict(
+                        RUNTIME_CONFIG, results_file=self.results_file, shards=3
+                    ),
+                ).run()
+
+                serial = _get_rows(serial_file)
+                sharded = _get_rows(self.results_file)
+
+                self.assertTrue(serial["regions"], str(incremental))
+                for table, rows in serial.items():
+                    self.assertEqual(
+                        sharded[table], rows, f"{table}, incremental={incremental}"
+                    )
+        finally:
+            set_config(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+from os.path import exists, join
+from sqlite3 import IntegrityError, connect
+from tempfile import TemporaryDirectory
+import threading
+import unittest
+
+from library.sqlite_writer import SqliteWriter
+
+
+class TestSqliteWriter(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.file_name = join(self._directory.name, "results.db")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _count_committed(self) -> int:
+        connection = connect(self.file_name)
+        try:
+            return connection.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+        finally:
+            connection.close()
+
+    def _create_writer(self, commit_frames: int) -> SqliteWriter:
+        writer = SqliteWriter(self.file_name, commit_frames, commit_seconds=3600)
+        writer.execute("CREATE TABLE t (frame int PRIMARY KEY)")
+        writer.call(lambda connection: connection.commit())
+
+        return writer
+
+    def test_commits_every_commit_frames(self):
+        writer = self._create_writer(3)
+
+        for frame in range(1, 7):
+            writer.execute("INSERT INTO t VALUES (?)", (frame,))
+            writer.commit()
+
+            # Waits for the writer thread to reach this point.
+            writer.call(lambda _: None)
+
+            self.assertEqual(self._count_committed(), frame // 3 * 3)
+
+        writer.close()
+
+    def test_call_runs_after_queued_statements(self):
+        writer = self._create_writer(100)
+
+        writer.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+        count = writer.call(
+            lambda connection: connection.execute("SELECT COUNT(*) FROM t").fetchone()[
+                0
+            ]
+        )
+
+        self.assertEqual(count, 3)
+        self.assertEqual(self._count_committed(), 0)
+
+        writer.close()
+
+    def test_close_commits_and_removes_log(self):
+        writer = self._create_writer(100)
+
+        writer.executemany("INSERT INTO t VALUES (?)", [(f,) for f in range(10)])
+        writer.close()
+
+        self.assertEqual(self._count_committed(), 10)
+        self.assertFalse(exists(self.file_name + "-wal"))
+
+        connection = connect(self.file_name)
+        self.assertEqual(
+            connection.execute("PRAGMA journal_mode").fetchone()[0], "delete"
+        )
+        connection.close()
+
+    def test_close_with_open_reader(self):
+        writer = self._create_writer(100)
+        writer.execute("INSERT INTO t VALUES (1)")
+
+        reader = connect(self.file_name)
+        reader.execute("SELECT COUNT(*) FROM t").fetchone()
+
+        # Exceptions which escape the writer thread are not raised by close.
+        errors = []
+        excepthook = threading.excepthook
+        threading.excepthook = errors.append
+        try:
+            writer.close()
+        finally:
+            threading.excepthook = excepthook
+            reader.close()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self._count_committed(), 1)
+
+    def test_error_is_raised_and_rolled_back(self):
+        writer = self._create_writer(100)
+
+        writer.execute("INSERT INTO t VALUES (1)")
+        writer.execute("INSERT INTO t VALUES (1)")
+
+        # The failure is reported to the callers which follow it.
+        with self.assertRaises(IntegrityError):
+            writer.call(lambda _: None)
+        with self.assertRaises(IntegrityError):
+            writer.execute("INSERT INTO t VALUES (2)")
+        with self.assertRaises(IntegrityError):
+            writer.close()
+
+        self.assertEqual(self._count_committed(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from baboon_tracking.stages.motion_detector.generate_mask_subcomponents.foreground.union_intersections import (
+    union_frames,
+)
+
+
+def _reference_union_frames(frames: np.ndarray) -> np.ndarray:
+    """
+    The per-frame implementation the compiled kernel replaced.
+    """
+    union = np.zeros(frames[0].shape, dtype=np.uint8)
+
+    for f in frames[::-1]:
+        union[union == 0] = f[union == 0]
+
+    return union
+
+
+class TestUnionIntersections(unittest.TestCase):
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+
+        for count in (1, 2, 8):
+            frames = rng.integers(0, 256, (count, 47, 59), dtype=np.uint8)
+            # Mostly zeros, like intersected frames.
+            frames[rng.random(frames.shape) < 0.7] = 0
+
+            out = np.empty(frames.shape[1:], dtype=np.uint8)
+            union_frames(frames, out)
+
+            np.testing.assert_array_equal(out, _reference_union_frames(frames))
+
+    def test_all_zero(self):
+        frames = np.zeros((4, 10, 12), dtype=np.uint8)
+
+        out = np.full(frames.shape[1:], 7, dtype=np.uint8)
+        union_frames(frames, out)
+
+        np.testing.assert_array_equal(out, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+from os.path import join
+from sqlite3 import connect
+from tempfile import TemporaryDirectory
+import unittest
+
+import numpy as np
+
+from library.columnar_results import (
+    RESULT_TABLES,
+    export_results_npz,
+    get_npz_file,
+    load_results_npz,
+)
+from library.region_file import NpzRegionFile, SqliteRegionFile
+
+
+def _create_table(connection, table: str):
+    columns = ", ".join(["frame int"] + list(RESULT_TABLES[table]))
+    connection.execute(f"CREATE TABLE {table} ({columns})")
+
+
+class TestColumnarResults(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.results_file = join(self._directory.name, "results.db")
+
+        connection = connect(self.results_file)
+        for table in ("motion_regions", "transformations", "regions"):
+            _create_table(connection, table)
+
+        rng = np.random.default_rng(0)
+
+        # Saved out of frame order, with frames missing, like a merged run.
+        self.regions = [
+            (int(f), *(int(c) for c in rng.integers(0, 100, 4)), i, s)
+            for f, i, s in [
+                (3, 0, "0"),
+                (1, 1, "1"),
+                (3, None, None),
+                (6, 2, "named"),
+                (1, 3, "3"),
+            ]
+        ]
+        connection.executemany(
+            "INSERT INTO regions VALUES (?, ?, ?, ?, ?, ?, ?)", self.regions
+        )
+        connection.executemany(
+            "INSERT INTO transformations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(f, *rng.random(9).tolist()) for f in (2, 1)],
+        )
+
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_round_trip(self):
+        export_results_npz(self.results_file)
+        arrays = load_results_npz(get_npz_file(self.results_file))
+
+        connection = connect(self.results_file)
+        for table, columns in RESULT_TABLES.items():
+            if table == "bayesian_filter_regions":
+                continue
+
+            rows = connection.execute(
+                f"SELECT {', '.join(columns)}, frame FROM {table} ORDER BY frame, rowid"
+            ).fetchall()
+
+            for i, (column, dtype) in enumerate(columns.items()):
+                expected = [r[i] for r in rows]
+                if dtype is str:
+                    expected = ["" if v is None else v for v in expected]
+                elif dtype is np.int64:
+                    expected = [-1 if v is None else v for v in expected]
+
+                self.assertEqual(
+                    arrays[f"{table}.{column}"].tolist(), expected, f"{table}.{column}"
+                )
+
+            frames = arrays[f"{table}.frame"]
+            offsets = arrays[f"{table}.frame_offsets"]
+            self.assertEqual(frames.tolist(), [r[-1] for r in rows])
+            for frame in range(len(offsets) - 1):
+                self.assertTrue(
+                    (frames[offsets[frame] : offsets[frame + 1]] == frame).all()
+                )
+            self.assertEqual(offsets[-1], len(rows))
+
+        connection.close()
+
+    def test_empty_and_missing_tables(self):
+        export_results_npz(self.results_file)
+        arrays = load_results_npz(get_npz_file(self.results_file))
+
+        # motion_regions has no rows, and bayesian_filter_regions does not exist.
+        for column, dtype in RESULT_TABLES["motion_regions"].items():
+            array = arrays[f"motion_regions.{column}"]
+            self.assertEqual(array.shape, (0,))
+            self.assertEqual(array.dtype, np.dtype(dtype))
+
+        self.assertEqual(arrays["motion_regions.frame_offsets"].tolist(), [0, 0])
+        self.assertFalse(any(k.startswith("bayesian_filter_regions.") for k in arrays))
+
+        connection = connect(self.results_file)
+        connection.execute("DELETE FROM regions")
+        connection.commit()
+        connection.close()
+        export_results_npz(self.results_file)
+
+        region_file = NpzRegionFile(get_npz_file(self.results_file))
+        self.assertEqual(region_file.frame_count, 0)
+        self.assertEqual(len(region_file.frame_batch(1)), 0)
+
+    def test_region_file_matches_database(self):
+        npz_file = join(self._directory.name, "export.npz")
+        export_results_npz(self.results_file, npz_file)
+
+        npz_regions = NpzRegionFile(npz_file)
+        sqlite_regions = SqliteRegionFile(self.results_file)
+
+        self.assertEqual(npz_regions.frame_count, sqlite_regions.frame_count)
+        for frame in range(0, sqlite_regions.frame_count + 2):
+            npz_batch = npz_regions.frame_batch(frame)
+            sqlite_batch = sqlite_regions.frame_batch(frame)
+
+            self.assertEqual(
+                npz_batch.rectangles.tolist(), sqlite_batch.rectangles.tolist()
+            )
+            self.assertEqual(
+                npz_batch.identities.tolist(), sqlite_batch.identities.tolist()
+            )
+            self.assertEqual(npz_batch.id_strs.tolist(), sqlite_batch.id_strs.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
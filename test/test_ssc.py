@@ -0,0 +1,142 @@
+import math
+import unittest
+
+import cv2
+import numpy as np
+
+from third_party.ssc import ssc, ssc_indexes
+
+COLS = 640
+ROWS = 480
+
+
+def _reference_ssc(points, num_ret_points, tolerance, cols, rows):
+    """
+    The pure Python loop ssc used before it was compiled, over (x, y) points.
+    Returns the selected indexes and how the binary search ended.
+    """
+    exp1 = rows + cols + 2 * num_ret_points
+    exp2 = (
+        4 * cols
+        + 4 * num_ret_points
+        + 4 * rows * num_ret_points
+        + rows * rows
+        + cols * cols
+        - 2 * rows * cols
+        + 4 * rows * cols * num_ret_points
+    )
+    exp3 = math.sqrt(exp2)
+    exp4 = num_ret_points - 1
+
+    sol1 = -round(float(exp1 + exp3) / exp4)
+    sol2 = -round(float(exp1 - exp3) / exp4)
+
+    high = sol1 if (sol1 > sol2) else sol2
+    low = math.floor(math.sqrt(len(points) / num_ret_points))
+
+    prev_width = -1
+    result = []
+    k = num_ret_points
+    k_min = round(k - (k * tolerance))
+    k_max = round(k + (k * tolerance))
+
+    while True:
+        width = low + (high - low) / 2
+        if width == prev_width:
+            return result, "repeated width"
+        if low > high:
+            return result, "low > high"
+
+        c = width / 2
+        num_cell_cols = int(math.floor(cols / c))
+        num_cell_rows = int(math.floor(rows / c))
+        covered_vec = [
+            [False for _ in range(num_cell_cols + 1)] for _ in range(num_cell_rows + 1)
+        ]
+        result = []
+
+        for i, (x, y) in enumerate(points):
+            row = int(math.floor(y / c))
+            col = int(math.floor(x / c))
+            if not covered_vec[row][col]:
+                result.append(i)
+                span = math.floor(width / c)
+                row_min = int(max(row - span, 0))
+                row_max = int(min(row + span, num_cell_rows))
+                col_min = int(max(col - span, 0))
+                col_max = int(min(col + span, num_cell_cols))
+                for row_to_cover in range(row_min, row_max + 1):
+                    for col_to_cover in range(col_min, col_max + 1):
+                        covered_vec[row_to_cover][col_to_cover] = True
+
+        if k_min <= len(result) <= k_max:
+            return result, "solution"
+        if len(result) < k_min:
+            high = width - 1
+        else:
+            low = width + 1
+        prev_width = width
+
+
+def _reference_indexes(points, responses, num_ret_points, tolerance):
+    # Strongest first, keeping the detector's order between equal responses.
+    order = sorted(range(len(points)), key=lambda i: -responses[i])
+    selected, exit_reason = _reference_ssc(
+        [tuple(points[i]) for i in order], num_ret_points, tolerance, COLS, ROWS
+    )
+
+    return [order[i] for i in selected], exit_reason
+
+
+class TestSsc(unittest.TestCase):
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+        exit_reasons = set()
+
+        for count, num_ret_points, tolerance in (
+            (0, 100, 0.1),
+            (5, 100, 0.1),
+            (50, 10, 0.1),
+            (400, 100, 0.0),
+            (2000, 100, 0.1),
+            (2000, 300, 0.05),
+            (5000, 1000, 0.1),
+        ):
+            points = rng.random((count, 2)) * (COLS, ROWS)
+            # Few distinct responses, so many of them tie.
+            responses = rng.integers(0, 20, count).astype(np.float32)
+
+            expected, exit_reason = _reference_indexes(
+                points, responses, num_ret_points, tolerance
+            )
+            exit_reasons.add(exit_reason)
+
+            selected = ssc_indexes(
+                points, responses, num_ret_points, tolerance, COLS, ROWS
+            )
+            self.assertEqual(
+                selected.tolist(), expected, f"{count}, {num_ret_points}, {exit_reason}"
+            )
+
+        # Too few points to reach num_ret_points ends the search with low > high.
+        self.assertTrue({"solution", "low > high"} <= exit_reasons)
+
+    def test_keypoints(self):
+        rng = np.random.default_rng(1)
+        image = cv2.GaussianBlur(
+            rng.integers(0, 256, (ROWS, COLS), dtype=np.uint8), (5, 5), 0
+        )
+        keypoints = cv2.FastFeatureDetector_create().detect(image, None)
+        self.assertTrue(keypoints)
+
+        expected, _ = _reference_indexes(
+            [k.pt for k in keypoints], [k.response for k in keypoints], 300, 0.1
+        )
+
+        selected = ssc(keypoints, 300, 0.1, COLS, ROWS)
+        self.assertEqual([k.pt for k in selected], [keypoints[i].pt for i in expected])
+        self.assertEqual(ssc([], 300, 0.1, COLS, ROWS), [])
+
+
+if __name__ == "__main__":
+    unittest.main()